@@ -0,0 +1,1000 @@
+"""
+Typer application behind the superqwen CLI.
+
+Installer, uninstaller and interactive modules are imported inside the
+commands that use them so that simple invocations stay fast to start.
+"""
+import typer
+from enum import Enum
+from pathlib import Path
+from typing import List, Optional
+from typing_extensions import Annotated
+
+from .. import __version__
+from .tracing import TRACE_ENV
+
+# --- Setup ---
+COMPONENTS = ["commands", "modes", "agents", "mcp", "context"]
+
+def version_callback(value: bool):
+    if value:
+        from . import ui
+        ui.display_info(f"SuperQwen Framework Version: {__version__}")
+        raise typer.Exit()
+
+app = typer.Typer(
+    name="superqwen",
+    help="SuperQwen Framework CLI - A tool to manage your Qwen CLI enhancements.",
+    add_completion=False,
+)
+
+@app.callback(invoke_without_command=True)
+def main_callback(
+    ctx: typer.Context,
+    version: Optional[bool] = typer.Option(
+        None,
+        "--version",
+        "-v",
+        help="Show the application's version and exit.",
+        callback=version_callback,
+        is_eager=True,
+    ),
+    help_flag: Optional[bool] = typer.Option(
+        None,
+        "--help",
+        "-h",
+        help="Show the help message and exit.",
+        is_eager=True,
+    ),
+    trace: Annotated[Optional[Path], typer.Option(
+        "--trace", envvar=TRACE_ENV, metavar="PATH",
+        help="Time every install step, file write, MCP probe and subprocess and write the spans to PATH "
+             "(Chrome trace format, or JSON lines for a .jsonl path).")] = None,
+):
+    """
+    Manage the SuperQwen Framework.
+    """
+    if trace:
+        _enable_tracing(ctx, trace)
+
+    if help_flag:
+        help() # Call the custom help command
+        raise typer.Exit()
+
+    if ctx.invoked_subcommand is None:
+        help() # Show help if no command is provided
+
+def _enable_tracing(ctx: typer.Context, path: Path) -> None:
+    """Records spans for the rest of the command, then writes them to path and prints a summary."""
+    import contextlib
+    import sys
+    from .tracing import start_tracing, stop_tracing
+
+    start_tracing()
+
+    def finish():
+        from . import ui
+        tracer = stop_tracing()
+        rows = [
+            [s.name, s.calls, f"{s.total_ms:.1f}", f"{s.mean_ms:.2f}", f"{s.max_ms:.1f}"]
+            for s in tracer.summary()
+        ]
+        # On stderr, so that it never mixes with --output json documents.
+        with contextlib.redirect_stdout(sys.stderr):
+            ui.display_table(["Operation", "Calls", "Total ms", "Mean ms", "Max ms"], rows, title="Trace Summary")
+            try:
+                tracer.write(path)
+            except OSError as e:
+                ui.display_error(f"Could not write the trace to {path}: {e}")
+                return
+            ui.display_info(f"Wrote {len(tracer.spans)} spans to {path}.")
+
+    ctx.call_on_close(finish)
+
+install_app = typer.Typer(name="install", help="Install framework components.")
+uninstall_app = typer.Typer(name="uninstall", help="Uninstall framework components.")
+app.add_typer(install_app)
+app.add_typer(uninstall_app)
+
+# --- Install Commands ---
+
+@install_app.callback(invoke_without_command=True)
+def install_main(ctx: typer.Context):
+    """
+    Install SuperQwen components. Run without a subcommand for an interactive menu.
+    """
+    if ctx.invoked_subcommand is None:
+        from .interactive import handle_interactive_install
+        handle_interactive_install()
+
+OfflineOption = Annotated[bool, typer.Option(
+    "--offline", help="Do not contact the npm registry; trust cached MCP verification results.")]
+RefreshCacheOption = Annotated[bool, typer.Option(
+    "--refresh-cache", help="Discard cached npm registry results and verify MCP servers again.")]
+
+StagedOption = Annotated[bool, typer.Option(
+    "--staged", help="Build each component directory in a staging area and swap it in with a rename. "
+                     "The previous tree is kept under ~/.qwen/.superqwen/rollback.")]
+
+class LinkMode(str, Enum):
+    copy = "copy"
+    hardlink = "hardlink"
+    reflink = "reflink"
+    symlink = "symlink"
+
+LinkModeOption = Annotated[LinkMode, typer.Option(
+    "--link-mode", help="How installed files are created from the package files. "
+                        "Linked files share the package's data; unsupported modes fall back to copy.")]
+
+class Profile(str, Enum):
+    full = "full"
+    compact = "compact"
+
+ProfileOption = Annotated[Profile, typer.Option(
+    "--profile", help="compact installs minified command prompts and agents, using the prose-safe "
+                      "symbols of the Token Efficiency mode, and reports the size reduction.")]
+PruneSectionOption = Annotated[Optional[List[str]], typer.Option(
+    "--prune-section", help="With --profile compact, drop sections with this heading (repeatable), "
+                            "e.g. Examples.")]
+
+ModeOption = Annotated[Optional[List[str]], typer.Option(
+    "--mode", help="Mode to compose into QWEN.md (repeatable), e.g. Brainstorming. Defaults to all modes.")]
+ContextBudgetOption = Annotated[Optional[int], typer.Option(
+    "--context-budget", min=1, help="Fit QWEN.md into this many tokens: the Core, Mode, MCP and Agent "
+                                    "documents covering the most within the budget are chosen.")]
+PriorityOption = Annotated[Optional[List[str]], typer.Option(
+    "--priority", help="With --context-budget, weight a kind or document (repeatable), e.g. agent=0.5 "
+                       "or mode/Brainstorming=4. A weight of 0 leaves it out.")]
+ContextSectionsOption = Annotated[bool, typer.Option(
+    "--context-sections", help="With --context-budget, choose single sections of documents, not only whole ones.")]
+
+class ContextLayout(str, Enum):
+    append = "append"
+    stable = "stable"
+
+ContextLayoutOption = Annotated[ContextLayout, typer.Option(
+    "--context-layout", help="stable puts the block first in QWEN.md, normalized and with its digest at the end, "
+                             "so its bytes form the same prompt prefix in every session.")]
+
+class OutputFormat(str, Enum):
+    table = "table"
+    json = "json"
+
+OutputOption = Annotated[OutputFormat, typer.Option(
+    "--output", "-o", help="json prints one machine-readable result document (components, file counts, "
+                           "durations, skipped MCP servers) instead of progress output.")]
+
+def _file_options(component: str, staged: bool, link_mode: str, profile: str,
+                  prune_sections: List[str]) -> dict:
+    """Installer keyword arguments for a file component; only commands and agents have profiles."""
+    options = {"staged": staged, "link_mode": link_mode}
+    if component in ("commands", "agents"):
+        options.update(profile=profile, prune_sections=prune_sections)
+    return options
+
+def _context_options(modes: Optional[List[str]], budget: Optional[int], priorities: Optional[List[str]],
+                     sections: bool, layout: ContextLayout) -> dict:
+    """Installer keyword arguments for the context component."""
+    return {"modes": modes, "budget": budget, "priorities": priorities or [], "sections": sections,
+            "layout": layout.value}
+
+def _install_report(command: str, components: List[str], offline: bool = False, refresh_cache: bool = False,
+                    servers: Optional[List[str]] = None, staged: bool = False, link_mode: str = "copy",
+                    profile: str = "full", prune_sections: Optional[List[str]] = None,
+                    context_options: Optional[dict] = None):
+    """Installs components without progress output and prints the JSON result document."""
+    import time
+    from .installer import INDEXED_COMPONENTS, INSTALL_MAP, check_context_options, verify_mcp_servers, write_indexes
+    from .mcp_catalog import select_servers
+    from .report import json_report
+
+    context_options = context_options or {}
+    with json_report(command) as report:
+        if "context" in components:
+            check_context_options(**context_options)
+        for component in components:
+            start = time.perf_counter()
+            if component == "mcp":
+                selected, _unknown = select_servers(servers)
+                verified = verify_mcp_servers(servers, offline, refresh_cache)
+                INSTALL_MAP["mcp"](servers=servers, verified_servers=verified)
+                report.add_component("mcp", time.perf_counter() - start, servers=list(verified),
+                                     skipped_servers=[name for name in selected if name not in verified])
+            elif component == "context":
+                written = INSTALL_MAP["context"](**context_options)
+                report.add_component("context", time.perf_counter() - start, updated=written,
+                                     budget=context_options.get("budget"))
+            else:
+                result = INSTALL_MAP[component](**_file_options(component, staged, link_mode, profile,
+                                                                prune_sections or []))
+                report.add_component(component, time.perf_counter() - start, result)
+        if INDEXED_COMPONENTS.intersection(components):
+            write_indexes()
+    _emit_report(report)
+
+def _uninstall_report(command: str, components: List[str]):
+    """Uninstalls components without progress output and prints the JSON result document."""
+    import time
+    from .uninstaller import UNINSTALL_MAP
+    from .report import json_report
+
+    with json_report(command) as report:
+        for component in components:
+            start = time.perf_counter()
+            removed = UNINSTALL_MAP[component]()
+            report.add_component(component, time.perf_counter() - start, removed=removed)
+    _emit_report(report)
+
+def _check_context(context_options: dict) -> None:
+    """Exits with an error before anything is installed if the context options are invalid."""
+    from . import ui
+    from .installer import check_context_options
+
+    try:
+        check_context_options(**context_options)
+    except ValueError as e:
+        ui.display_error(str(e))
+        raise typer.Exit(code=2)
+
+def _emit_report(report, code: int = 1):
+    typer.echo(report.to_json())
+    if not report.ok:
+        raise typer.Exit(code=code)
+
+def _install_fleet(targets: str, workers: int, staged: bool, link_mode: str, offline: bool, refresh_cache: bool,
+                   profile: str, prune_sections: List[str], context_options: Optional[dict] = None,
+                   output: OutputFormat = OutputFormat.table):
+    """Installs all components into every home directory matched by targets and prints a summary."""
+    from .fleet import install_targets, resolve_targets
+
+    homes = resolve_targets(targets)
+    if output == OutputFormat.json:
+        _fleet_report(homes, workers, staged, link_mode, offline, refresh_cache, profile, prune_sections,
+                      context_options)
+        return
+    from . import ui
+    if not homes:
+        ui.display_error(f"No target home directories match '{targets}'.")
+        raise typer.Exit(code=1)
+
+    ui.display_header("SuperQwen Installer", f"Installing All Components into {len(homes)} Homes")
+    progress_bar = ui.ProgressBar(len(homes), prefix="Targets: ")
+    results = install_targets(homes, COMPONENTS, workers=workers, staged=staged, link_mode=link_mode,
+                              offline=offline, refresh_cache=refresh_cache, profile=profile,
+                              prune_sections=prune_sections, context_options=context_options,
+                              progress_bar=progress_bar)
+    progress_bar.finish()
+
+    rows = []
+    for result in results:
+        synced = [r for r in result.components.values() if r is not None]
+        rows.append([
+            str(result.home),
+            "ok" if result.ok else f"failed: {result.error}",
+            sum(r.copied for r in synced),
+            sum(r.skipped for r in synced),
+            sum(r.removed for r in synced),
+            ui.format_duration(result.duration),
+        ])
+    ui.display_table(["Target", "Status", "Copied", "Skipped", "Removed", "Time"], rows, title="Fleet Install Summary")
+
+    failed = sum(1 for result in results if not result.ok)
+    if failed:
+        ui.display_error(f"{failed} of {len(results)} targets failed.")
+        raise typer.Exit(code=1)
+    ui.display_success(f"\n✅ All components installed into {len(results)} targets!")
+
+def _fleet_report(homes: List[Path], workers: int, staged: bool, link_mode: str, offline: bool,
+                  refresh_cache: bool, profile: str, prune_sections: List[str], context_options: Optional[dict]):
+    """Like _install_fleet, printing the JSON result document with one entry per target."""
+    from .fleet import install_targets
+    from .report import json_report
+
+    with json_report("install all") as report:
+        if not homes:
+            report.fail("No target home directories match.")
+        results = install_targets(homes, COMPONENTS, workers=workers, staged=staged, link_mode=link_mode,
+                                  offline=offline, refresh_cache=refresh_cache, profile=profile,
+                                  prune_sections=prune_sections, context_options=context_options) if homes else []
+        targets = []
+        for result in results:
+            target = {"home": str(result.home), "ok": result.ok, "components": {},
+                      "duration_ms": round(result.duration * 1000, 1)}
+            if result.error:
+                target["error"] = result.error
+                report.ok = False
+            for component, synced in result.components.items():
+                target["components"][component] = (
+                    {"copied": synced.copied, "skipped": synced.skipped, "removed": synced.removed}
+                    if synced is not None else {}
+                )
+            targets.append(target)
+        report.fields["targets"] = targets
+    _emit_report(report)
+
+@install_app.command("all")
+def install_all_cmd(offline: OfflineOption = False, refresh_cache: RefreshCacheOption = False,
+                    staged: StagedOption = False, link_mode: LinkModeOption = LinkMode.copy,
+                    profile: ProfileOption = Profile.full, prune_sections: PruneSectionOption = None,
+                    modes: ModeOption = None, context_budget: ContextBudgetOption = None,
+                    priorities: PriorityOption = None, context_sections: ContextSectionsOption = False,
+                    context_layout: ContextLayoutOption = ContextLayout.append,
+                    targets: Annotated[Optional[str], typer.Option(
+                        "--targets", help="Install into many home directories at once: a glob such as "
+                                          "'/home/*' or a file listing one home directory or glob per line.")] = None,
+                    workers: Annotated[int, typer.Option(
+                        "--workers", min=1, help="Number of targets installed concurrently with --targets.")] = 8,
+                    output: OutputOption = OutputFormat.table):
+    """Install all framework components."""
+    context_options = _context_options(modes, context_budget, priorities, context_sections, context_layout)
+    if output != OutputFormat.json:
+        _check_context(context_options)
+    if targets:
+        _install_fleet(targets, workers, staged, link_mode.value, offline, refresh_cache,
+                       profile.value, prune_sections or [], context_options, output)
+        return
+    if output == OutputFormat.json:
+        _install_report("install all", COMPONENTS, offline=offline, refresh_cache=refresh_cache, staged=staged,
+                        link_mode=link_mode.value, profile=profile.value, prune_sections=prune_sections,
+                        context_options=context_options)
+        return
+
+    from . import ui
+    from .installer import INSTALL_MAP, write_indexes
+    ui.display_header("SuperQwen Installer", "Installing All Components")
+
+    total_components = len(COMPONENTS)
+    for i, component in enumerate(COMPONENTS, 1):
+        ui.display_step(i, total_components, f"Installing {component}...")
+
+        # Create a progress bar with a dummy total, the installer function will set the real total.
+        progress_bar = ui.ProgressBar(1, prefix=f"{component.capitalize()}: ")
+        if component == "mcp":
+            options = {"offline": offline, "refresh_cache": refresh_cache}
+        elif component == "context":
+            options = context_options
+        else:
+            options = _file_options(component, staged, link_mode.value, profile.value, prune_sections or [])
+        INSTALL_MAP[component](progress_bar=progress_bar, **options) # Pass the progress bar
+        progress_bar.finish()
+    write_indexes()
+
+    ui.display_success("\n✅ All components installed successfully!")
+
+@install_app.command("commands")
+def install_commands_cmd(staged: StagedOption = False, link_mode: LinkModeOption = LinkMode.copy,
+                         profile: ProfileOption = Profile.full, prune_sections: PruneSectionOption = None,
+                         output: OutputOption = OutputFormat.table):
+    """Install only the Commands."""
+    if output == OutputFormat.json:
+        _install_report("install commands", ["commands"], staged=staged, link_mode=link_mode.value,
+                        profile=profile.value, prune_sections=prune_sections)
+        return
+    from . import ui
+    from .installer import INSTALL_MAP, write_indexes
+    INSTALL_MAP["commands"](staged=staged, link_mode=link_mode.value, profile=profile.value,
+                            prune_sections=prune_sections or [])
+    write_indexes()
+    ui.display_success("Commands installed.")
+
+@install_app.command("modes")
+def install_modes_cmd(staged: StagedOption = False, link_mode: LinkModeOption = LinkMode.copy,
+                      output: OutputOption = OutputFormat.table):
+    """Install only the Modes."""
+    if output == OutputFormat.json:
+        _install_report("install modes", ["modes"], staged=staged, link_mode=link_mode.value)
+        return
+    from . import ui
+    from .installer import INSTALL_MAP, write_indexes
+    INSTALL_MAP["modes"](staged=staged, link_mode=link_mode.value)
+    write_indexes()
+    ui.display_success("Modes installed.")
+
+@install_app.command("agents")
+def install_agents_cmd(staged: StagedOption = False, link_mode: LinkModeOption = LinkMode.copy,
+                       profile: ProfileOption = Profile.full, prune_sections: PruneSectionOption = None,
+                       output: OutputOption = OutputFormat.table):
+    """Install only the Agents."""
+    if output == OutputFormat.json:
+        _install_report("install agents", ["agents"], staged=staged, link_mode=link_mode.value,
+                        profile=profile.value, prune_sections=prune_sections)
+        return
+    from . import ui
+    from .installer import INSTALL_MAP, write_indexes
+    INSTALL_MAP["agents"](staged=staged, link_mode=link_mode.value, profile=profile.value,
+                          prune_sections=prune_sections or [])
+    write_indexes()
+    ui.display_success("Agents installed.")
+
+@install_app.command("mcp")
+def install_mcp_cmd(
+    offline: OfflineOption = False,
+    refresh_cache: RefreshCacheOption = False,
+    servers: Annotated[Optional[List[str]], typer.Option(
+        "--server", "-s", help="MCP server to install (repeatable), e.g. context7, playwright. Defaults to serena, context7 and sequential.")] = None,
+    output: OutputOption = OutputFormat.table,
+):
+    """Install only the MCP Config."""
+    if output == OutputFormat.json:
+        _install_report("install mcp", ["mcp"], offline=offline, refresh_cache=refresh_cache, servers=servers)
+        return
+    from . import ui
+    from .installer import INSTALL_MAP
+    INSTALL_MAP["mcp"](offline=offline, refresh_cache=refresh_cache, servers=servers)
+    ui.display_success("MCP Config installed.")
+
+@install_app.command("context")
+def install_context_cmd(modes: ModeOption = None, context_budget: ContextBudgetOption = None,
+                        priorities: PriorityOption = None, context_sections: ContextSectionsOption = False,
+                        context_layout: ContextLayoutOption = ContextLayout.append,
+                        output: OutputOption = OutputFormat.table):
+    """Compose Core, Modes and the docs of the configured MCP servers into ~/.qwen/QWEN.md."""
+    context_options = _context_options(modes, context_budget, priorities, context_sections, context_layout)
+    if output == OutputFormat.json:
+        _install_report("install context", ["context"], context_options=context_options)
+        return
+    from . import ui
+    _check_context(context_options)
+    from .installer import INSTALL_MAP
+    INSTALL_MAP["context"](**context_options)
+    ui.display_success("Context installed.")
+
+# --- Uninstall Commands ---
+
+@uninstall_app.callback(invoke_without_command=True)
+def uninstall_main(ctx: typer.Context):
+    """
+    Uninstall SuperQwen components. Run without a subcommand for an interactive menu.
+    """
+    if ctx.invoked_subcommand is None:
+        from .interactive import handle_interactive_uninstall
+        handle_interactive_uninstall()
+
+@uninstall_app.command("all")
+def uninstall_all_cmd(output: OutputOption = OutputFormat.table):
+    """Uninstall all framework components."""
+    if output == OutputFormat.json:
+        _uninstall_report("uninstall all", COMPONENTS)
+        return
+    from . import ui
+    from .uninstaller import UNINSTALL_MAP
+    ui.display_header("SuperQwen Uninstaller", "Uninstalling All Components")
+
+    total_components = len(COMPONENTS)
+    for i, component in enumerate(COMPONENTS, 1):
+        ui.display_step(i, total_components, f"Uninstalling {component}...")
+
+        # The uninstaller sets the real total and advances the bar per removed file.
+        progress_bar = ui.ProgressBar(1, prefix=f"{component.capitalize()}: ")
+        UNINSTALL_MAP[component](progress_bar=progress_bar)
+        progress_bar.finish()
+
+    ui.display_success("\n✅ All components uninstalled successfully!")
+
+@uninstall_app.command("commands")
+def uninstall_commands_cmd(output: OutputOption = OutputFormat.table):
+    """Uninstall only the Commands."""
+    if output == OutputFormat.json:
+        _uninstall_report("uninstall commands", ["commands"])
+        return
+    from . import ui
+    from .uninstaller import UNINSTALL_MAP
+    UNINSTALL_MAP["commands"]()
+    ui.display_success("Commands uninstalled.")
+
+@uninstall_app.command("modes")
+def uninstall_modes_cmd(output: OutputOption = OutputFormat.table):
+    """Uninstall only the Modes."""
+    if output == OutputFormat.json:
+        _uninstall_report("uninstall modes", ["modes"])
+        return
+    from . import ui
+    from .uninstaller import UNINSTALL_MAP
+    UNINSTALL_MAP["modes"]()
+    ui.display_success("Modes uninstalled.")
+
+@uninstall_app.command("agents")
+def uninstall_agents_cmd(output: OutputOption = OutputFormat.table):
+    """Uninstall only the Agents."""
+    if output == OutputFormat.json:
+        _uninstall_report("uninstall agents", ["agents"])
+        return
+    from . import ui
+    from .uninstaller import UNINSTALL_MAP
+    UNINSTALL_MAP["agents"]()
+    ui.display_success("Agents uninstalled.")
+
+@uninstall_app.command("mcp")
+def uninstall_mcp_cmd(output: OutputOption = OutputFormat.table):
+    """Uninstall only the MCP Config."""
+    if output == OutputFormat.json:
+        _uninstall_report("uninstall mcp", ["mcp"])
+        return
+    from . import ui
+    from .uninstaller import UNINSTALL_MAP
+    UNINSTALL_MAP["mcp"]()
+    ui.display_success("MCP Config uninstalled.")
+
+@uninstall_app.command("context")
+def uninstall_context_cmd(output: OutputOption = OutputFormat.table):
+    """Remove the SuperQwen context from ~/.qwen/QWEN.md."""
+    if output == OutputFormat.json:
+        _uninstall_report("uninstall context", ["context"])
+        return
+    from . import ui
+    from .uninstaller import UNINSTALL_MAP
+    UNINSTALL_MAP["context"]()
+    ui.display_success("Context uninstalled.")
+
+CORE_COMMANDS = [
+    ("install", "Install framework components (run interactively)."),
+    ("install all", "Install all components non-interactively."),
+    ("uninstall", "Uninstall framework components (run interactively)."),
+    ("uninstall all", "Uninstall all components non-interactively."),
+    ("update", "Update the SuperQwen package to the latest version."),
+    ("search", "Search the bundled prompts, e.g. superqwen search threat model."),
+    ("route", "Suggest agents for a task, e.g. superqwen route \"audit auth for XSS\"."),
+    ("list", "List the bundled commands, agents, modes, Core and MCP documents."),
+    ("stats", "Report the token cost of the bundled prompts."),
+    ("fingerprint", "Show which prefix of ~/.qwen/QWEN.md providers can cache across sessions."),
+    ("verify", "Check the installed files against this package version."),
+    ("help, --help, -h", "Show this help message."),
+    ("--version, -v", "Show the application's version and exit."),
+]
+
+@app.command()
+def help(output: OutputOption = OutputFormat.table):
+    """Show this message and exit."""
+    from .asset_index import list_entries
+
+    if output == OutputFormat.json:
+        from .report import json_report
+
+        with json_report("help") as report:
+            report.fields["commands"] = [
+                {"command": command, "description": description} for command, description in CORE_COMMANDS
+            ]
+            report.fields["slash_commands"] = [
+                {"command": f"/sq:{entry.name}", "description": entry.description, "category": entry.category}
+                for entry in list_entries("command")
+            ]
+        _emit_report(report)
+        return
+
+    from . import ui
+    ui.display_header("SuperQwen Framework", f"Version {__version__}")
+
+    ui.display_info("Usage: superqwen [OPTIONS] COMMAND [ARGS]...")
+
+    core_headers = ["Command", "Description"]
+    core_rows = [list(row) for row in CORE_COMMANDS]
+    ui.display_table(core_headers, core_rows, title="Core Commands")
+
+    sq_headers = ["Slash Command", "Description"]
+    sq_rows = [[f"/sq:{entry.name}", entry.description] for entry in list_entries("command")]
+    ui.display_table(sq_headers, sq_rows, title="Available /sq Commands")
+    ui.display_warning("Note: /sq commands do not accept flags. All text following the command is treated as a single prompt.")
+
+@app.command("list")
+def list_cmd(
+    kind: Annotated[Optional[str], typer.Argument(
+        help="Only list this kind: command, agent, mode, core or mcp.")] = None,
+    category: Annotated[Optional[str], typer.Option(
+        "--category", "-c", help="Only list assets of this category, e.g. quality.")] = None,
+):
+    """List the bundled commands, agents, modes, Core and MCP documents."""
+    from . import ui
+    from .asset_index import list_entries
+
+    try:
+        entries = list_entries(kind, category)
+    except ValueError as e:
+        ui.display_error(str(e))
+        raise typer.Exit(code=2)
+    if not entries:
+        ui.display_warning("Nothing matches.")
+        return
+    rows = [[entry.kind, entry.name, entry.category, entry.description] for entry in entries]
+    ui.display_table(["Kind", "Name", "Category", "Description"], rows, title="SuperQwen Assets")
+
+@app.command()
+def search(
+    query: Annotated[List[str], typer.Argument(help="Words to search for, e.g. 'threat model'.")],
+    kind: Annotated[Optional[str], typer.Option(
+        "--kind", "-k", help="Only return this kind: command, agent, mode, core or mcp.")] = None,
+    limit: Annotated[int, typer.Option("--limit", "-n", min=1, help="Maximum number of results.")] = 10,
+):
+    """Search the bundled commands, agents, modes, Core and MCP documents."""
+    import time
+    from . import ui
+    from .search_index import search as search_assets
+
+    start = time.perf_counter()
+    try:
+        results = search_assets(" ".join(query), kind=kind, limit=limit)
+    except ValueError as e:
+        ui.display_error(str(e))
+        raise typer.Exit(code=2)
+    elapsed = time.perf_counter() - start
+    if not results:
+        ui.display_warning(f"No matches for '{' '.join(query)}'.")
+        return
+    rows = [[i, r.key, r.section or "-", f"{r.score:.2f}", ui.truncate_text(r.description, 70)]
+            for i, r in enumerate(results, 1)]
+    ui.display_table(["#", "Asset", "Best Section", "Score", "Description"], rows, title="Search Results")
+    ui.display_info(f"{len(results)} results in {elapsed * 1000:.1f} ms.")
+
+@app.command("route")
+def route_cmd(
+    task: Annotated[List[str], typer.Argument(help="Task description, e.g. 'audit the login flow for XSS'.")],
+    limit: Annotated[int, typer.Option("--limit", "-n", min=1, help="Maximum number of agents.")] = 3,
+    min_score: Annotated[float, typer.Option("--min-score", help="Leave out agents scoring below this.")] = 0.0,
+    output: Annotated[OutputFormat, typer.Option(
+        "--output", "-o", help="table for people, json for wrapper tools.")] = OutputFormat.table,
+):
+    """Suggest the agents best suited to a task, from their Triggers and Focus Areas."""
+    from .router import route
+
+    routes = route(" ".join(task), limit=limit, min_score=min_score)
+    if output == OutputFormat.json:
+        import json
+        typer.echo(json.dumps([
+            {"agent": r.agent, "score": r.score, "description": r.description, "matched": r.matched}
+            for r in routes
+        ]))
+        return
+    from . import ui
+    if not routes:
+        ui.display_warning("No agent matches this task.")
+        return
+    rows = [[i, r.agent, f"{r.score:.3f}", ui.truncate_text(", ".join(r.matched), 50)]
+            for i, r in enumerate(routes, 1)]
+    ui.display_table(["#", "Agent", "Score", "Matched"], rows, title="Suggested Agents")
+
+@app.command()
+def verify(
+    components: Annotated[Optional[List[str]], typer.Option(
+        "--component", "-c", help="Only check this component (repeatable): commands, modes, agents, mcp, context.")] = None,
+    targets: Annotated[Optional[str], typer.Option(
+        "--targets", help="Check many home directories at once: a glob such as '/home/*' or a file "
+                          "listing one home directory or glob per line.")] = None,
+    workers: Annotated[int, typer.Option(
+        "--workers", min=1, help="Number of threads hashing files.")] = 16,
+    strict: Annotated[bool, typer.Option(
+        "--strict", help="Also fail on extra files: commands and agents this version does not ship.")] = False,
+    output: Annotated[OutputFormat, typer.Option(
+        "--output", "-o", help="table for people, json for scripts.")] = OutputFormat.table,
+):
+    """
+    Check the installed files against this package version.
+
+    Exits with status 1 if a file is missing or modified, if nothing is
+    installed, or with --strict if there are extra files.
+    """
+    import json
+    from .file_utils import QWEN_DIR
+    from .verifier import verify_installs
+
+    if targets:
+        from .fleet import resolve_targets
+        qwen_dirs = [home / ".qwen" for home in resolve_targets(targets)]
+        if not qwen_dirs:
+            from . import ui
+            ui.display_error(f"No target home directories match '{targets}'.")
+            raise typer.Exit(code=1)
+    else:
+        qwen_dirs = [QWEN_DIR]
+    try:
+        results = verify_installs(qwen_dirs, components, workers)
+    except ValueError as e:
+        from . import ui
+        ui.display_error(str(e))
+        raise typer.Exit(code=2)
+    ok = all(result.ok(strict) for result in results)
+
+    if output == OutputFormat.json:
+        typer.echo(json.dumps({"ok": ok, "targets": [
+            {"qwen_dir": str(r.qwen_dir), "ok": r.ok(strict), "components": r.components, "checked": r.checked,
+             "missing": r.missing, "modified": r.modified, "extra": r.extra, "error": r.error}
+            for r in results
+        ]}))
+        if not ok:
+            raise typer.Exit(code=1)
+        return
+
+    from . import ui
+    rows = [[str(r.qwen_dir), ", ".join(r.components) or "nothing installed", r.checked,
+             len(r.missing), len(r.modified), len(r.extra), "ok" if r.ok(strict) else "failed"] for r in results]
+    ui.display_table(["Qwen Directory", "Components", "Checked", "Missing", "Modified", "Extra", "Status"], rows,
+                     title="Installed Files")
+    problems = [[str(r.qwen_dir), status, path] for r in results
+                for status, paths in (("missing", r.missing), ("modified", r.modified), ("extra", r.extra))
+                for path in paths]
+    if problems:
+        ui.display_table(["Qwen Directory", "Status", "File"], problems, title="Differences")
+    for result in results:
+        if result.error:
+            ui.display_error(f"{result.qwen_dir}: {result.error}")
+    if not ok:
+        ui.display_error("Run `superqwen install` to restore missing and modified files.")
+        raise typer.Exit(code=1)
+    ui.display_success(f"✅ All {sum(r.checked for r in results)} installed files match SuperQwen {__version__}.")
+
+@app.command()
+def fingerprint(
+    against: Annotated[Optional[Path], typer.Option(
+        "--against", help="A report saved with --output json, e.g. from another session or machine, "
+                          "to compare the prefix with.")] = None,
+    output: Annotated[OutputFormat, typer.Option(
+        "--output", "-o", help="table for people, json to save and compare later.")] = OutputFormat.table,
+):
+    """Show which prefix of ~/.qwen/QWEN.md providers can cache across sessions."""
+    import json
+    from .context import CONTEXT_FILENAME, cacheable_prefix, prefix_fingerprint, read_context
+    from .file_utils import QWEN_DIR
+
+    context_file = QWEN_DIR / CONTEXT_FILENAME
+    try:
+        segments = prefix_fingerprint(read_context(context_file))
+    except ValueError as e:
+        from . import ui
+        ui.display_error(str(e))
+        raise typer.Exit(code=1)
+    if not segments:
+        from . import ui
+        ui.display_error(f"No context file at {context_file}; run `superqwen install context` first.")
+        raise typer.Exit(code=1)
+    total = sum(segment.size for segment in segments)
+    cacheable = cacheable_prefix(segments)
+
+    shared = None
+    if against is not None:
+        try:
+            other = json.loads(against.read_text(encoding="utf-8"))["segments"]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            from . import ui
+            ui.display_error(f"Cannot read the fingerprint report {against}: {e}")
+            raise typer.Exit(code=2)
+        # A segment's digest covers everything before it, so the last match ends the shared prefix.
+        other_digests = {entry.get("prefix_digest") for entry in other}
+        shared = max((s.offset + s.size for s in segments if s.prefix_digest in other_digests), default=0)
+
+    if output == OutputFormat.json:
+        data = {"file": str(context_file), "bytes": total, "cacheable_prefix_bytes": cacheable,
+                "segments": [vars(segment) for segment in segments]}
+        if shared is not None:
+            data["shared_prefix_bytes"] = shared
+        typer.echo(json.dumps(data))
+        return
+
+    from . import ui
+    rows = [[i, ui.truncate_text(s.source, 40), s.offset, s.size, s.prefix_digest[:12], "yes" if s.volatile else ""]
+            for i, s in enumerate(segments, 1)]
+    ui.display_table(["#", "Segment", "Offset", "Bytes", "Prefix SHA-256", "Volatile"], rows,
+                     title=f"Prefix Fingerprint of {context_file}")
+    ui.display_info(f"Cacheable prefix: {cacheable} of {total} bytes ({cacheable / total:.1%}).")
+    if segments[0].volatile and any(s.source == "begin marker" for s in segments):
+        ui.display_warning("The file starts with text that changes between installs; "
+                           "`superqwen install context --context-layout stable` moves it to the end.")
+    if shared is not None:
+        ui.display_info(f"Shared with {against}: {shared} of {total} bytes ({shared / total:.1%}).")
+
+@app.command()
+def update(
+    index_url: Annotated[str, typer.Option(
+        "--index-url", help="Package index to check and upgrade from, e.g. a local mirror.")] = "https://pypi.org/simple",
+    find_links: Annotated[Optional[Path], typer.Option(
+        "--find-links", help="Directory of SuperQwen wheels or sdists to check and upgrade from.")] = None,
+    offline: Annotated[bool, typer.Option(
+        "--offline", help="Do not contact the index: compare with its cached answer, and with --find-links "
+                          "upgrade from that directory only.")] = False,
+    refresh_cache: Annotated[bool, typer.Option(
+        "--refresh-cache", help="Ask the index again even if its cached answer is recent.")] = False,
+    check: Annotated[bool, typer.Option(
+        "--check", help="Only report whether a newer version is available.")] = False,
+    sync: Annotated[bool, typer.Option(
+        "--sync/--no-sync", help="After an upgrade, re-install the installed components from the new version.")] = True,
+    output: OutputOption = OutputFormat.table,
+):
+    """
+    Update the SuperQwen package to the latest version from PyPI.
+    """
+    import subprocess
+    from .logging import logger
+    from .tracing import span
+    from .updater import check_for_update, pip_command, resync_commands
+
+    if output == OutputFormat.json:
+        _update_report(index_url, find_links, offline, refresh_cache, check, sync)
+        return
+
+    from . import ui
+    ui.display_info("🚀 Checking for updates...")
+    try:
+        with span("update.check", index_url=index_url):
+            found = check_for_update(index_url, find_links, offline, refresh_cache)
+    except ValueError as e:
+        ui.display_error(str(e))
+        raise typer.Exit(code=2)
+    except OSError as e:
+        ui.display_error(f"Could not reach {index_url}: {e}")
+        raise typer.Exit(code=1)
+    cached = " (cached)" if found.cached else ""
+    if found.current:
+        ui.display_success(f"✅ SuperQwen {found.installed} is up to date "
+                           f"(latest on {found.source}: {found.latest or 'none'}{cached}).")
+        return
+    if check:
+        ui.display_info(f"SuperQwen {found.latest} is available, {found.installed} is installed{cached}.")
+        return
+    if offline and find_links is None:
+        ui.display_error(f"SuperQwen {found.latest} is available, but installing it offline needs --find-links.")
+        raise typer.Exit(code=1)
+
+    command = pip_command(index_url, find_links, offline)
+    spinner = ui.StatusSpinner(f"Upgrading SuperQwen {found.installed} -> {found.latest}...")
+    spinner.start()
+    try:
+        with span("subprocess.pip", command=" ".join(command[1:])):
+            result = subprocess.run(command, capture_output=True, text=True, check=True)
+        logger.info(result.stdout)
+        spinner.stop()
+        ui.display_success(f"✅ SuperQwen updated to {found.latest}!")
+    except subprocess.CalledProcessError as e:
+        logger.error("Update failed!")
+        logger.error(e.stderr)
+        spinner.stop()
+        ui.display_error("❌ Update failed. See logs for details.")
+        raise typer.Exit(code=e.returncode)
+
+    if not sync:
+        return
+    for component, resync in resync_commands():
+        ui.display_info(f"Syncing {component} from SuperQwen {found.latest}...")
+        with span("subprocess.resync", component=component):
+            if subprocess.run(resync).returncode != 0:
+                ui.display_error(f"❌ Syncing {component} failed; run `superqwen install {component}` again.")
+                raise typer.Exit(code=1)
+
+def _update_report(index_url: str, find_links: Optional[Path], offline: bool, refresh_cache: bool,
+                   check: bool, sync: bool):
+    """Like update, printing the JSON result document."""
+    import json
+    import subprocess
+    from .report import json_report
+    from .tracing import span
+    from .updater import check_for_update, pip_command, resync_commands
+
+    with json_report("update") as report:
+        with span("update.check", index_url=index_url):
+            found = check_for_update(index_url, find_links, offline, refresh_cache)
+        report.fields.update(installed_version=found.installed, latest_version=found.latest,
+                             source=found.source, cached=found.cached, updated=False)
+        if found.current or check:
+            pass
+        elif offline and find_links is None:
+            report.fail(f"SuperQwen {found.latest} is available, but installing it offline needs --find-links.")
+        else:
+            command = pip_command(index_url, find_links, offline)
+            with span("subprocess.pip", command=" ".join(command[1:])):
+                result = subprocess.run(command, capture_output=True, text=True)
+            report.fields["pip_returncode"] = result.returncode
+            if result.returncode != 0:
+                report.fail(result.stderr.strip() or "pip install --upgrade SuperQwen failed.")
+            else:
+                report.fields["updated"] = True
+                for component, resync in (resync_commands(output_json=True) if sync else []):
+                    with span("subprocess.resync", component=component):
+                        synced = subprocess.run(resync, capture_output=True, text=True)
+                    try:
+                        document = json.loads(synced.stdout)
+                    except ValueError:
+                        document = {"ok": False, "messages": [{"level": "ERROR", "message": synced.stderr.strip()}]}
+                    report.components.update(document.get("components", {}))
+                    report.messages.extend(document.get("messages", []))
+                    if not document.get("ok"):
+                        report.fail(f"Syncing {component} failed.")
+    _emit_report(report, code=report.fields.get("pip_returncode") or 1)
+
+def _display_duplicates(token_stats, tokenizer: str, similarity: float) -> None:
+    """Prints the fragment usage and duplication tables for `superqwen stats --duplicates`."""
+    from . import ui
+    usage = token_stats.fragment_usage(tokenizer)
+    if usage:
+        ui.display_table(
+            ["Include", "Tokens", "Used By", "Saved"],
+            [[u.ref, u.tokens, ", ".join(sorted(u.used_by)), u.saved_tokens] for u in usage],
+            title="Shared Fragments",
+        )
+    found = token_stats.find_duplicates(tokenizer, similarity=similarity)
+    if found:
+        ui.display_table(
+            ["Block", "Tokens", "Similarity", "Found In", "Redundant"],
+            [[ui.truncate_text(d.preview, 50), d.tokens, f"{d.similarity:.0%}", ", ".join(d.locations),
+              d.redundant_tokens] for d in found],
+            title="Repeated Blocks",
+        )
+        ui.display_info("Move repeated blocks into SuperQwen/Fragments and reference them with "
+                        "{{include fragment/NAME}}.")
+    else:
+        ui.display_success(f"No blocks are repeated at {similarity:.0%} similarity or more.")
+
+@app.command()
+def stats(
+    tokenizer: Annotated[str, typer.Option(
+        "--tokenizer", help="Tokenizer spec: approx (default), chars, tiktoken[:ENCODING] or hf:PATH/tokenizer.json.")] = "approx",
+    kinds: Annotated[Optional[List[str]], typer.Option(
+        "--kind", "-k", help="Only count this asset kind (repeatable): command, agent, mode, core, mcp.")] = None,
+    baseline: Annotated[Optional[Path], typer.Option(
+        "--baseline", help="Baseline to compare against. Defaults to the one shipped with the package.")] = None,
+    save_baseline: Annotated[Optional[Path], typer.Option(
+        "--save-baseline", help="Write the current counts to this file as a new baseline.")] = None,
+    tolerance: Annotated[float, typer.Option(
+        "--tolerance", help="Percent growth per asset allowed before it counts as a regression.")] = 0.0,
+    max_total: Annotated[Optional[int], typer.Option(
+        "--max-total", help="Fail if the total token count exceeds this budget.")] = None,
+    check: Annotated[bool, typer.Option(
+        "--check", help="Exit with status 1 on regressions or when --max-total is exceeded.")] = False,
+    profile: Annotated[str, typer.Option(
+        "--profile", help="Count the prompts as installed with this profile: full or compact.")] = "full",
+    duplicates: Annotated[bool, typer.Option(
+        "--duplicates", help="Also report shared fragment usage and blocks repeated across the sources.")] = False,
+    similarity: Annotated[float, typer.Option(
+        "--similarity", help="With --duplicates, the share of word 3-grams two blocks must have in common.")] = 0.8,
+):
+    """Report the token cost of the bundled prompts and compare it with a baseline."""
+    from . import ui
+    from . import stats as token_stats
+
+    try:
+        results = token_stats.collect_stats(tokenizer, kinds, profile)
+    except ValueError as e:
+        ui.display_error(str(e))
+        raise typer.Exit(code=2)
+
+    baseline_data = token_stats.load_baseline(baseline)
+    if baseline_data and baseline_data.get("tokenizer") != tokenizer:
+        ui.display_warning(f"Baseline was made with the '{baseline_data.get('tokenizer')}' tokenizer, not comparing.")
+        baseline_data = None
+    baseline_tokens = baseline_data.get("tokens", {}) if baseline_data else {}
+
+    rows = []
+    for item in sorted(results, key=lambda s: s.tokens, reverse=True):
+        row = [item.key, item.lines, item.chars, item.tokens]
+        if baseline_data:
+            before = baseline_tokens.get(item.key)
+            row.append("new" if before is None else f"{item.tokens - before:+d}")
+        rows.append(row)
+    headers = ["Asset", "Lines", "Chars", "Tokens"] + (["vs Baseline"] if baseline_data else [])
+    ui.display_table(headers, rows, title=f"Prompt Token Usage ({tokenizer}, {profile} profile)")
+
+    totals = token_stats.totals_by_kind(results)
+    total = sum(totals.values())
+    ui.display_table(["Kind", "Tokens"], [[kind, tokens] for kind, tokens in totals.items()] + [["total", total]],
+                     title="Totals")
+
+    failed = False
+    if baseline_data:
+        regressions = token_stats.compare_to_baseline(results, baseline_data, tolerance)
+        if regressions:
+            failed = True
+            ui.display_table(
+                ["Asset", "Baseline", "Current", "Growth"],
+                [[r.key, r.baseline, r.current, f"{r.increase_pct:.1f}%"] for r in regressions],
+                title="Regressions",
+            )
+        else:
+            ui.display_success(f"No asset grew by more than {tolerance:g}% against the baseline.")
+    if max_total is not None and total > max_total:
+        failed = True
+        ui.display_error(f"Total of {total} tokens exceeds the budget of {max_total}.")
+
+    if duplicates:
+        _display_duplicates(token_stats, tokenizer, similarity)
+
+    if save_baseline:
+        token_stats.save_baseline(results, save_baseline, tokenizer)
+        ui.display_success(f"Baseline written to {save_baseline}.")
+
+    if check and failed:
+        raise typer.Exit(code=1)
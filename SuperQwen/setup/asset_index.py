@@ -0,0 +1,193 @@
+"""
+Parsed index of the bundled prompt assets
+
+Parses the TOML fields and YAML frontmatter of every command, agent, mode,
+Core and MCP document once and caches the result in
+~/.qwen/.superqwen/asset-index.json. The cache is keyed by the package
+version and the digests the asset bundle records for the source files, or
+without a bundle their sizes and mtimes, so a cache hit reads no asset and
+a later CLI invocation only re-parses after the package changed. It powers
+`superqwen help` and `superqwen list`. Nothing is cached while ~/.qwen does
+not exist.
+"""
+
+import hashlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .. import __version__
+from .assets import ASSET_KINDS, PromptAsset, load_prompt_assets, parse_frontmatter
+from .bundle import load_bundle
+from .file_utils import QWEN_DIR, STATE_DIRNAME, get_package_files, package_folder
+
+INDEX_VERSION = 1
+INDEX_FILENAME = "asset-index.json"
+
+_TITLE = re.compile(r'^#\s+(.+?)\s*$', re.MULTILINE)
+_LABEL = re.compile(r'^\*\*[^*]+\*\*:\s*')
+_MARKUP = re.compile(r'[*_`]')
+
+
+@dataclass
+class IndexEntry:
+    """Metadata of one prompt asset."""
+    kind: str
+    name: str
+    filename: str
+    title: str
+    description: str
+    category: str = ''
+    digest: str = ''
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.kind}/{self.name}"
+
+
+def _summary(body: str) -> str:
+    """Returns the first paragraph after the title, without its label ('**Purpose**:') and markup."""
+    for paragraph in re.split(r'\n\s*\n', body):
+        paragraph = paragraph.strip()
+        if not paragraph or paragraph.startswith(("#", "---", "```", "|", "-")):
+            continue
+        return _MARKUP.sub("", _LABEL.sub("", " ".join(paragraph.split())))
+    return ''
+
+
+def _to_entry(asset: PromptAsset) -> IndexEntry:
+    _metadata, body = parse_frontmatter(asset.text)
+    title = _TITLE.search(body)
+    return IndexEntry(
+        kind=asset.kind,
+        name=asset.name,
+        filename=asset.filename,
+        title=title.group(1) if title else asset.name,
+        description=asset.metadata.get("description") or _summary(body),
+        category=asset.metadata.get("category", ''),
+        digest=asset.digest,
+        metadata=dict(asset.metadata),
+    )
+
+
+@lru_cache(maxsize=None)
+def index_key() -> str:
+    """
+    Identifies the current package contents without reading them.
+
+    Combines the package version with, for every indexed file, the digest
+    recorded in the asset bundle or, without a bundle, its size and mtime.
+    """
+    digest = hashlib.sha256(__version__.encode("utf-8"))
+    bundle = load_bundle()
+    # Commands are indexed as rendered, so their fragments count too.
+    for subfolder in [subfolder for subfolder, _suffix in ASSET_KINDS.values()] + ["fragments"]:
+        if bundle is not None:
+            folder = package_folder(subfolder)
+            for name in bundle.names(folder):
+                digest.update(f"{folder}/{name}:{bundle.files[f'{folder}/{name}'][2]}\n".encode("utf-8"))
+            continue
+        for file in get_package_files(subfolder):
+            if isinstance(file, Path):
+                file_stat = file.stat()
+                token = f"{file_stat.st_size}:{file_stat.st_mtime_ns}"
+            else:
+                token = hashlib.sha256(file.read_bytes()).hexdigest()
+            digest.update(f"{subfolder}/{file.name}:{token}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_index() -> List[IndexEntry]:
+    """Parses every bundled prompt asset into an index entry."""
+    return [_to_entry(asset) for asset in load_prompt_assets()]
+
+
+def _cache_path(root: Path) -> Path:
+    return root / STATE_DIRNAME / INDEX_FILENAME
+
+
+def read_cache(path: Path, version_field: str, version: int, key: str) -> Optional[dict]:
+    """
+    Reads a JSON cache written by write_cache().
+
+    Returns:
+        The cached data, or None if it is missing, unreadable, of another
+        format version or built for other package contents than key
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return None
+    if data.get(version_field) != version or data.get("key") != key:
+        return None
+    return data
+
+
+def write_cache(path: Path, data: dict) -> None:
+    """
+    Writes a JSON cache under the state directory of a Qwen directory, atomically.
+
+    The state directory is created if needed, but the Qwen directory is not:
+    nothing is written before SuperQwen is installed.
+
+    Raises:
+        OSError: If the Qwen directory does not exist or is not writable
+    """
+    path.parent.mkdir(exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def load_index(root: Path = QWEN_DIR) -> List[IndexEntry]:
+    """
+    Returns the asset index, from the cache under root if it matches the package.
+
+    Args:
+        root: Qwen directory holding the cache
+
+    Returns:
+        Index entries in kind order (commands, agents, modes, core, mcp), then by file name
+    """
+    key = index_key()
+    path = _cache_path(root)
+    data = read_cache(path, "index_version", INDEX_VERSION, key)
+    if data is not None:
+        try:
+            return [IndexEntry(**entry) for entry in data.get("entries", [])]
+        except TypeError:
+            pass
+    entries = build_index()
+    try:
+        write_cache(path, {
+            "index_version": INDEX_VERSION,
+            "package_version": __version__,
+            "key": key,
+            "entries": [asdict(entry) for entry in entries],
+        })
+    except OSError:
+        pass  # A read-only Qwen directory just means no cache.
+    return entries
+
+
+def list_entries(kind: Optional[str] = None, category: Optional[str] = None,
+                 root: Path = QWEN_DIR) -> List[IndexEntry]:
+    """
+    Returns the index entries of one kind and/or category (all by default).
+
+    Raises:
+        ValueError: If an unknown kind is requested
+    """
+    if kind is not None and kind not in ASSET_KINDS:
+        raise ValueError(f"Unknown asset kind '{kind}', expected one of {', '.join(ASSET_KINDS)}.")
+    return [
+        entry for entry in load_index(root)
+        if (kind is None or entry.kind == kind) and (category is None or entry.category == category)
+    ]
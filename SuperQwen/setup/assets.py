@@ -0,0 +1,133 @@
+"""
+Prompt assets bundled with SuperQwen
+
+Enumerates the Commands, Agents, Modes, Core and MCP documents as the text
+a model actually sees: the `prompt` field of a command TOML, or the
+markdown of everything else, together with their metadata (TOML fields or
+YAML frontmatter). Commands are taken with their includes rendered, as
+installed. Everything is read through load_assets(), so the package is only
+read once per process.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .file_utils import Asset, load_assets
+
+try:
+    import tomllib
+except ImportError:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+# Asset kind -> (package subfolder, file suffix)
+ASSET_KINDS: Dict[str, Tuple[str, str]] = {
+    "command": ("commands", ".toml"),
+    "agent": ("agents", ".md"),
+    "mode": ("modes", ".md"),
+    "core": ("core", ".md"),
+    "mcp": ("mcp", ".md"),
+}
+
+_TOML_MULTILINE = re.compile(r'^(\w[\w-]*)\s*=\s*"""(.*?)"""', re.DOTALL | re.MULTILINE)
+_TOML_BASIC = re.compile(r'^(\w[\w-]*)\s*=\s*"((?:[^"\\]|\\.)*)"\s*$', re.MULTILINE)
+_FRONTMATTER = re.compile(r'\A---\s*\n(.*?)\n---\s*\n', re.DOTALL)
+
+
+@dataclass(frozen=True)
+class PromptAsset:
+    """One bundled prompt document."""
+    kind: str
+    name: str
+    filename: str
+    text: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+    digest: str = ''
+
+    @property
+    def key(self) -> str:
+        """Stable identifier such as 'command/analyze' or 'agent/python-expert'."""
+        return f"{self.kind}/{self.name}"
+
+
+def parse_command_toml(text: str) -> Dict[str, str]:
+    """
+    Parses a command TOML file.
+
+    Uses tomllib (or tomli) when available; otherwise falls back to a small
+    parser that understands the `key = "..."` and `key = \"\"\"...\"\"\"`
+    strings the bundled commands are written in.
+    """
+    if tomllib is not None:
+        return {k: v for k, v in tomllib.loads(text).items() if isinstance(v, str)}
+
+    values = {}
+    for key, value in _TOML_MULTILINE.findall(text):
+        values[key] = value[1:] if value.startswith("\n") else value
+    for key, value in _TOML_BASIC.findall(text):
+        values.setdefault(key, bytes(value, "utf-8").decode("unicode_escape"))
+    return values
+
+
+def parse_frontmatter(text: str) -> Tuple[Dict[str, str], str]:
+    """
+    Splits YAML frontmatter of simple `key: value` lines from a markdown document.
+
+    Returns:
+        A (metadata, body) tuple; metadata is empty if there is no frontmatter
+    """
+    match = _FRONTMATTER.match(text)
+    if not match:
+        return {}, text
+    metadata = {}
+    for line in match.group(1).splitlines():
+        key, sep, value = line.partition(":")
+        if sep and key.strip():
+            metadata[key.strip()] = value.strip().strip("'\"")
+    return metadata, text[match.end():]
+
+
+def _to_prompt_asset(kind: str, asset: Asset) -> PromptAsset:
+    text = asset.data.decode("utf-8")
+    name = asset.name.rsplit(".", 1)[0]
+    if kind == "command":
+        fields = parse_command_toml(text)
+        prompt = fields.pop("prompt", "")
+        # Many command prompts open with their own frontmatter (category, agents, ...).
+        frontmatter, _body = parse_frontmatter(prompt)
+        return PromptAsset(kind, name, asset.name, prompt, {**frontmatter, **fields}, asset.digest)
+    metadata, _body = parse_frontmatter(text)
+    return PromptAsset(kind, name, asset.name, text, metadata, asset.digest)
+
+
+def load_prompt_assets(kinds: Optional[Iterable[str]] = None, profile: str = "full") -> List[PromptAsset]:
+    """
+    Returns the bundled prompt documents of the given kinds (all kinds by default).
+
+    With profile "compact", commands and agents are the minified variants
+    installed by --profile compact.
+
+    Raises:
+        ValueError: If an unknown kind or profile is requested
+    """
+    from .compact import COMPACT_COMPONENTS, PROFILES, compact_assets
+    from .prompt_compiler import compile_commands
+
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}', expected one of {', '.join(PROFILES)}.")
+    prompt_assets = []
+    for kind in (kinds or ASSET_KINDS):
+        if kind not in ASSET_KINDS:
+            raise ValueError(f"Unknown asset kind '{kind}', expected one of {', '.join(ASSET_KINDS)}.")
+        subfolder, suffix = ASSET_KINDS[kind]
+        if profile != "full" and subfolder in COMPACT_COMPONENTS:
+            sources = compact_assets(subfolder)
+        elif kind == "command":
+            sources = compile_commands()
+        else:
+            sources = load_assets(subfolder, suffix)
+        prompt_assets.extend(_to_prompt_asset(kind, asset) for asset in sources)
+    return prompt_assets
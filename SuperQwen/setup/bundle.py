@@ -0,0 +1,220 @@
+"""
+Precompiled asset bundle
+
+At build time every data file of the package (Commands, Modes, Agents,
+Core, Fragments, MCP and Config) is packed into one file,
+SuperQwen/assets.bundle:
+
+    MAGIC (8 bytes) | index length (4 bytes, big endian) | JSON index | file data
+
+The index maps each 'Folder/name' to the offset of its data (counted from
+the end of the index), its size, SHA-256 and mtime. load_assets() reads
+the bundle with one open and mmap instead of listing and reading every
+file through importlib.resources, which matters most when the package is
+zipped, and takes the digests from the index instead of hashing.
+
+Build the bundle into a source checkout with:
+
+    python -m SuperQwen.setup.bundle [--output PATH]
+
+Wheels get it from setup.py's build_py step. A bundle made for another
+package version is ignored, and SUPERQWEN_NO_BUNDLE=1 disables it. A
+bundle built in a checkout also records the mtimes of the data folders and
+is ignored as soon as a data file is edited, added or removed.
+"""
+
+import hashlib
+import importlib.resources
+import json
+import mmap
+import os
+import struct
+import sys
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .. import __version__
+
+BUNDLE_FILENAME = "assets.bundle"
+BUNDLE_MAGIC = b"SQBNDL01"
+BUNDLE_VERSION = 2
+# Package folders packed into the bundle; subfolders are listed explicitly.
+DATA_FOLDERS = ("Agents", "Commands", "Config", "Core", "Fragments", "MCP", "MCP/configs", "Modes")
+# Python files are code, not assets.
+_SKIP_SUFFIXES = (".py", ".pyc")
+
+_HEADER = struct.Struct(">8sI")
+
+# 'Folder/name' -> (offset, size, sha256, mtime_ns)
+BundleEntry = Tuple[int, int, str, int]
+
+
+class AssetBundle:
+    """Read-only view of an asset bundle held in memory or mapped from disk."""
+
+    def __init__(self, buffer, index: dict):
+        self._buffer = buffer
+        self._data_start = _HEADER.size + index["index_size"]
+        self.package_version: str = index["package_version"]
+        # Folder -> mtime_ns, for bundles that must be checked against the files they were built from.
+        self.source_folders: Optional[Dict[str, int]] = index.get("source_folders")
+        self.files: Dict[str, BundleEntry] = {key: tuple(entry) for key, entry in index["files"].items()}
+        self._folders: Dict[str, List[str]] = {}
+        for key in self.files:
+            folder, _, name = key.rpartition("/")
+            self._folders.setdefault(folder, []).append(name)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "AssetBundle":
+        """
+        Parses the bundle header and index from a bytes-like buffer.
+
+        Raises:
+            ValueError: If the buffer is not a bundle this version can read
+        """
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Asset bundle is truncated.")
+        magic, index_size = _HEADER.unpack_from(buffer, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError("Not a SuperQwen asset bundle.")
+        index = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + index_size]).decode("utf-8"))
+        if index.get("bundle_version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported asset bundle version {index.get('bundle_version')}.")
+        index["index_size"] = index_size
+        return cls(buffer, index)
+
+    @classmethod
+    def open(cls, path: Path) -> "AssetBundle":
+        """Maps the bundle at path into memory with a single open."""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer)
+
+    def names(self, folder: str) -> List[str]:
+        """Returns the file names directly inside a package folder such as 'MCP/configs', sorted."""
+        return sorted(self._folders.get(folder, []))
+
+    def is_current(self, package_dir: Path) -> bool:
+        """
+        True unless the bundle records its sources and a data file under package_dir changed since.
+
+        Adding or removing a file changes its folder's mtime; editing one
+        changes the file's size or mtime.
+        """
+        if self.source_folders is None:
+            return True
+        try:
+            for folder, mtime_ns in self.source_folders.items():
+                if (package_dir / folder).stat().st_mtime_ns != mtime_ns:
+                    return False
+            for key, (_offset, size, _digest, mtime_ns) in self.files.items():
+                file_stat = (package_dir / key).stat()
+                if file_stat.st_size != size or file_stat.st_mtime_ns != mtime_ns:
+                    return False
+        except OSError:
+            return False
+        return True
+
+    def read(self, key: str) -> bytes:
+        """Returns the contents of 'Folder/name'; raises KeyError if it is not bundled."""
+        offset, size, _digest, _mtime_ns = self.files[key]
+        start = self._data_start + offset
+        return bytes(self._buffer[start:start + size])
+
+
+def _data_files(package_dir: Path) -> List[Tuple[str, Path]]:
+    files = []
+    for folder in DATA_FOLDERS:
+        folder_dir = package_dir / folder
+        if not folder_dir.is_dir():
+            continue
+        for path in sorted(folder_dir.iterdir()):
+            if path.is_file() and not path.name.endswith(_SKIP_SUFFIXES):
+                files.append((f"{folder}/{path.name}", path))
+    return files
+
+
+def write_bundle(package_dir: Path, out_path: Path, package_version: str = __version__,
+                 check_sources: bool = False) -> int:
+    """
+    Packs the data folders of package_dir into a bundle at out_path.
+
+    Args:
+        check_sources: Record the folders' mtimes so that the bundle is
+            ignored once the files it was built from change (for checkouts)
+
+    Returns:
+        The number of files bundled
+    """
+    entries: Dict[str, BundleEntry] = {}
+    blobs = []
+    offset = 0
+    for key, path in _data_files(package_dir):
+        data = path.read_bytes()
+        entries[key] = (offset, len(data), hashlib.sha256(data).hexdigest(), path.stat().st_mtime_ns)
+        blobs.append(data)
+        offset += len(data)
+
+    index = {"bundle_version": BUNDLE_VERSION, "package_version": package_version, "files": entries}
+    if check_sources:
+        index["source_folders"] = {
+            folder: (package_dir / folder).stat().st_mtime_ns
+            for folder in DATA_FOLDERS if (package_dir / folder).is_dir()
+        }
+    index = json.dumps(index, separators=(",", ":")).encode("utf-8")
+    tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(BUNDLE_MAGIC, len(index)))
+        f.write(index)
+        for data in blobs:
+            f.write(data)
+    os.replace(tmp_path, out_path)
+    return len(entries)
+
+
+@lru_cache(maxsize=None)
+def load_bundle() -> Optional[AssetBundle]:
+    """
+    Returns the bundle shipped with the package, or None to read files one by one.
+
+    There is no bundle in source checkouts unless one was built. A bundle
+    built for another package version, or a checkout bundle whose data files
+    changed since, is ignored.
+    """
+    if os.environ.get("SUPERQWEN_NO_BUNDLE"):
+        return None
+    try:
+        resource = importlib.resources.files("SuperQwen") / BUNDLE_FILENAME
+        if isinstance(resource, Path):
+            bundle = AssetBundle.open(resource)
+            if not bundle.is_current(resource.parent):
+                return None
+        elif resource.is_file():
+            # Zipped package: one read of the whole bundle.
+            bundle = AssetBundle.from_buffer(resource.read_bytes())
+        else:
+            return None
+    except (FileNotFoundError, ModuleNotFoundError, ValueError, OSError):
+        return None
+    if bundle.package_version != __version__:
+        return None
+    return bundle
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    package_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(prog="python -m SuperQwen.setup.bundle",
+                                     description="Pack the SuperQwen data folders into an asset bundle.")
+    parser.add_argument("--output", type=Path, default=package_dir / BUNDLE_FILENAME,
+                        help="Where to write the bundle (default: inside the package).")
+    args = parser.parse_args(argv)
+    count = write_bundle(package_dir, args.output, check_sources=True)
+    print(f"Bundled {count} files into {args.output}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""
+Precomposed session context
+
+Core (FLAGS, PRINCIPLES, RULES), the selected Modes and the MCP docs of
+the servers configured in settings.json are composed into one block of
+~/.qwen/QWEN.md, the context file Qwen CLI reads at the start of every
+session. A session then reads one file instead of finding and reading
+each document, and spends no context on servers that are not configured.
+
+The block sits between two marker comments, the first of which carries a
+digest of the inputs:
+
+    <!-- SuperQwen:begin digest=<sha256> -->
+    ...
+    <!-- SuperQwen:end -->
+
+Text outside the markers belongs to the user and is never changed. The
+block is only rewritten when the digest of its inputs changes.
+
+Providers cache a prompt by its longest byte prefix seen before, so the
+"stable" layout keeps everything that can change at the end: the block is
+placed before the user's text, the digest moves to the end marker, and
+every document's whitespace is normalized so that a re-saved file with
+CRLF line ends or trailing blanks composes to the same bytes:
+
+    <!-- SuperQwen:begin -->
+    ...
+    <!-- SuperQwen:end digest=<sha256> -->
+    user text
+
+prefix_fingerprint() splits a context file into documents with the digest
+of every prefix, to compare what two sessions have in common.
+"""
+
+import errno
+import hashlib
+import os
+import re
+import stat
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .. import __version__
+from .file_utils import Asset, load_assets
+from .mcp_catalog import load_catalog, read_settings
+
+CONTEXT_FILENAME = "QWEN.md"
+
+# "append" adds the block after the user's text; "stable" keeps the file's prefix byte-identical across installs.
+LAYOUTS = ("append", "stable")
+
+_BEGIN = "<!-- SuperQwen:begin digest={digest} -->"
+_END = "<!-- SuperQwen:end -->"
+_STABLE_BEGIN = "<!-- SuperQwen:begin -->"
+_STABLE_END = "<!-- SuperQwen:end digest={digest} -->"
+_NOTICE = ("<!-- Composed by `superqwen install context` from Core, Modes and the configured MCP servers. "
+           "Edits between the SuperQwen markers are overwritten; write your own notes outside them. -->")
+_BLOCK = re.compile(r'<!-- SuperQwen:begin(?: digest=([0-9a-f]*))? -->\r?\n.*?'
+                    r'<!-- SuperQwen:end(?: digest=([0-9a-f]*))? -->(?:\r?\n)?', re.DOTALL)
+_MARKER = re.compile(r'^<!-- SuperQwen:(begin|end)\b.*-->$')
+_TITLE = re.compile(r'^#\s+(.+?)\s*#*\s*$')
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+
+def _short_name(filename: str, prefix: str) -> str:
+    """'MODE_Task_Management.md' -> 'task_management'."""
+    stem = filename[:-len(".md")] if filename.endswith(".md") else filename
+    if stem.upper().startswith(prefix):
+        stem = stem[len(prefix):]
+    return stem.lower().replace("-", "_")
+
+
+def mode_names() -> List[str]:
+    """Returns the names of the bundled modes, e.g. 'Brainstorming'."""
+    return [asset.name[len("MODE_"):-len(".md")] for asset in load_assets("modes", ".md")]
+
+
+def select_modes(modes: Optional[Iterable[str]] = None) -> List[Asset]:
+    """
+    Picks mode documents by name, case-insensitively and with or without the MODE_ prefix.
+
+    Args:
+        modes: Modes to select; all modes when empty
+
+    Raises:
+        ValueError: If a requested mode is not bundled
+    """
+    available = {_short_name(asset.name, "MODE_"): asset for asset in load_assets("modes", ".md")}
+    if not modes:
+        return list(available.values())
+    selected, unknown = [], []
+    for mode in modes:
+        asset = available.get(_short_name(mode, "MODE_"))
+        if asset is None:
+            unknown.append(mode)
+        elif asset not in selected:
+            selected.append(asset)
+    if unknown:
+        raise ValueError(f"Unknown mode(s) {', '.join(unknown)}, expected any of {', '.join(mode_names())}.")
+    return selected
+
+
+def configured_mcp_docs(settings_file: Path) -> List[Asset]:
+    """
+    Returns the MCP docs of the catalog servers present in settings_file.
+
+    Raises:
+        ValueError: If settings_file is not a valid settings file
+    """
+    configured = read_settings(settings_file).get("mcpServers", {})
+    stems = {stem for stem, (server_name, _config) in load_catalog().items() if server_name in configured}
+    return [doc for doc in load_assets("mcp", ".md") if _short_name(doc.name, "MCP_") in stems]
+
+
+def compose_context(modes: Iterable[Asset], mcp_docs: Iterable[Asset], layout: str = "append") -> Tuple[str, str]:
+    """
+    Composes the context block from Core, modes and mcp_docs.
+
+    Returns:
+        A (digest, block) tuple; digest identifies the inputs
+    """
+    sources = [("core", asset) for asset in load_assets("core", ".md")]
+    sources += [("modes", asset) for asset in modes]
+    sources += [("mcp", asset) for asset in mcp_docs]
+    return _compose([(f"{folder}/{asset.name}", asset.digest, asset.data.decode("utf-8").strip())
+                     for folder, asset in sources], layout)
+
+
+def compose_pieces(pieces: Iterable[Tuple[str, str]], layout: str = "append") -> Tuple[str, str]:
+    """
+    Composes the context block from (source, text) pieces, e.g. a rendered context plan.
+
+    Returns:
+        A (digest, block) tuple; digest identifies the inputs
+    """
+    return _compose([(source, hashlib.sha256(text.encode("utf-8")).hexdigest(), text)
+                     for source, text in pieces], layout)
+
+
+def frame(layout: str = "append") -> str:
+    """
+    The block with no pieces in it: the markers and the notice.
+
+    Its digest alternates digits and letters, so it costs at least as many
+    tokens as any real digest.
+    """
+    return _frame("0a" * 32, [], layout)
+
+
+def canonicalize(text: str) -> str:
+    """Normalizes line ends, drops trailing blanks and collapses runs of blank lines."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_LINES.sub("\n\n", text).strip("\n")
+
+
+def _check_layout(layout: str) -> None:
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown context layout '{layout}', expected one of {', '.join(LAYOUTS)}.")
+
+
+def _compose(sources: List[Tuple[str, str, str]], layout: str) -> Tuple[str, str]:
+    _check_layout(layout)
+    digest = hashlib.sha256(__version__.encode("utf-8"))
+    if layout != "append":
+        digest.update(f"layout={layout}\n".encode("utf-8"))
+    for source, source_digest, _text in sources:
+        digest.update(f"{source}:{source_digest}\n".encode("utf-8"))
+    digest = digest.hexdigest()
+    texts = [text for _s, _d, text in sources]
+    if layout == "stable":
+        texts = [canonicalize(text) for text in texts]
+    return digest, _frame(digest, texts, layout)
+
+
+def _frame(digest: str, texts: List[str], layout: str) -> str:
+    if layout == "stable":
+        return _join([_STABLE_BEGIN, _NOTICE] + texts + [_STABLE_END.format(digest=digest)])
+    return _join([_BEGIN.format(digest=digest), _NOTICE] + texts + [_END])
+
+
+def _join(parts: List[str]) -> str:
+    return "\n\n".join(parts) + "\n"
+
+
+def _symlink_error(path: Path) -> ValueError:
+    return ValueError(f"{path} is a symlink; SuperQwen does not read or write context files through links.")
+
+
+def _read(path: Path) -> str:
+    """
+    Returns the text of path, line endings unchanged, or '' if it does not exist.
+
+    Raises:
+        ValueError: If path is a symlink
+    """
+    if path.is_symlink():
+        raise _symlink_error(path)
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0))
+    except FileNotFoundError:
+        return ''
+    except OSError as e:
+        if e.errno == errno.ELOOP:
+            raise _symlink_error(path) from e
+        raise
+    with open(fd, "r", encoding="utf-8", newline='') as f:
+        return f.read()
+
+
+def _write(path: Path, text: str) -> None:
+    """
+    Replaces path with text through a new temporary file and a rename,
+    keeping the permissions of the file it replaces.
+
+    Raises:
+        ValueError: If path is a symlink
+    """
+    if path.is_symlink():
+        raise _symlink_error(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    # A leftover temporary file, or a link planted in its place, is never written through.
+    if tmp_path.is_symlink() or tmp_path.exists():
+        tmp_path.unlink()
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = None
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0), 0o666)
+    with open(fd, "w", encoding="utf-8", newline='') as f:
+        if mode is not None:
+            os.fchmod(fd, mode)
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _newline(text: str) -> str:
+    """Returns the line ending text uses: '\\r\\n' for a Windows-style file, '\\n' otherwise."""
+    return "\r\n" if "\r\n" in text else "\n"
+
+
+def _block_digest(match) -> str:
+    return match.group(1) or match.group(2) or ''
+
+
+def installed_digest(path: Path) -> Optional[str]:
+    """Returns the digest of the SuperQwen block in path, or None if there is none; raises ValueError if path is a symlink."""
+    match = _BLOCK.search(_read(path))
+    return _block_digest(match) if match else None
+
+
+def installed_block(path: Path) -> Optional[str]:
+    """Returns the SuperQwen block in path, markers included, or None if there is none; raises ValueError if path is a symlink."""
+    match = _BLOCK.search(_read(path))
+    return match.group(0) if match else None
+
+
+def write_context(path: Path, digest: str, block: str, layout: str = "append") -> bool:
+    """
+    Puts block into path in place of the current SuperQwen block, or adds it.
+
+    With the "append" layout a new block goes after the user's text; with
+    "stable" the block always goes first, before the user's text. In a file
+    with Windows line endings the block is written with them too.
+
+    Returns:
+        False if path already holds a block with this digest and nothing was written
+
+    Raises:
+        ValueError: If path is a symlink or an unknown layout is requested
+    """
+    _check_layout(layout)
+    text = _read(path)
+    match = _BLOCK.search(text)
+    if match and _block_digest(match) == digest and (layout != "stable" or match.start() == 0):
+        return False
+    nl = _newline(text)
+    block = block.replace("\n", nl)
+    if layout == "stable":
+        rest = (text[:match.start()].rstrip() + nl * 2 + text[match.end():].lstrip()).strip() if match else text.strip()
+        text = f"{block}{nl}{rest}{nl}" if rest else block
+    elif match:
+        text = text[:match.start()] + block + text[match.end():]
+    else:
+        text = f"{text.rstrip()}{nl}{nl}{block}" if text.strip() else block
+    _write(path, text)
+    return True
+
+
+def remove_context(path: Path) -> bool:
+    """
+    Removes the SuperQwen block from path, deleting the file if nothing else is left.
+
+    Returns:
+        True if there was a block to remove
+
+    Raises:
+        ValueError: If path is a symlink
+    """
+    text = _read(path)
+    match = _BLOCK.search(text)
+    if not match:
+        return False
+    nl = _newline(text)
+    rest = (text[:match.start()].rstrip() + nl * 2 + text[match.end():].lstrip()).strip()
+    if rest:
+        _write(path, rest + nl)
+    else:
+        path.unlink()
+    return True
+
+
+@dataclass
+class PrefixSegment:
+    """A run of a context file: a marker, the notice, one document or user text."""
+    source: str
+    offset: int
+    size: int
+    # SHA-256 of the file's bytes up to the end of this segment.
+    prefix_digest: str
+    # Whether the segment changes without the documents changing: user text or a marker with a digest.
+    volatile: bool
+
+
+def prefix_fingerprint(text: str) -> List[PrefixSegment]:
+    """
+    Splits a context file into segments, with the digest of every prefix.
+
+    Inside the SuperQwen block a segment starts at every marker and every
+    top-level `# ` title outside code fences. Two files share a cacheable
+    prefix up to the last segment whose prefix_digest they have in common.
+    """
+    segments: List[Tuple[str, bool, List[str]]] = []
+    in_block = in_fence = False
+    for line in text.splitlines(keepends=True):
+        stripped = line.rstrip("\r\n")
+        marker = _MARKER.match(stripped)
+        title = None if in_fence or not in_block else _TITLE.match(stripped)
+        if stripped.lstrip().startswith("```"):
+            in_fence = not in_fence
+        if marker:
+            in_block = marker.group(1) == "begin"
+            segments.append((f"{marker.group(1)} marker", "digest=" in stripped, [line]))
+            if not in_block:
+                segments.append(("", True, []))
+        elif title:
+            segments.append((title.group(1), False, [line]))
+        elif not segments:
+            segments.append(("", True, [line]))
+        elif segments[-1][0] == "begin marker" and stripped.startswith("<!--"):
+            segments.append(("notice", False, [line]))
+        else:
+            segments[-1][2].append(line)
+
+    result, offset, digest = [], 0, hashlib.sha256()
+    for source, volatile, lines in segments:
+        data = "".join(lines).encode("utf-8")
+        if not data:
+            continue
+        digest.update(data)
+        result.append(PrefixSegment(source or "user text", offset, len(data), digest.hexdigest(), volatile))
+        offset += len(data)
+    return result
+
+
+def cacheable_prefix(segments: List[PrefixSegment]) -> int:
+    """Returns the size in bytes of the prefix before the first volatile segment."""
+    for segment in segments:
+        if segment.volatile:
+            return segment.offset
+    return sum(segment.size for segment in segments)
+
+
+def read_context(path: Path) -> str:
+    """Returns the text of a context file, or '' if there is none; raises ValueError if it is a symlink."""
+    return _read(path)
@@ -0,0 +1,318 @@
+"""
+Token-budgeted context planning
+
+Picks which Core, Mode, MCP and Agent documents (or, at section level,
+which `##` sections of them) go into the session context when not all of
+them fit a deployment's context window.
+
+Every document is split into its intro (title and text before the first
+`##` heading) and its sections. A piece covers weight * sqrt(tokens):
+longer sections cover more, with diminishing returns, and the weight comes
+from the document's kind or from a per-document priority. The planner
+greedily adds the piece with the best coverage per token that still fits;
+at section level a document's intro is paid for with its first section.
+This is the usual greedy for a knapsack and runs in O(n log n) over the
+pieces.
+
+The token count of every piece is precomputed at install time into
+~/.qwen/.superqwen/context-plan-index.json, next to the search index, so
+planning needs no tokenizing and takes a few milliseconds.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .. import __version__
+from .asset_index import index_key, read_cache, write_cache
+from .assets import PromptAsset, load_prompt_assets, parse_frontmatter
+from .file_utils import QWEN_DIR, STATE_DIRNAME
+from .tokens import DEFAULT_TOKENIZER, get_tokenizer
+
+PLAN_INDEX_VERSION = 1
+PLAN_INDEX_FILENAME = "context-plan-index.json"
+
+# Kinds that can go into the context, in the order they are composed.
+PLAN_KINDS = ("core", "mode", "mcp", "agent")
+# Coverage weight of a kind's pieces unless a priority says otherwise.
+DEFAULT_WEIGHTS: Dict[str, float] = {"core": 3.0, "mode": 2.0, "mcp": 2.0, "agent": 1.0}
+
+# What the composed context puts between two pieces.
+PIECE_SEPARATOR = "\n\n"
+
+_SECTION = re.compile(r'^##\s+(.+?)\s*#*\s*$')
+
+
+@dataclass
+class Piece:
+    """The intro (position 0, heading '') or one `##` section of a document."""
+    doc: str
+    position: int
+    heading: str
+    tokens: int
+
+
+@dataclass
+class ContextPlan:
+    """The pieces chosen for a budget, in composition order."""
+    budget: int
+    overhead: int = 0
+    pieces: List[Piece] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def tokens(self) -> int:
+        """Tokens used, including the overhead."""
+        return self.overhead + sum(piece.tokens for piece in self.pieces)
+
+    @property
+    def documents(self) -> List[str]:
+        return list(dict.fromkeys(piece.doc for piece in self.pieces))
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Splits a markdown document into (heading, text) pieces at `##` headings.
+
+    The first piece is the intro with heading ''. Every other piece's text
+    starts with its heading line. Headings in fenced code blocks are ignored.
+    """
+    pieces: List[Tuple[str, List[str]]] = [('', [])]
+    in_fence = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+        match = None if in_fence else _SECTION.match(line)
+        if match:
+            pieces.append((match.group(1), []))
+        pieces[-1][1].append(line)
+    return [(heading, "\n".join(lines).strip("\n").rstrip()) for heading, lines in pieces]
+
+
+def document_text(asset: PromptAsset) -> str:
+    """The part of a document that goes into the context: agents lose their frontmatter."""
+    _metadata, body = parse_frontmatter(asset.text)
+    return body.strip()
+
+
+def candidate_assets() -> List[PromptAsset]:
+    return load_prompt_assets(PLAN_KINDS)
+
+
+def build_plan_index(tokenizer: str = DEFAULT_TOKENIZER) -> dict:
+    """
+    Counts the tokens of every piece of every plannable document, as a JSON-ready dict.
+
+    A piece's count includes the blank line separating it from the piece before it.
+    """
+    count = get_tokenizer(tokenizer)
+    separator = count(PIECE_SEPARATOR)
+    documents = {}
+    for asset in candidate_assets():
+        documents[asset.key] = [
+            [heading, count(text) + separator] for heading, text in split_sections(document_text(asset))
+        ]
+    return {
+        "plan_index_version": PLAN_INDEX_VERSION,
+        "package_version": __version__,
+        "key": index_key(),
+        "tokenizer": tokenizer,
+        "documents": documents,
+    }
+
+
+@lru_cache(maxsize=None)
+def _built_index() -> dict:
+    return build_plan_index()
+
+
+def _index_path(root: Path) -> Path:
+    return root / STATE_DIRNAME / PLAN_INDEX_FILENAME
+
+
+def write_plan_index(root: Path = QWEN_DIR, force: bool = False) -> bool:
+    """
+    Writes the plan index under root unless an index for the current package is already there.
+
+    Returns:
+        True if the index was (re)built
+    """
+    path = _index_path(root)
+    if not force and read_cache(path, "plan_index_version", PLAN_INDEX_VERSION, index_key()) is not None:
+        return False
+    write_cache(path, _built_index())
+    return True
+
+
+def load_plan_index(root: Path = QWEN_DIR) -> dict:
+    """Returns the installed plan index, rebuilding (and writing back) a missing or stale one."""
+    data = read_cache(_index_path(root), "plan_index_version", PLAN_INDEX_VERSION, index_key())
+    if data is not None:
+        return data
+    try:
+        write_plan_index(root, force=True)
+    except OSError:
+        pass
+    return _built_index()
+
+
+def parse_priorities(specs: Iterable[str]) -> Dict[str, float]:
+    """
+    Parses KEY=WEIGHT priorities, where KEY is a kind ('agent') or a document ('mode/MODE_Brainstorming').
+
+    A weight of 0 leaves the kind or document out.
+
+    Raises:
+        ValueError: If a priority is malformed or names an unknown kind
+    """
+    priorities = {}
+    for spec in specs:
+        key, sep, value = spec.partition("=")
+        key = key.strip()
+        try:
+            weight = float(value)
+        except ValueError:
+            weight = -1.0
+        if not sep or not key or weight < 0:
+            raise ValueError(f"Invalid priority '{spec}', expected KEY=WEIGHT with a weight of 0 or more.")
+        if key.split("/", 1)[0].lower() not in PLAN_KINDS:
+            raise ValueError(f"Invalid priority '{spec}', keys start with one of {', '.join(PLAN_KINDS)}.")
+        priorities[_priority_key(key)] = weight
+    return priorities
+
+
+def check_priorities(priorities: Dict[str, float], documents: Optional[Iterable[str]] = None) -> None:
+    """
+    Checks that every document named in priorities exists.
+
+    Raises:
+        ValueError: If a priority names an unknown document
+    """
+    if documents is None:
+        documents = [asset.key for asset in candidate_assets()]
+    known = {_priority_key(doc) for doc in documents}
+    unknown = [key for key in priorities if "/" in key and key not in known]
+    if unknown:
+        raise ValueError(f"Unknown document(s) in priorities: {', '.join(unknown)}.")
+
+
+def _priority_key(key: str) -> str:
+    """'mode/MODE_Task_Management' and 'mode/task-management' -> 'mode/task_management'."""
+    kind, _sep, name = key.lower().partition("/")
+    if not name:
+        return kind
+    if name.startswith(f"{kind}_"):
+        name = name[len(kind) + 1:]
+    return f"{kind}/{name.replace('-', '_')}"
+
+
+def _weight(doc: str, priorities: Dict[str, float]) -> float:
+    kind = doc.split("/", 1)[0]
+    return priorities.get(_priority_key(doc), priorities.get(kind, DEFAULT_WEIGHTS[kind]))
+
+
+def plan_context(budget: int, documents: Sequence[str], priorities: Optional[Dict[str, float]] = None,
+                 sections: bool = False, index: Optional[dict] = None, overhead: int = 0) -> ContextPlan:
+    """
+    Chooses the documents (or sections) covering the most within budget tokens.
+
+    Args:
+        budget: Tokens the chosen pieces may use together
+        documents: Candidate document keys, e.g. 'core/RULES'; their order is kept in the plan
+        priorities: Weights by kind or document, from parse_priorities()
+        sections: Plan single `##` sections instead of whole documents
+        index: An already loaded plan index, e.g. from load_plan_index()
+        overhead: Tokens of the budget taken by anything else, e.g. the block markers
+
+    Raises:
+        ValueError: If the budget does not cover the overhead, or a document or
+            a prioritized document is not in the plan index
+    """
+    if budget <= overhead:
+        raise ValueError(f"A budget of {budget} tokens leaves no room after ~{overhead} tokens of overhead.")
+    data = index if index is not None else _built_index()
+    priorities = priorities or {}
+    check_priorities(priorities, data["documents"])
+    plan = ContextPlan(budget, overhead)
+
+    # Per document, the pieces not yet considered, best coverage per token first.
+    queues: Dict[str, List[Piece]] = {}
+    intros: Dict[str, Piece] = {}
+    for doc in documents:
+        if doc not in data["documents"]:
+            raise ValueError(f"Unknown context document '{doc}'.")
+        weight = _weight(doc, priorities)
+        if weight <= 0:
+            continue
+        pieces = [Piece(doc, i, heading, tokens) for i, (heading, tokens) in enumerate(data["documents"][doc])]
+        if sections and len(pieces) > 1:
+            intros[doc] = pieces[0]
+            queues[doc] = sorted(pieces[1:], key=lambda p: -_coverage(p.tokens, weight) / max(p.tokens, 1))
+        else:
+            queues[doc] = [Piece(doc, 0, '', sum(p.tokens for p in pieces))]
+
+    chosen: Dict[str, List[Piece]] = {}
+    heap: List[Tuple[float, int, str]] = []
+    order = {doc: i for i, doc in enumerate(documents)}
+
+    def push(doc: str) -> None:
+        if not queues.get(doc):
+            return
+        piece = queues[doc][0]
+        weight = _weight(doc, priorities)
+        cost, value = piece.tokens, _coverage(piece.tokens, weight)
+        if doc in intros and doc not in chosen:
+            cost += intros[doc].tokens
+            value += _coverage(intros[doc].tokens, weight)
+        heapq.heappush(heap, (-value / max(cost, 1), order[doc], doc))
+
+    for doc in queues:
+        push(doc)
+    remaining = budget - overhead
+    while heap:
+        _density, _order, doc = heapq.heappop(heap)
+        piece = queues[doc].pop(0)
+        cost = piece.tokens + (intros[doc].tokens if doc in intros and doc not in chosen else 0)
+        if cost <= remaining:
+            remaining -= cost
+            if doc in intros and doc not in chosen:
+                chosen[doc] = [intros[doc]]
+            chosen.setdefault(doc, []).append(piece)
+        push(doc)
+
+    for doc in documents:
+        if doc not in chosen:
+            plan.skipped.append(doc)
+            continue
+        chosen[doc].sort(key=lambda p: p.position)
+        plan.pieces.extend(chosen[doc])
+    return plan
+
+
+def _coverage(tokens: int, weight: float) -> float:
+    return weight * math.sqrt(tokens)
+
+
+def render_plan(plan: ContextPlan, assets: Iterable[PromptAsset]) -> List[Tuple[str, str]]:
+    """
+    Returns the text of every planned piece as (source, text) pairs in plan order.
+
+    A document planned as a single piece renders as the whole document.
+    """
+    texts = {asset.key: document_text(asset) for asset in assets}
+    counts = Counter(piece.doc for piece in plan.pieces)
+    by_doc: Dict[str, List[Tuple[str, str]]] = {}
+    rendered = []
+    for piece in plan.pieces:
+        if counts[piece.doc] == 1:
+            rendered.append((piece.doc, texts[piece.doc]))
+            continue
+        sections = by_doc.setdefault(piece.doc, split_sections(texts[piece.doc]))
+        source = f"{piece.doc}#{piece.heading}" if piece.position else piece.doc
+        rendered.append((source, sections[piece.position][1]))
+    return rendered
@@ -1,15 +1,311 @@
+import errno
+import hashlib
 import importlib.resources
+import os
+import shutil
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional, Sequence, Tuple
+
+from .bundle import load_bundle
+from .logging import logger
+from .staging import staged_directory
+from .tracing import span, traced
 
 QWEN_DIR = Path.home() / ".qwen"
+# SuperQwen's own bookkeeping (manifest, caches) lives here, inside the Qwen directory.
+STATE_DIRNAME = ".superqwen"
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# Package folders whose names are not simply the capitalized component name.
+_PACKAGE_FOLDERS = {"mcp": "MCP"}
+
+# Ways an installed file can be materialized from the package file.
+LINK_MODES = ("copy", "hardlink", "reflink", "symlink")
+# ioctl request number for FICLONE on Linux.
+_FICLONE = 0x40049409
+_warned_link_modes = set()
+
+def package_folder(subfolder: str) -> str:
+    """Maps a component subfolder such as 'commands' or 'mcp/configs' to its package folder."""
+    top, sep, rest = subfolder.partition("/")
+    return _PACKAGE_FOLDERS.get(top.lower(), top.capitalize()) + sep + rest
 
 def get_package_files(subfolder: str):
-    """Helper to get files from a package subfolder."""
+    """Helper to get files from a package subfolder, sorted by name so every install sees the same order."""
     try:
         package_name = 'SuperQwen'
         # Data folders are not packages, so we get the path to the main package
         # and then navigate to the subfolder.
-        data_dir = importlib.resources.files(package_name) / subfolder.capitalize()
-        return [file for file in data_dir.iterdir() if file.is_file()]
+        data_dir = importlib.resources.files(package_name) / package_folder(subfolder)
+        return sorted((file for file in data_dir.iterdir() if file.is_file()), key=lambda f: f.name)
     except (ModuleNotFoundError, FileNotFoundError):
         return []
+
+def file_digest(path: Path) -> str:
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+@dataclass(frozen=True)
+class Asset:
+    """A package file held in memory so it can be written to any number of targets."""
+    name: str
+    data: bytes
+    digest: str
+    # mtime of the package file; written copies get it too, enabling the size+mtime fast path.
+    mtime_ns: Optional[int] = None
+    # The package file on disk, if the package is not zipped. Needed for link modes.
+    path: Optional[Path] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+def _load_asset(file) -> Asset:
+    data = file.read_bytes()
+    path = file if isinstance(file, Path) else None
+    mtime_ns = path.stat().st_mtime_ns if path is not None else None
+    return Asset(file.name, data, hashlib.sha256(data).hexdigest(), mtime_ns, path)
+
+def _load_bundled_assets(bundle, subfolder: str, suffix: str) -> Tuple[Asset, ...]:
+    folder = package_folder(subfolder)
+    try:
+        package_dir = importlib.resources.files('SuperQwen')
+    except ModuleNotFoundError:
+        package_dir = None
+    assets = []
+    for name in bundle.names(folder):
+        if not name.endswith(suffix):
+            continue
+        key = f"{folder}/{name}"
+        _offset, _size, digest, mtime_ns = bundle.files[key]
+        # Link modes still need the package file itself, if the package is on disk.
+        path = package_dir / folder / name if isinstance(package_dir, Path) else None
+        assets.append(Asset(name, bundle.read(key), digest, mtime_ns, path))
+    return tuple(assets)
+
+@lru_cache(maxsize=None)
+def load_assets(subfolder: str, suffix: str) -> Tuple[Asset, ...]:
+    """
+    Reads the package files of a subfolder that end with suffix into memory.
+
+    Served from the asset bundle when the package ships one (see bundle.py),
+    otherwise read file by file. Cached per process, so installing into
+    many targets reads the package once.
+    """
+    bundle = load_bundle()
+    if bundle is not None:
+        return _load_bundled_assets(bundle, subfolder, suffix)
+    return tuple(_load_asset(f) for f in get_package_files(subfolder) if f.name.endswith(suffix))
+
+@dataclass
+class SyncResult:
+    """Counts of what a sync run did to the destination directory."""
+    copied: int = 0
+    skipped: int = 0
+    removed: int = 0
+
+    @property
+    def total(self) -> int:
+        return self.copied + self.skipped
+
+def _reflink(src_path: Path, dst_path: Path) -> None:
+    """Clones src_path into dst_path sharing its data blocks (Linux FICLONE; btrfs, XFS, ...)."""
+    import fcntl
+    with open(src_path, "rb") as src, open(dst_path, "wb") as dst:
+        fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+
+def _place_file(asset: Asset, tmp_path: Path, link_mode: str) -> None:
+    """Creates tmp_path with the asset's content using link_mode, falling back to writing the bytes."""
+    if link_mode != "copy" and asset.path is not None:
+        try:
+            if link_mode == "hardlink":
+                os.link(asset.path, tmp_path)
+            elif link_mode == "symlink":
+                os.symlink(asset.path.resolve(), tmp_path)
+            else:
+                _reflink(asset.path, tmp_path)
+                os.utime(tmp_path, ns=(asset.mtime_ns, asset.mtime_ns))
+            return
+        except (OSError, ImportError) as e:
+            if link_mode not in _warned_link_modes:
+                _warned_link_modes.add(link_mode)
+                logger.warning(f"Cannot {link_mode} into {tmp_path.parent} ({e}), copying instead.")
+            if tmp_path.is_symlink() or tmp_path.exists():
+                tmp_path.unlink()
+
+    with open(tmp_path, "wb") as f:
+        f.write(asset.data)
+    if asset.mtime_ns is not None:
+        os.utime(tmp_path, ns=(asset.mtime_ns, asset.mtime_ns))
+
+def _write_file(asset: Asset, dst_path: Path, link_mode: str = "copy") -> None:
+    """
+    Writes (or links) the asset over dst_path through a temporary file and a rename.
+
+    Readers never see a partially written file, and a dst_path that is a
+    hardlink (as in a staging copy) is replaced rather than written through.
+    """
+    with span("file.write", path=str(dst_path), size=asset.size):
+        tmp_path = dst_path.with_name(f".{dst_path.name}.tmp")
+        if tmp_path.is_symlink() or tmp_path.exists():
+            tmp_path.unlink()
+        _place_file(asset, tmp_path, link_mode)
+        os.replace(tmp_path, dst_path)
+
+def _sync_file(asset: Asset, dst_path: Path, manifest=None, manifest_path: Optional[Path] = None,
+               dry_run: bool = False, link_mode: str = "copy", refresh_mtime: bool = True) -> bool:
+    """
+    Writes asset to dst_path unless dst_path already holds the same content.
+
+    The checks go from cheapest to most expensive: a manifest entry whose
+    size and mtime still match gives the destination's digest without reading
+    it; a size and mtime equal to the package file's means a previous sync
+    wrote it; otherwise the destination is hashed. Identical files get their
+    mtime refreshed so the next run takes a fast path, unless refresh_mtime
+    is False.
+
+    Args:
+        manifest_path: Path the manifest knows dst_path by, if dst_path is a staging copy
+        dry_run: Only report what would happen
+        link_mode: How changed files are written, one of LINK_MODES
+        refresh_mtime: False for a staging copy, whose unchanged files are
+            hardlinks of the live ones and must not be modified in place
+
+    Returns:
+        True if the file was (or, in a dry run, would be) written
+    """
+    try:
+        dst_stat = dst_path.stat()
+    except FileNotFoundError:
+        if not dry_run:
+            _write_file(asset, dst_path, link_mode)
+        return True
+
+    if manifest is not None:
+        known_digest = manifest.known_digest(manifest_path or dst_path, dst_stat)
+        if known_digest is not None:
+            if known_digest == asset.digest:
+                return False
+            if not dry_run:
+                _write_file(asset, dst_path, link_mode)
+            return True
+
+    if dst_stat.st_size == asset.size:
+        if asset.mtime_ns is not None and dst_stat.st_mtime_ns == asset.mtime_ns:
+            return False
+        if file_digest(dst_path) == asset.digest:
+            if not dry_run and refresh_mtime and asset.mtime_ns is not None:
+                os.utime(dst_path, ns=(dst_stat.st_atime_ns, asset.mtime_ns))
+            return False
+    if not dry_run:
+        _write_file(asset, dst_path, link_mode)
+    return True
+
+def _sync_into(assets: Sequence[Asset], write_dir: Path, dst_dir: Path, component: str, manifest,
+               prune_suffix: Optional[str], progress_bar, dry_run: bool = False,
+               link_mode: str = "copy", options: Optional[dict] = None) -> SyncResult:
+    """
+    Syncs assets into write_dir, which is either dst_dir itself or a staging copy of it.
+
+    Manifest entries are always keyed by the final location under dst_dir. A
+    dry run reports the counts without writing files or touching the manifest.
+    """
+    result = SyncResult()
+    record = manifest is not None and not dry_run
+    extra = {"options": options} if options is not None else {}
+
+    if progress_bar:
+        progress_bar.total = len(assets)
+
+    synced = set()
+    for i, asset in enumerate(assets):
+        write_path = write_dir / asset.name
+        dst_path = dst_dir / asset.name
+        if _sync_file(asset, write_path, manifest, dst_path, dry_run, link_mode, refresh_mtime=write_dir == dst_dir):
+            result.copied += 1
+        else:
+            result.skipped += 1
+        if record:
+            manifest.record(component, dst_path, asset.digest, stat=write_path.stat(), **extra)
+        synced.add(asset.name)
+        if progress_bar:
+            progress_bar.update(i + 1)
+
+    if manifest is not None:
+        for stale in manifest.files_for(component):
+            if stale.name in synced and stale.parent == dst_dir:
+                continue
+            # Only files directly in dst_dir are removed; entries elsewhere are just forgotten.
+            stale_write_path = write_dir / stale.name if stale.parent == dst_dir else None
+            if stale_write_path is not None and stale_write_path.is_file():
+                if not dry_run:
+                    stale_write_path.unlink()
+                result.removed += 1
+            if record:
+                manifest.forget(stale)
+
+    if prune_suffix and write_dir.is_dir():
+        for stale in write_dir.glob(f"*{prune_suffix}"):
+            if stale.name not in synced and stale.is_file():
+                if not dry_run:
+                    stale.unlink()
+                result.removed += 1
+
+    return result
+
+@traced("sync")
+def sync_files(assets: Sequence[Asset], dst_dir: Path, component: str = '', manifest=None,
+               prune_suffix: Optional[str] = None, progress_bar=None,
+               staging_dir: Optional[Path] = None, link_mode: str = "copy",
+               options: Optional[dict] = None) -> SyncResult:
+    """
+    Incrementally writes assets into dst_dir.
+
+    Only files whose content differs from the destination are written. With a
+    manifest, every written file is recorded under component and files the
+    manifest attributes to component that are no longer shipped are removed.
+    If prune_suffix is given, files with that suffix in dst_dir that are not
+    part of the package are removed too; only use this on directories
+    SuperQwen owns.
+
+    If staging_dir is given and anything needs to change, the new tree is
+    built under staging_dir and swapped in as a whole (see staging.py). When
+    dst_dir is on another filesystem the sync falls back to writing in place.
+
+    link_mode controls how changed files are written: "copy" duplicates the
+    bytes, "hardlink" and "reflink" share the package file's data and
+    "symlink" points at it. Modes the filesystem cannot do, or assets that
+    are not backed by a file on disk, fall back to a copy. Files that are
+    already up to date are left as they are.
+
+    options, such as the profile the assets were made with, are stored in
+    every manifest entry so that verify can rebuild the same files.
+    """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{link_mode}', expected one of {', '.join(LINK_MODES)}.")
+    if staging_dir is not None and not dst_dir.is_symlink():
+        preview = _sync_into(assets, dst_dir, dst_dir, component, manifest, prune_suffix, None, dry_run=True)
+        if preview.copied or preview.removed:
+            snapshot = manifest.snapshot() if manifest is not None else None
+            try:
+                with staged_directory(dst_dir, staging_dir) as stage_dir:
+                    return _sync_into(assets, stage_dir, dst_dir, component, manifest, prune_suffix,
+                                      progress_bar, link_mode=link_mode, options=options)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # The staged sync already recorded and forgot entries; the in-place sync redoes that.
+                if snapshot is not None:
+                    manifest.restore(snapshot)
+                logger.warning(f"{dst_dir} is on another filesystem than {staging_dir}, installing in place.")
+
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    return _sync_into(assets, dst_dir, dst_dir, component, manifest, prune_suffix, progress_bar,
+                      link_mode=link_mode, options=options)
@@ -0,0 +1,314 @@
+"""
+Fleet installs: provision many home directories from one process
+
+Package assets are read into memory once and MCP servers are verified once.
+Each target home then gets its own ~/.qwen written by a worker pool. One
+target failing does not stop the others, and every target gets its own
+result.
+
+Run as root, every home owned by another user is written by a forked child
+that has switched to the owner's uid and gid, so the user's own symlinks
+cannot make it read or write anything the user could not. Targets whose
+~/.qwen or component paths are symlinks are refused either way.
+"""
+
+import glob
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import context_planner, router, search_index
+from .compact import COMPACT_COMPONENTS, PROFILES, compact_assets
+from .context import CONTEXT_FILENAME
+from .file_utils import LINK_MODES, STATE_DIRNAME, SyncResult, load_assets
+from .installer import INDEXED_COMPONENTS, INSTALL_MAP, check_context_options, verify_mcp_servers, write_indexes
+from .logging import logger
+from .mcp_catalog import load_catalog
+from .prompt_compiler import compile_commands
+from .tracing import active_tracer, span
+
+DEFAULT_FLEET_WORKERS = 8
+
+# (subfolder, suffix) of every asset set the file and context installers read.
+_ASSET_SETS = (("commands", ".toml"), ("modes", ".md"), ("agents", ".md"), ("core", ".md"), ("mcp", ".md"),
+               ("mcp/configs", ".json"))
+
+# Paths under a target's ~/.qwen that the installers write through; none may be a symlink.
+_GUARDED_PATHS = ("commands", "commands/sq", "modes", "agents", STATE_DIRNAME, "settings.json", CONTEXT_FILENAME)
+
+
+@dataclass
+class TargetResult:
+    """Outcome of installing into one target home directory."""
+    home: Path
+    components: Dict[str, Optional[SyncResult]] = field(default_factory=dict)
+    duration: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def resolve_targets(spec: str) -> List[Path]:
+    """
+    Expands a --targets value into home directories.
+
+    spec is either a file listing one home directory or glob per line
+    (blank lines and lines starting with '#' are ignored) or a glob itself,
+    such as '/home/*'. Only existing directories are returned, without
+    duplicates and in a stable order.
+    """
+    spec_path = Path(spec).expanduser()
+    if spec_path.is_file():
+        patterns = [
+            line.strip() for line in spec_path.read_text(encoding="utf-8").splitlines()
+            if line.strip() and not line.strip().startswith("#")
+        ]
+    else:
+        patterns = [spec]
+
+    homes = []
+    seen = set()
+    for pattern in patterns:
+        for match in sorted(glob.glob(os.path.expanduser(pattern))):
+            home = Path(match).resolve()
+            if home.is_dir() and home not in seen:
+                seen.add(home)
+                homes.append(home)
+    return homes
+
+
+def check_target(qwen_dir: Path) -> None:
+    """
+    Refuses a target whose ~/.qwen, component directories, settings.json or QWEN.md is a symlink.
+
+    Raises:
+        ValueError: If one of them is a symlink
+    """
+    for path in (qwen_dir, *(qwen_dir / name for name in _GUARDED_PATHS)):
+        if path.is_symlink():
+            raise ValueError(f"Refusing to install into {qwen_dir}: {path} is a symlink.")
+
+
+def _target_owner(home: Path) -> Optional[Tuple[int, int]]:
+    """Returns the (uid, gid) to write home as, or None to write it as the current user."""
+    if not hasattr(os, "geteuid") or os.geteuid() != 0:
+        return None
+    home_stat = home.stat()
+    if home_stat.st_uid == 0:
+        return None
+    return home_stat.st_uid, home_stat.st_gid
+
+
+def _drop_privileges(uid: int, gid: int) -> None:
+    """Switches this process to uid and gid for good, with the user's supplementary groups."""
+    import pwd
+
+    try:
+        os.initgroups(pwd.getpwuid(uid).pw_name, gid)
+    except KeyError:
+        os.setgroups([])
+    os.setgid(gid)
+    os.setuid(uid)
+
+
+def _install_target(home: Path, components: List[str], verified_servers: Dict[str, dict],
+                    staged: bool, link_mode: str, profile: str, prune_sections: Sequence[str],
+                    context_options: Dict[str, Any]) -> TargetResult:
+    result = TargetResult(home)
+    qwen_dir = home / ".qwen"
+    start = time.perf_counter()
+    with span("fleet.target", home=str(home)):
+        try:
+            check_target(qwen_dir)
+            for component in components:
+                if component == "mcp":
+                    INSTALL_MAP["mcp"](qwen_dir=qwen_dir, verified_servers=verified_servers)
+                    result.components["mcp"] = None
+                elif component == "context":
+                    INSTALL_MAP["context"](qwen_dir=qwen_dir, **context_options)
+                    result.components["context"] = None
+                else:
+                    options = {"profile": profile, "prune_sections": prune_sections} if component in COMPACT_COMPONENTS else {}
+                    result.components[component] = INSTALL_MAP[component](
+                        staged=staged, link_mode=link_mode, qwen_dir=qwen_dir, **options
+                    )
+            if INDEXED_COMPONENTS.intersection(components):
+                write_indexes(qwen_dir)
+        except (OSError, ValueError) as e:
+            result.error = str(e)
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def _result_to_json(result: TargetResult) -> dict:
+    components = {
+        component: [synced.copied, synced.skipped, synced.removed] if synced is not None else None
+        for component, synced in result.components.items()
+    }
+    return {"components": components, "duration": result.duration, "error": result.error}
+
+
+def _result_from_json(home: Path, data: dict) -> TargetResult:
+    components = {
+        component: SyncResult(*counts) if counts is not None else None
+        for component, counts in data["components"].items()
+    }
+    return TargetResult(home, components, data["duration"], data["error"])
+
+
+def _fork_target(home: Path, owner: Tuple[int, int], args: tuple) -> Tuple[int, int]:
+    """
+    Installs into home from a child process running as owner; returns the child's pid and result pipe.
+
+    The child inherits the assets already loaded in memory. It writes its
+    TargetResult as JSON, a few hundred bytes, to the pipe and exits. While
+    tracing, the spans the child recorded go along with it.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            os.close(read_fd)
+            tracer = active_tracer()
+            if tracer is not None:
+                # Spans inherited from the parent are already recorded there.
+                tracer.spans = []
+            _drop_privileges(*owner)
+            result = _install_target(home, *args)
+            data = _result_to_json(result)
+            if tracer is not None:
+                data["spans"] = tracer.export()
+            with os.fdopen(write_fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, default=str)
+            status = 0
+        finally:
+            os._exit(status)
+    os.close(write_fd)
+    return pid, read_fd
+
+
+def _run_forked(targets: List[Tuple[Path, Tuple[int, int]]], args: tuple, workers: int,
+                on_done) -> Dict[Path, TargetResult]:
+    """Runs at most workers forked targets at a time, calling on_done(result) as each finishes."""
+    results: Dict[Path, TargetResult] = {}
+    running: Dict[int, Tuple[Path, int]] = {}
+    queue = list(targets)
+    while queue or running:
+        while queue and len(running) < workers:
+            home, owner = queue.pop(0)
+            try:
+                pid, read_fd = _fork_target(home, owner, args)
+            except OSError as e:
+                results[home] = TargetResult(home, error=str(e))
+                on_done(results[home])
+                continue
+            running[pid] = (home, read_fd)
+        if not running:
+            break
+        pid, status = os.waitpid(-1, 0)
+        if pid not in running:
+            continue
+        home, read_fd = running.pop(pid)
+        with os.fdopen(read_fd, "r", encoding="utf-8") as f:
+            data = f.read()
+        if status == 0 and data:
+            data = json.loads(data)
+            tracer = active_tracer()
+            if tracer is not None and data.get("spans"):
+                tracer.merge(data["spans"], pid)
+            results[home] = _result_from_json(home, data)
+        else:
+            results[home] = TargetResult(home, error=f"Install process for {home} failed (wait status {status}).")
+        on_done(results[home])
+    return results
+
+
+def install_targets(homes: List[Path], components: List[str], workers: int = DEFAULT_FLEET_WORKERS,
+                    staged: bool = False, link_mode: str = "copy", offline: bool = False,
+                    refresh_cache: bool = False, servers: Optional[List[str]] = None,
+                    profile: str = "full", prune_sections: Sequence[str] = (),
+                    context_options: Optional[Dict[str, Any]] = None, progress_bar=None) -> List[TargetResult]:
+    """
+    Installs components into <home>/.qwen for every home in homes.
+
+    Args:
+        homes: Target home directories
+        components: Components to install, as in INSTALL_MAP
+        workers: Number of targets written concurrently
+        staged, link_mode, profile, prune_sections: As for the individual installers
+        offline, refresh_cache, servers: As for install_mcp; verification runs once
+        context_options: Keyword arguments for install_context (modes, budget, priorities, sections)
+        progress_bar: Optional progress bar, advanced once per finished target
+
+    Returns:
+        One TargetResult per home, in the order of homes
+    """
+    if link_mode not in LINK_MODES:
+        raise ValueError(f"Unknown link mode '{link_mode}', expected one of {', '.join(LINK_MODES)}.")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}', expected one of {', '.join(PROFILES)}.")
+    context_options = context_options or {}
+    if "context" in components:
+        check_context_options(**context_options)
+
+    # Everything is read here, before targets are written by processes that may not be able to read the package.
+    for subfolder, suffix in _ASSET_SETS:
+        load_assets(subfolder, suffix)
+    load_catalog()
+    compile_commands()
+    if profile != "full":
+        for component in COMPACT_COMPONENTS:
+            compact_assets(component, tuple(prune_sections))
+    # Built once here rather than once in every forked child.
+    if INDEXED_COMPONENTS.intersection(components):
+        for built_index in (search_index._built_index, router._built_index, context_planner._built_index):
+            built_index()
+    elif "context" in components and context_options.get("budget"):
+        context_planner._built_index()
+    verified_servers = verify_mcp_servers(servers, offline, refresh_cache) if "mcp" in components else {}
+
+    if progress_bar:
+        progress_bar.total = len(homes)
+
+    args = (components, verified_servers, staged, link_mode, profile, prune_sections, context_options)
+    owners = {}
+    finished = []
+    results = {}
+    for home in homes:
+        try:
+            owners[home] = _target_owner(home)
+        except OSError as e:
+            results[home] = TargetResult(home, error=str(e))
+            finished.append(results[home])
+
+    def on_done(result: TargetResult) -> None:
+        finished.append(result)
+        if progress_bar:
+            progress_bar.update(len(finished))
+
+    # Per-file INFO lines from hundreds of targets would drown the summary.
+    previous_level = logger.level
+    logger.setLevel("WARNING")
+    try:
+        # Forked targets first, while this process runs no other threads.
+        forked = [(home, owner) for home, owner in owners.items() if owner is not None]
+        results.update(_run_forked(forked, args, max(1, workers), on_done))
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(_install_target, home, *args): home
+                for home, owner in owners.items() if owner is None
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                on_done(results[futures[future]])
+    finally:
+        logger.setLevel(previous_level)
+
+    return [results[home] for home in homes]
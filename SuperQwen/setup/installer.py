@@ -1,138 +1,422 @@
-import json
+import os
 import shutil
 import subprocess
-import importlib.resources
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
+from .compact import PROFILES, compact_assets, measure_reduction
+from .context import (CONTEXT_FILENAME, LAYOUTS, compose_context, compose_pieces, configured_mcp_docs, frame,
+                      read_context, select_modes, write_context)
+from .context_planner import (ContextPlan, candidate_assets, check_priorities, load_plan_index, parse_priorities,
+                              plan_context, render_plan, write_plan_index)
 from .logging import logger
-from .file_utils import QWEN_DIR, get_package_files
-from .ui import ProgressBar
+from .file_utils import QWEN_DIR, STATE_DIRNAME, Asset, SyncResult, file_digest, load_assets, sync_files
+from .manifest import Manifest
+from .mcp_catalog import load_catalog, merge_mcp_servers, missing_env_vars, select_servers
+from .prompt_compiler import compile_commands
+from .registry_cache import RegistryCache
+from .router import write_route_index
+from .search_index import write_search_index
+from .tokens import approx_tokens, get_tokenizer
+from .tracing import span, traced
 
-def install_commands(progress_bar: Optional[ProgressBar] = None):
-    logger.info("Installing Commands...")
-    commands_dst = QWEN_DIR / "commands" / "sq"
-    commands_dst.mkdir(parents=True, exist_ok=True)
+if TYPE_CHECKING:
+    from .ui import ProgressBar
 
-    files = get_package_files("commands")
-    files_to_copy = [f for f in files if f.name.endswith('.toml')]
+# Upper bound for a single `npm view` registry check, in seconds.
+MCP_VERIFY_TIMEOUT = 20
+MCP_VERIFY_WORKERS = 8
 
-    if progress_bar:
-        progress_bar.total = len(files_to_copy)
+def _install_files(label: str, subfolder: str, suffix: str, dst_dir: Path, qwen_dir: Path, prune: bool = False,
+                   progress_bar: Optional["ProgressBar"] = None, staged: bool = False,
+                   link_mode: str = "copy", assets: Optional[Sequence[Asset]] = None,
+                   options: Optional[dict] = None) -> SyncResult:
+    """
+    Syncs the package files of one component into dst_dir, writing only what changed.
 
-    for i, file in enumerate(files_to_copy):
-        with importlib.resources.as_file(file) as src_path:
-            shutil.copy2(src_path, commands_dst)
-        if progress_bar:
-            progress_bar.update(i + 1)
+    assets overrides the files read from the package subfolder, e.g. with rendered commands.
+    options are recorded in the manifest with every file, e.g. the profile assets were made with.
+    """
+    if assets is None:
+        assets = load_assets(subfolder, suffix)
+    manifest = Manifest.load(qwen_dir)
+    result = sync_files(assets, dst_dir, component=subfolder, manifest=manifest,
+                        prune_suffix=suffix if prune else None, progress_bar=progress_bar,
+                        staging_dir=qwen_dir / STATE_DIRNAME if staged else None, link_mode=link_mode,
+                        options=options)
+    manifest.save()
+    logger.info(
+        f"Copied {result.copied}, skipped {result.skipped} unchanged, "
+        f"removed {result.removed} stale {label} files."
+    )
+    return result
 
-    logger.info(f"Copied {len(files_to_copy)} command files.")
+# Components whose installs are followed by write_indexes().
+INDEXED_COMPONENTS = frozenset({"commands", "modes", "agents"})
 
-def install_modes(progress_bar: Optional[ProgressBar] = None):
-    logger.info("Installing Modes...")
-    modes_dst = QWEN_DIR / "modes"
-    modes_dst.mkdir(exist_ok=True)
+def write_indexes(qwen_dir: Path = QWEN_DIR) -> None:
+    """
+    Writes the indexes behind `superqwen search`, `superqwen route` and context budgets if the package changed.
 
-    files = get_package_files("modes")
-    files_to_copy = [f for f in files if f.name.endswith('.md')]
+    Install commands call this once after their components, not once per
+    component. Without it the indexes are built the first time they are used.
+    """
+    indexes = (("search", write_search_index), ("routing", write_route_index), ("context", write_plan_index))
+    for label, write_index in indexes:
+        try:
+            with span(f"index.{label}"):
+                built = write_index(qwen_dir)
+            if built:
+                logger.info(f"Built the {label} index.")
+        except OSError as e:
+            logger.warning(f"Could not write the {label} index: {e}")
 
-    if progress_bar:
-        progress_bar.total = len(files_to_copy)
+def _profile_assets(component: str, profile: str, prune_sections: Sequence[str]) -> Optional[Tuple[Asset, ...]]:
+    """Returns the files to install for a non-default profile, or None for the full package files."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}', expected one of {', '.join(PROFILES)}.")
+    if profile == "full":
+        return None
+    prune = tuple(prune_sections)
+    reduction = measure_reduction(component, prune)
+    logger.info(
+        f"Compact profile: {reduction.full_bytes} -> {reduction.compact_bytes} bytes "
+        f"(-{reduction.bytes_saved_pct:.1f}%), ~{reduction.full_tokens} -> ~{reduction.compact_tokens} tokens "
+        f"(-{reduction.tokens_saved_pct:.1f}%)."
+    )
+    return compact_assets(component, prune)
 
-    for i, file in enumerate(files_to_copy):
-        with importlib.resources.as_file(file) as src_path:
-            shutil.copy2(src_path, modes_dst)
-        if progress_bar:
-            progress_bar.update(i + 1)
+def _profile_options(profile: str, prune_sections: Sequence[str]) -> dict:
+    """The manifest options `superqwen verify` and `superqwen update` rebuild the installed files from."""
+    return {"profile": profile, "prune_sections": list(prune_sections) if profile != "full" else []}
 
-    logger.info(f"Copied {len(files_to_copy)} mode files.")
+@traced("install.commands")
+def install_commands(progress_bar: Optional["ProgressBar"] = None, staged: bool = False,
+                     link_mode: str = "copy", qwen_dir: Path = QWEN_DIR, profile: str = "full",
+                     prune_sections: Sequence[str] = ()) -> SyncResult:
+    logger.info("Installing Commands...")
+    # Commands are installed with their fragment includes rendered (see prompt_compiler.py).
+    assets = _profile_assets("commands", profile, prune_sections) or compile_commands()
+    # commands/sq belongs to SuperQwen alone, so commands dropped from the package are pruned.
+    return _install_files("command", "commands", ".toml", qwen_dir / "commands" / "sq", qwen_dir,
+                          prune=True, progress_bar=progress_bar, staged=staged, link_mode=link_mode,
+                          assets=assets, options=_profile_options(profile, prune_sections))
 
-def install_agents(progress_bar: Optional[ProgressBar] = None):
-    logger.info("Installing Agents...")
-    agents_dst = QWEN_DIR / "agents"
-    agents_dst.mkdir(exist_ok=True)
+@traced("install.modes")
+def install_modes(progress_bar: Optional["ProgressBar"] = None, staged: bool = False,
+                  link_mode: str = "copy", qwen_dir: Path = QWEN_DIR) -> SyncResult:
+    logger.info("Installing Modes...")
+    return _install_files("mode", "modes", ".md", qwen_dir / "modes", qwen_dir, progress_bar=progress_bar,
+                          staged=staged, link_mode=link_mode)
 
-    files = get_package_files("agents")
-    files_to_copy = [f for f in files if f.name.endswith('.md')]
+@traced("install.agents")
+def install_agents(progress_bar: Optional["ProgressBar"] = None, staged: bool = False,
+                   link_mode: str = "copy", qwen_dir: Path = QWEN_DIR, profile: str = "full",
+                   prune_sections: Sequence[str] = ()) -> SyncResult:
+    logger.info("Installing Agents...")
+    return _install_files("agent", "agents", ".md", qwen_dir / "agents", qwen_dir, progress_bar=progress_bar,
+                          staged=staged, link_mode=link_mode,
+                          assets=_profile_assets("agents", profile, prune_sections),
+                          options=_profile_options(profile, prune_sections))
 
-    if progress_bar:
-        progress_bar.total = len(files_to_copy)
+def _npm_package_name(package_arg: str) -> str:
+    """Strips the version from an npx package spec, keeping the scope (e.g. '@scope/pkg@latest' -> '@scope/pkg')."""
+    name, sep, _version = package_arg.rpartition('@')
+    return name if sep and name else package_arg
 
-    for i, file in enumerate(files_to_copy):
-        with importlib.resources.as_file(file) as src_path:
-            shutil.copy2(src_path, agents_dst)
-        if progress_bar:
-            progress_bar.update(i + 1)
+def _verify_npx_package(package_arg: str, cache: Optional[RegistryCache] = None, offline: bool = False) -> bool:
+    """
+    Verifies if an npx package is available in the npm registry.
 
-    logger.info(f"Copied {len(files_to_copy)} agent files.")
+    Fresh entries in the registry cache answer without running npm. In offline
+    mode the cache is trusted regardless of age and npm is never invoked.
+    """
+    package_name = _npm_package_name(package_arg)
+    if cache is not None:
+        cached_version = cache.lookup(package_name, ignore_ttl=offline)
+        if cached_version:
+            logger.info(f"    - npm package '{package_name}' verified from cache ({cached_version}).")
+            return True
+    if offline:
+        logger.warning(f"    - Offline and no cached result for npm package '{package_name}'.")
+        return False
 
-def _verify_npx_package(package_arg: str) -> bool:
-    """Verifies if an npx package is available in the npm registry."""
     if not shutil.which("npm"):
         logger.warning("`npm` command not found, cannot verify npx packages.")
         return False
 
-    package_name = package_arg.split('@')[1] if '@' in package_arg else package_arg
     logger.info(f"    - Verifying npm package '{package_name}'...")
     try:
-        result = subprocess.run(
-            ["npm", "view", package_name, "version"],
-            capture_output=True, text=True, check=True
-        )
-        return result.returncode == 0 and result.stdout.strip()
+        with span("subprocess.npm", command=f"npm view {package_name} version"):
+            result = subprocess.run(
+                ["npm", "view", package_name, "version"],
+                capture_output=True, text=True, check=True, timeout=MCP_VERIFY_TIMEOUT
+            )
+    except subprocess.TimeoutExpired:
+        logger.warning(f"    - Timed out after {MCP_VERIFY_TIMEOUT}s verifying npm package '{package_name}'.")
+        return False
     except (subprocess.CalledProcessError, FileNotFoundError):
         logger.warning(f"    - npm package '{package_name}' not found in registry.")
         return False
 
-def install_mcp(progress_bar: Optional[ProgressBar] = None):
-    logger.info("Installing MCP Config...")
-    settings_file = QWEN_DIR / "settings.json"
+    version = result.stdout.strip()
+    if version and cache is not None:
+        cache.store(package_name, version)
+    return bool(version)
 
-    default_mcp_servers = {
-        "serena": {"command": "serena-mcp-server", "args": ["--context", "ide-assistant", "--project", "/path/to/your/project"]},
-        "context7": {"command": "npx", "args": ["-y", "@upstash/context7-mcp@latest"]},
-        "sequential": {"command": "npx", "args": ["-y", "@modelcontextprotocol/server-sequential-thinking"]}
-    }
+def _verify_mcp_server(name: str, config: dict, cache: Optional[RegistryCache] = None, offline: bool = False) -> bool:
+    """Checks that an MCP server's command exists and, for npx servers, that its package is published."""
+    with span("mcp.probe", server=name) as probe:
+        is_verified = _probe_mcp_server(name, config, cache, offline)
+        probe.set(verified=is_verified)
+    return is_verified
+
+def _probe_mcp_server(name: str, config: dict, cache: Optional[RegistryCache], offline: bool) -> bool:
+    command_to_check = config["command"]
+    if not shutil.which(command_to_check):
+        logger.warning(f"  - Command '{command_to_check}' not found, skipping '{name}'.")
+        return False
+
+    is_verified = True
+    if command_to_check == "npx":
+        npx_package_arg = next((arg for arg in config["args"] if arg.startswith('@')), None)
+        if npx_package_arg:
+            is_verified = _verify_npx_package(npx_package_arg, cache, offline)
+
+    if is_verified:
+        logger.info(f"  ✓ Detected and verified '{command_to_check}', adding '{name}' to config.")
+    else:
+        logger.warning(f"  - Verification failed for '{name}', skipping.")
+    return is_verified
+
+@traced("mcp.verify")
+def verify_mcp_servers(servers: Optional[List[str]] = None, offline: bool = False, refresh_cache: bool = False,
+                       progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> Dict[str, dict]:
+    """
+    Selects servers from the bundled catalog and keeps the ones that can run on this machine.
+
+    Args:
+        servers: Catalog entries to check, by config name or server name;
+            defaults to DEFAULT_MCP_SERVERS
+        offline: Never call npm; trust cached registry results regardless of age
+        refresh_cache: Discard cached registry results before verifying
+        progress_bar: Optional progress bar, advanced once per server
+        qwen_dir: Qwen directory holding the registry cache
+
+    Returns:
+        The verified servers, mapping server name to config in catalog order
+    """
+    selected_servers, unknown = select_servers(servers)
+    for key in unknown:
+        logger.warning(f"  - Unknown MCP server '{key}', skipping. Available: {', '.join(load_catalog())}")
 
     if progress_bar:
-        progress_bar.total = len(default_mcp_servers)
-
-    verified_mcp_servers = {}
-    progress_step = 0
-
-    for name, config in default_mcp_servers.items():
-        command_to_check = config["command"]
-        if shutil.which(command_to_check):
-            is_verified = True
-            if command_to_check == "npx":
-                npx_package_arg = next((arg for arg in config["args"] if arg.startswith('@')), None)
-                if npx_package_arg:
-                    is_verified = _verify_npx_package(npx_package_arg)
-
-            if is_verified:
-                logger.info(f"  ✓ Detected and verified '{command_to_check}', adding '{name}' to config.")
-                verified_mcp_servers[name] = config
-            else:
-                logger.warning(f"  - Verification failed for '{name}', skipping.")
-        else:
-            logger.warning(f"  - Command '{command_to_check}' not found, skipping '{name}'.")
-
-        progress_step += 1
-        if progress_bar:
-            progress_bar.update(progress_step)
-
-    if not verified_mcp_servers:
-        logger.warning("No MCP servers could be verified. Skipping settings.json creation.")
+        progress_bar.total = len(selected_servers)
+
+    # Each check may spawn an `npm view` round-trip, so run them side by side and
+    # let the whole step take as long as the slowest server rather than the sum.
+    cache = RegistryCache.load(qwen_dir)
+    if refresh_cache:
+        cache.clear()
+    verified_names = set()
+    workers = max(1, min(MCP_VERIFY_WORKERS, len(selected_servers)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_verify_mcp_server, name, config, cache, offline): name
+            for name, config in selected_servers.items()
+        }
+        for progress_step, future in enumerate(as_completed(futures), 1):
+            if future.result():
+                verified_names.add(futures[future])
+            if progress_bar:
+                progress_bar.update(progress_step)
+    cache.save()
+
+    return {name: config for name, config in selected_servers.items() if name in verified_names}
+
+@traced("install.mcp")
+def install_mcp(progress_bar: Optional["ProgressBar"] = None, offline: bool = False, refresh_cache: bool = False,
+                servers: Optional[List[str]] = None, qwen_dir: Path = QWEN_DIR,
+                verified_servers: Optional[Dict[str, dict]] = None):
+    """
+    Verifies MCP servers from the bundled catalog and merges the verified ones into settings.json.
+
+    Args:
+        progress_bar: Optional progress bar, advanced once per server
+        offline: Never call npm; trust cached registry results regardless of age
+        refresh_cache: Discard cached registry results before verifying
+        servers: Catalog entries to install, by config name or server name;
+            defaults to DEFAULT_MCP_SERVERS
+        qwen_dir: Qwen directory to configure
+        verified_servers: Result of an earlier verify_mcp_servers() call to
+            reuse instead of verifying again
+    """
+    logger.info("Installing MCP Config...")
+    settings_file = qwen_dir / "settings.json"
+
+    if verified_servers is None:
+        verified_servers = verify_mcp_servers(servers, offline, refresh_cache, progress_bar, qwen_dir)
+
+    if not verified_servers:
+        logger.warning("No MCP servers could be verified. Skipping settings.json update.")
+        return
+
+    for name, config in verified_servers.items():
+        env_vars = missing_env_vars(config)
+        if env_vars:
+            logger.warning(f"  - '{name}' needs {', '.join(env_vars)} set in settings.json before it can start.")
+
+    try:
+        changed = merge_mcp_servers(settings_file, verified_servers)
+    except ValueError as e:
+        logger.error(f"Not updating MCP config: {e}")
         return
 
-    final_settings = {"mcpServers": verified_mcp_servers}
+    manifest = Manifest.load(qwen_dir)
+    entry = manifest.get(settings_file)
+    installed_servers = sorted(set(entry.get("servers", []) if entry else []) | set(verified_servers))
+    manifest.record("mcp", settings_file, file_digest(settings_file), servers=installed_servers)
+    manifest.save()
+
+    if changed:
+        logger.info(f"Configured MCP servers: {', '.join(changed)}.")
+    else:
+        logger.info("MCP config already up to date.")
+
+@traced("install.context")
+def install_context(progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR,
+                    modes: Optional[Sequence[str]] = None, budget: Optional[int] = None,
+                    priorities: Sequence[str] = (), sections: bool = False, layout: str = "append") -> bool:
+    """
+    Composes Core, the selected Modes and the docs of the MCP servers in settings.json into QWEN.md.
+
+    Run it after install_mcp, so that the MCP docs match the configured servers.
+
+    Args:
+        progress_bar: Optional progress bar
+        qwen_dir: Qwen directory to configure
+        modes: Modes to include, by name (e.g. Brainstorming); all modes by default
+        budget: Token budget for the block; the agents become candidates too and
+            the planner picks what fits (see context_planner)
+        priorities: KEY=WEIGHT priorities for the planner, e.g. 'agent=0.5'
+        sections: Let the planner pick single `##` sections
+        layout: "append" adds the block after the text already in QWEN.md;
+            "stable" puts it first, normalized, with the digest at its end
+
+    Returns:
+        True if the context block was written, False if it was up to date or could not be composed
+
+    Raises:
+        ValueError: If an unknown mode or layout is requested, a priority is invalid or the budget is too small
+    """
+    logger.info("Installing Context...")
+    context_file = qwen_dir / CONTEXT_FILENAME
+    selected_modes, weights = check_context_options(modes, budget, priorities, sections, layout)
+    try:
+        mcp_docs = configured_mcp_docs(qwen_dir / "settings.json")
+    except ValueError as e:
+        logger.error(f"Not composing the context file: {e}")
+        return False
+    digest, block, summary = _compose_block(qwen_dir, selected_modes, mcp_docs, weights, budget, sections, layout)
+    try:
+        previous = read_context(context_file)
+        written = write_context(context_file, digest, block, layout)
+    except ValueError as e:
+        logger.error(f"Not composing the context file: {e}")
+        return False
+    if progress_bar:
+        progress_bar.total = 1
+        progress_bar.update(1)
+
+    manifest = Manifest.load(qwen_dir)
+    # The options are kept so that `superqwen update` can compose the context the same way again.
+    options = {"modes": list(modes or []), "budget": budget, "priorities": list(priorities),
+               "sections": sections, "layout": layout}
+    manifest.record("context", context_file, file_digest(context_file), context_digest=digest, options=options)
+    manifest.save()
+    if written:
+        logger.info(f"Composed {summary} into {context_file} ({len(block)} bytes).")
+        if previous:
+            current = read_context(context_file)
+            kept = len(os.path.commonprefix([previous, current]).encode("utf-8"))
+            logger.info(f"The first {kept} of {len(current.encode('utf-8'))} bytes are unchanged, "
+                        f"so cached prompt prefixes stay valid up to there.")
+    else:
+        logger.info(f"Context file already up to date ({summary}).")
+    return written
+
+def expected_context(qwen_dir: Path = QWEN_DIR, modes: Optional[Sequence[str]] = None, budget: Optional[int] = None,
+                     priorities: Sequence[str] = (), sections: bool = False, layout: str = "append") -> Tuple[str, str]:
+    """
+    Composes the block install_context would write into qwen_dir with these options, without writing it.
+
+    Returns:
+        A (digest, block) tuple
+
+    Raises:
+        ValueError: If an option or settings.json is invalid
+    """
+    selected_modes, weights = check_context_options(modes, budget, priorities, sections, layout)
+    mcp_docs = configured_mcp_docs(qwen_dir / "settings.json")
+    digest, block, _summary = _compose_block(qwen_dir, selected_modes, mcp_docs, weights, budget, sections, layout)
+    return digest, block
+
+def _compose_block(qwen_dir: Path, modes: Sequence[Asset], mcp_docs: Sequence[Asset], priorities: Dict[str, float],
+                   budget: Optional[int], sections: bool, layout: str) -> Tuple[str, str, str]:
+    """Composes the context block, planned if there is a budget; returns digest, block and a summary for the log."""
+    if budget is None:
+        digest, block = compose_context(modes, mcp_docs, layout)
+        return digest, block, f"Core, {len(modes)} modes and {len(mcp_docs)} MCP docs"
+    plan = _plan_context(qwen_dir, budget, modes, mcp_docs, priorities, sections, layout)
+    if not plan.pieces:
+        logger.warning(f"No context document fits a budget of {budget} tokens.")
+    digest, block = compose_pieces(render_plan(plan, candidate_assets()), layout)
+    return digest, block, (f"{len(plan.documents)} documents, ~{plan.tokens} of {budget} tokens, "
+                           f"{len(plan.skipped)} left out")
+
+def check_context_options(modes: Optional[Sequence[str]] = None, budget: Optional[int] = None,
+                          priorities: Sequence[str] = (), sections: bool = False,
+                          layout: str = "append") -> Tuple[List[Asset], Dict[str, float]]:
+    """
+    Validates install_context options before anything is installed.
+
+    Returns:
+        The selected mode documents and the parsed priorities
+
+    Raises:
+        ValueError: If a mode, priority or layout is invalid, or priorities or sections are given without a budget
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown context layout '{layout}', expected one of {', '.join(LAYOUTS)}.")
+    selected_modes = select_modes(modes)
+    if budget is None and (priorities or sections):
+        raise ValueError("--priority and --context-sections need --context-budget.")
+    if budget is not None and budget <= approx_tokens(frame(layout)):
+        raise ValueError(f"A context budget of {budget} tokens does not leave room for any document; "
+                         f"the block markers alone take ~{approx_tokens(frame(layout))}.")
+    weights = parse_priorities(priorities)
+    check_priorities(weights)
+    return selected_modes, weights
 
-    with open(settings_file, "w") as f:
-        json.dump(final_settings, f, indent=2)
-    logger.info("Configured verified MCP servers.")
+def _plan_context(qwen_dir: Path, budget: int, modes: Sequence[Asset], mcp_docs: Sequence[Asset],
+                  priorities: Dict[str, float], sections: bool, layout: str) -> ContextPlan:
+    """Plans the budgeted context over Core, the selected modes, the configured MCP docs and all agents."""
+    index = load_plan_index(qwen_dir)
+    candidates = [f"core/{asset.name[:-len('.md')]}" for asset in load_assets("core", ".md")]
+    candidates += [f"mode/{asset.name[:-len('.md')]}" for asset in modes]
+    candidates += [f"mcp/{asset.name[:-len('.md')]}" for asset in mcp_docs]
+    candidates += [doc for doc in index["documents"] if doc.startswith("agent/")]
+    with span("context.plan", budget=budget, candidates=len(candidates)) as plan_span:
+        plan = plan_context(budget, candidates, priorities, sections, index,
+                            overhead=get_tokenizer(index["tokenizer"])(frame(layout)))
+        plan_span.set(pieces=len(plan.pieces), tokens=plan.tokens)
+    return plan
 
 INSTALL_MAP = {
     "commands": install_commands,
     "modes": install_modes,
     "agents": install_agents,
     "mcp": install_mcp,
+    "context": install_context,
 }
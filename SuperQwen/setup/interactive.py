@@ -1,8 +1,7 @@
-import time
 import typer
 
 from . import ui
-from .installer import INSTALL_MAP
+from .installer import INDEXED_COMPONENTS, INSTALL_MAP, write_indexes
 from .uninstaller import UNINSTALL_MAP
 
 def handle_interactive_install():
@@ -10,7 +9,7 @@ def handle_interactive_install():
     ui.display_header("SuperQwen Installer", "Interactive Setup")
 
     menu_options = [
-        "Core Components (Commands, Modes, Agents)",
+        "Core Components (Commands, Modes, Agents, Context)",
         "MCP Config (for advanced users)",
         "All of the above"
     ]
@@ -24,11 +23,11 @@ def handle_interactive_install():
 
     tasks_to_run = []
     if choice == 0: # Core
-        tasks_to_run.extend(['commands', 'modes', 'agents'])
+        tasks_to_run.extend(['commands', 'modes', 'agents', 'context'])
     elif choice == 1: # MCP
         tasks_to_run.append('mcp')
     elif choice == 2: # All
-        tasks_to_run.extend(['commands', 'modes', 'agents', 'mcp'])
+        tasks_to_run.extend(['commands', 'modes', 'agents', 'mcp', 'context'])
 
     if not tasks_to_run:
         ui.display_warning("No components selected. Exiting.")
@@ -45,6 +44,8 @@ def handle_interactive_install():
                 progress_bar = ui.ProgressBar(1, prefix=f"{component.capitalize()}: ")
                 INSTALL_MAP[component](progress_bar=progress_bar)
                 progress_bar.finish()
+        if INDEXED_COMPONENTS.intersection(tasks_to_run):
+            write_indexes()
 
         ui.display_success("\n✅ Interactive installation complete!")
     else:
@@ -56,7 +57,7 @@ def handle_interactive_uninstall():
     ui.display_header("SuperQwen Uninstaller", "Interactive Removal")
 
     menu_options = [
-        "Core Components (Commands, Modes, Agents)",
+        "Core Components (Commands, Modes, Agents, Context)",
         "MCP Config",
         "All of the above"
     ]
@@ -70,11 +71,11 @@ def handle_interactive_uninstall():
 
     tasks_to_run = []
     if choice == 0: # Core
-        tasks_to_run.extend(['commands', 'modes', 'agents'])
+        tasks_to_run.extend(['commands', 'modes', 'agents', 'context'])
     elif choice == 1: # MCP
         tasks_to_run.append('mcp')
     elif choice == 2: # All
-        tasks_to_run.extend(['commands', 'modes', 'agents', 'mcp'])
+        tasks_to_run.extend(['commands', 'modes', 'agents', 'mcp', 'context'])
 
     if not tasks_to_run:
         ui.display_warning("No components selected. Exiting.")
@@ -88,12 +89,8 @@ def handle_interactive_uninstall():
             if component in UNINSTALL_MAP:
                 ui.display_step(i, total_tasks, f"Uninstalling {component}...")
 
-                # Uninstall progress is not easy to track, so we keep the simulation here
-                progress_bar = ui.ProgressBar(100, prefix=f"{component.capitalize()}: ")
-                UNINSTALL_MAP[component]()
-                for j in range(101):
-                    time.sleep(0.01)
-                    progress_bar.update(j)
+                progress_bar = ui.ProgressBar(1, prefix=f"{component.capitalize()}: ")
+                UNINSTALL_MAP[component](progress_bar=progress_bar)
                 progress_bar.finish()
 
         ui.display_success("\n✅ Interactive uninstallation complete!")
@@ -1,5 +1,18 @@
 import logging
-from rich.logging import RichHandler
+
+class _LazyRichHandler(logging.Handler):
+    """Imports rich and builds the real RichHandler only when the first record is emitted."""
+
+    def __init__(self):
+        super().__init__()
+        self._handler = None
+
+    def emit(self, record):
+        if self._handler is None:
+            from rich.logging import RichHandler
+            self._handler = RichHandler(rich_tracebacks=True, show_path=False)
+            self._handler.setFormatter(self.formatter)
+        self._handler.emit(record)
 
 def setup_logger():
     """Sets up a logger for the application."""
@@ -7,7 +20,7 @@ def setup_logger():
         level="INFO",
         format="%(message)s",
         datefmt="[%X]",
-        handlers=[RichHandler(rich_tracebacks=True, show_path=False)]
+        handlers=[_LazyRichHandler()]
     )
     log = logging.getLogger("rich")
     return log
@@ -0,0 +1,170 @@
+"""
+Install manifest for SuperQwen
+
+Records every file SuperQwen writes under the Qwen directory together with
+its component, size, mtime and SHA-256 digest, so install can diff against
+what is already there, uninstall can remove exactly what was installed and
+verify can detect drift.
+"""
+
+import json
+import os
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+from .. import __version__
+from .file_utils import QWEN_DIR, STATE_DIRNAME, file_digest
+from .logging import logger
+
+MANIFEST_VERSION = 1
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _is_safe_key(root: Path, key: str) -> bool:
+    """
+    True if a manifest key names a file inside root.
+
+    Keys are relative POSIX paths without '..'; the directory they name must
+    resolve under root, so a symlinked directory cannot point a key elsewhere.
+    The file itself may be a symlink (see the symlink link mode).
+    """
+    if not isinstance(key, str) or not key or "\\" in key:
+        return False
+    path = PurePosixPath(key)
+    if path.is_absolute() or ".." in path.parts or path.name in ("", "."):
+        return False
+    try:
+        (root / key).parent.resolve().relative_to(root.resolve())
+    except (ValueError, OSError, RuntimeError):
+        return False
+    return True
+
+
+class Manifest:
+    """In-memory view of the install manifest, keyed by path relative to the Qwen directory."""
+
+    def __init__(self, root: Path, entries: Optional[Dict[str, dict]] = None, package_version: str = ''):
+        self.root = root
+        self.entries: Dict[str, dict] = entries or {}
+        self.package_version = package_version
+        self._dirty = False
+
+    @property
+    def path(self) -> Path:
+        return self.root / STATE_DIRNAME / MANIFEST_FILENAME
+
+    @classmethod
+    def load(cls, root: Path = QWEN_DIR) -> "Manifest":
+        """Loads the manifest for root, returning an empty one if it is missing or unreadable."""
+        manifest_path = root / STATE_DIRNAME / MANIFEST_FILENAME
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError, OSError):
+            return cls(root)
+        if not isinstance(data, dict) or data.get("manifest_version") != MANIFEST_VERSION:
+            return cls(root)
+        files = data.get("files")
+        entries = {}
+        for key, entry in (files.items() if isinstance(files, dict) else []):
+            if isinstance(entry, dict) and "component" in entry and _is_safe_key(root, key):
+                entries[key] = entry
+            else:
+                logger.warning(f"Ignoring manifest entry '{key}' in {manifest_path}: not a file under {root}.")
+        manifest = cls(root, entries, data.get("package_version", ''))
+        # Dropped entries are written out of the manifest on the next save.
+        manifest._dirty = len(entries) != len(files or {})
+        return manifest
+
+    def save(self) -> None:
+        """Writes the manifest atomically if anything changed since it was loaded."""
+        if not self._dirty and self.package_version == __version__:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "manifest_version": MANIFEST_VERSION,
+            "package_version": __version__,
+            "files": self.entries,
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.package_version = __version__
+        self._dirty = False
+
+    def relpath(self, path: Path) -> str:
+        return path.relative_to(self.root).as_posix()
+
+    def get(self, path: Path) -> Optional[dict]:
+        return self.entries.get(self.relpath(path))
+
+    def record(self, component: str, path: Path, digest: str, stat: Optional[os.stat_result] = None, **extra) -> None:
+        """
+        Records path as installed by component.
+
+        The file must already exist unless its stat is passed in (e.g. from a
+        staging copy that has not been moved into place yet). Extra keyword
+        arguments are stored alongside the entry (e.g. the MCP server names
+        SuperQwen wrote into settings.json).
+        """
+        stat = stat or path.stat()
+        entry = {
+            "component": component,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "digest": digest,
+            **extra,
+        }
+        key = self.relpath(path)
+        if self.entries.get(key) != entry:
+            self.entries[key] = entry
+            self._dirty = True
+
+    def forget(self, path: Path) -> None:
+        if self.entries.pop(self.relpath(path), None) is not None:
+            self._dirty = True
+
+    def snapshot(self) -> Tuple[Dict[str, dict], bool]:
+        """Returns the current entries, to restore() if what was recorded since has to be undone."""
+        return dict(self.entries), self._dirty
+
+    def restore(self, snapshot: Tuple[Dict[str, dict], bool]) -> None:
+        entries, dirty = snapshot
+        self.entries = dict(entries)
+        self._dirty = dirty
+
+    def files_for(self, component: str) -> List[Path]:
+        """Returns the absolute paths recorded for a component."""
+        return [self.root / key for key, entry in self.entries.items() if entry["component"] == component]
+
+    def known_digest(self, path: Path, stat: os.stat_result) -> Optional[str]:
+        """
+        Returns the recorded digest of path if its size and mtime still match
+        the manifest, meaning the file has not been touched since it was written.
+        """
+        entry = self.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["digest"]
+        return None
+
+    def verify(self, component: Optional[str] = None) -> Tuple[List[Path], List[Path]]:
+        """
+        Checks recorded files against the disk.
+
+        Returns:
+            A (missing, modified) tuple of absolute paths
+        """
+        missing, modified = [], []
+        for key, entry in self.entries.items():
+            if component and entry["component"] != component:
+                continue
+            path = self.root / key
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                missing.append(path)
+                continue
+            if self.known_digest(path, stat) is None and file_digest(path) != entry["digest"]:
+                modified.append(path)
+        return missing, modified
@@ -0,0 +1,156 @@
+"""
+MCP server catalog and settings.json merge engine
+
+The catalog is built from the bundled MCP/configs/*.json files, each of
+which maps one server name to its Qwen CLI configuration. Merging touches
+only the mcpServers entries that differ, leaving the rest of the user's
+settings.json alone and skipping the write entirely when nothing changed.
+"""
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .file_utils import load_assets
+
+# Servers installed when no explicit selection is made; keys are config file stems.
+DEFAULT_MCP_SERVERS = ("serena", "context7", "sequential")
+
+# settings.json names older SuperQwen versions wrote, mapped to the catalog's server name.
+LEGACY_SERVER_NAMES = {"sequential": "sequential-thinking"}
+
+
+@lru_cache(maxsize=None)
+def load_catalog() -> Dict[str, Tuple[str, dict]]:
+    """
+    Reads the bundled MCP server configs once per process.
+
+    Returns:
+        A mapping of config file stem (e.g. 'sequential') to a
+        (server name, server config) tuple, in file name order
+    """
+    catalog = {}
+    for config_file in load_assets("mcp/configs", ".json"):
+        stem = config_file.name[:-len('.json')]
+        for server_name, server_config in json.loads(config_file.data.decode("utf-8")).items():
+            catalog[stem] = (server_name, server_config)
+    return catalog
+
+
+def select_servers(keys: Optional[Iterable[str]] = None) -> Tuple[Dict[str, dict], List[str]]:
+    """
+    Picks servers from the catalog by config stem or server name.
+
+    Args:
+        keys: Servers to select; the defaults are used when empty
+
+    Returns:
+        A (servers, unknown) tuple where servers maps server name to config
+        and unknown lists the requested keys that are not in the catalog
+    """
+    catalog = load_catalog()
+    by_name = {server_name: stem for stem, (server_name, _) in catalog.items()}
+    selected, unknown = {}, []
+    for key in (keys or DEFAULT_MCP_SERVERS):
+        stem = key if key in catalog else by_name.get(key)
+        if stem is None:
+            unknown.append(key)
+            continue
+        server_name, server_config = catalog[stem]
+        selected[server_name] = server_config
+    return selected, unknown
+
+
+def catalog_server_names() -> List[str]:
+    """Returns every server name the catalog can write to settings.json, including legacy names."""
+    return with_legacy_names(server_name for server_name, _ in load_catalog().values())
+
+
+def with_legacy_names(names: Iterable[str]) -> List[str]:
+    """Adds the legacy names older versions used for the given server names."""
+    names = list(names)
+    return names + [legacy for legacy, name in LEGACY_SERVER_NAMES.items() if name in names and legacy not in names]
+
+
+def missing_env_vars(server_config: dict) -> List[str]:
+    """Returns the env vars a server config declares but leaves empty, such as API keys."""
+    return [name for name, value in server_config.get("env", {}).items() if value == ""]
+
+
+def read_settings(settings_file: Path) -> dict:
+    """
+    Loads settings.json, treating a missing file as empty settings.
+
+    Raises:
+        ValueError: If the file exists but is not a JSON object
+    """
+    try:
+        with open(settings_file, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{settings_file} is not valid JSON: {e}") from e
+    if not isinstance(settings, dict):
+        raise ValueError(f"{settings_file} does not contain a JSON object.")
+    return settings
+
+
+def write_settings(settings_file: Path, settings: dict) -> None:
+    """Writes settings.json atomically so Qwen CLI never reads a partial file."""
+    settings_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = settings_file.with_name(settings_file.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, settings_file)
+
+
+def merge_mcp_servers(settings_file: Path, servers: Dict[str, dict]) -> List[str]:
+    """
+    Merges servers into the mcpServers section of settings_file.
+
+    Entries that already match are left untouched, as is everything outside
+    mcpServers. An entry under a legacy name (see LEGACY_SERVER_NAMES) is
+    replaced by the one under the current name. The file is only rewritten
+    if at least one entry changed.
+
+    Returns:
+        The names of the servers that were added, updated or renamed
+    """
+    settings = read_settings(settings_file)
+    mcp_servers = settings.setdefault("mcpServers", {})
+    renamed = [name for legacy, name in LEGACY_SERVER_NAMES.items() if name in servers and legacy in mcp_servers]
+    changed = [name for name, config in servers.items() if mcp_servers.get(name) != config or name in renamed]
+    if not changed:
+        return []
+    for legacy, name in LEGACY_SERVER_NAMES.items():
+        if name in renamed:
+            del mcp_servers[legacy]
+    for name in changed:
+        mcp_servers[name] = servers[name]
+    write_settings(settings_file, settings)
+    return changed
+
+
+def remove_mcp_servers(settings_file: Path, names: Iterable[str]) -> List[str]:
+    """
+    Removes the named servers from settings_file.
+
+    If nothing but an empty mcpServers section remains, the file is deleted.
+
+    Returns:
+        The names of the servers that were removed
+    """
+    settings = read_settings(settings_file)
+    mcp_servers = settings.get("mcpServers", {})
+    removed = [name for name in names if mcp_servers.pop(name, None) is not None]
+    if not removed:
+        return []
+    if not mcp_servers and set(settings) == {"mcpServers"}:
+        settings_file.unlink()
+    else:
+        write_settings(settings_file, settings)
+    return removed
@@ -0,0 +1,149 @@
+"""
+Prompt compilation for the bundled command TOMLs
+
+A command prompt can pull shared text in with an include directive on a
+line of its own:
+
+    {{include fragment/system-architect}}
+    {{include agent/security-engineer#Behavioral Mindset}}
+    {{include core/RULES#Safety Rules}}
+
+The part before the slash picks the package folder (see SOURCE_KINDS), the
+name is the file stem, and an optional '#Heading' narrows the include to
+the body of that markdown section. Frontmatter is never included, and
+included text may contain includes of its own. Includes are rendered when
+the commands are installed, so Qwen CLI only ever sees plain prompts.
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .file_utils import Asset, load_assets
+
+# Include kind -> (package subfolder, file suffix)
+SOURCE_KINDS: Dict[str, Tuple[str, str]] = {
+    "fragment": ("fragments", ".md"),
+    "agent": ("agents", ".md"),
+    "mode": ("modes", ".md"),
+    "core": ("core", ".md"),
+    "mcp": ("mcp", ".md"),
+}
+
+_INCLUDE = re.compile(r'^[ \t]*\{\{include\s+([\w-]+)/([\w.-]+)(?:#([^}]+))?\}\}[ \t]*$', re.MULTILINE)
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_FRONTMATTER = re.compile(r'\A---\s*\n.*?\n---\s*\n', re.DOTALL)
+
+
+def find_includes(text: str) -> List[str]:
+    """Returns the references ('kind/name' or 'kind/name#Heading') included by text, in order."""
+    return [f"{kind}/{name}" + (f"#{heading.strip()}" if heading else "")
+            for kind, name, heading in _INCLUDE.findall(text)]
+
+
+def extract_section(text: str, heading: str) -> Optional[str]:
+    """
+    Returns the body of the markdown section titled heading, without the heading line.
+
+    The section ends at the next heading of the same or a higher level.
+    Headings inside fenced code blocks are ignored.
+    """
+    lines = text.splitlines()
+    start = level = None
+    in_fence = False
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("```"):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _HEADING.match(line)
+        if not match:
+            continue
+        if start is not None and len(match.group(1)) <= level:
+            return "\n".join(lines[start:i]).strip("\n")
+        if start is None and match.group(2) == heading:
+            start, level = i + 1, len(match.group(1))
+    if start is None:
+        return None
+    return "\n".join(lines[start:]).strip("\n")
+
+
+def _find_source(kind: str, name: str) -> Asset:
+    if kind not in SOURCE_KINDS:
+        raise ValueError(f"Unknown include kind '{kind}', expected one of {', '.join(SOURCE_KINDS)}.")
+    subfolder, suffix = SOURCE_KINDS[kind]
+    for asset in load_assets(subfolder, suffix):
+        if asset.name == name + suffix:
+            return asset
+    raise ValueError(f"Included {kind} '{name}' does not exist.")
+
+
+def _expand(text: str, stack: Tuple[str, ...], sources: List[Asset]) -> str:
+    """Replaces every include in text with the (recursively expanded) text it refers to."""
+    def replace(match) -> str:
+        kind, name, heading = match.group(1), match.group(2), match.group(3)
+        ref = f"{kind}/{name}" + (f"#{heading.strip()}" if heading else "")
+        if ref in stack:
+            raise ValueError(f"Include cycle: {' -> '.join(stack + (ref,))}.")
+        source = _find_source(kind, name)
+        sources.append(source)
+        body = _FRONTMATTER.sub("", source.data.decode("utf-8"), count=1)
+        if heading:
+            section = extract_section(body, heading.strip())
+            if section is None:
+                raise ValueError(f"{kind} '{name}' has no section '{heading.strip()}'.")
+            body = section
+        return _expand(body.strip("\n"), stack + (ref,), sources)
+
+    return _INCLUDE.sub(replace, text)
+
+
+def render_include(ref: str) -> str:
+    """
+    Returns the text an include of ref ('kind/name' or 'kind/name#Heading') renders to.
+
+    Raises:
+        ValueError: If ref is unknown, has no such section or is cyclic
+    """
+    return _expand(f"{{{{include {ref}}}}}", (), [])
+
+
+def toml_escape(text: str) -> str:
+    """Escapes text for a TOML multi-line basic string."""
+    return text.replace("\\", "\\\\").replace('"""', '""\\"')
+
+
+def compile_command(asset: Asset) -> Asset:
+    """
+    Renders the includes of one command TOML.
+
+    Commands without includes are returned unchanged. A rendered command is
+    no longer backed by a package file, so link modes write it as a copy;
+    its mtime is the newest of the files it was built from, so editing a
+    fragment invalidates the installed copy.
+
+    Raises:
+        ValueError: If an include is unknown, has no such section or is cyclic
+    """
+    text = asset.data.decode("utf-8")
+    if not _INCLUDE.search(text):
+        return asset
+
+    sources: List[Asset] = []
+
+    def replace(match) -> str:
+        return toml_escape(_expand(match.group(0).strip(), (f"command/{asset.name}",), sources))
+
+    try:
+        data = _INCLUDE.sub(replace, text).encode("utf-8")
+    except ValueError as e:
+        raise ValueError(f"{asset.name}: {e}") from e
+    mtimes = [a.mtime_ns for a in [asset, *sources]]
+    mtime_ns = None if None in mtimes else max(mtimes)
+    return Asset(asset.name, data, hashlib.sha256(data).hexdigest(), mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def compile_commands() -> Tuple[Asset, ...]:
+    """Returns the bundled command TOMLs with their includes rendered, as installed."""
+    return tuple(compile_command(asset) for asset in load_assets("commands", ".toml"))
@@ -0,0 +1,92 @@
+"""
+On-disk cache of npm registry verification results
+
+`npm view <pkg> version` costs a subprocess and a network round-trip, yet
+its answer rarely changes within a day. Successful lookups are stored with
+a timestamp and reused until they are older than the TTL.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from .file_utils import QWEN_DIR, STATE_DIRNAME
+
+CACHE_FILENAME = "npm-registry-cache.json"
+# Seconds a cached registry lookup stays valid; override with SUPERQWEN_NPM_CACHE_TTL.
+DEFAULT_TTL = 24 * 60 * 60
+
+
+def _ttl_from_env() -> float:
+    try:
+        return float(os.environ.get("SUPERQWEN_NPM_CACHE_TTL", DEFAULT_TTL))
+    except ValueError:
+        return DEFAULT_TTL
+
+
+class RegistryCache:
+    """Maps npm package names to the version last seen in the registry and when it was checked."""
+
+    def __init__(self, path: Path, entries: Optional[Dict[str, dict]] = None, ttl: Optional[float] = None):
+        self.path = path
+        self.entries: Dict[str, dict] = entries or {}
+        self.ttl = _ttl_from_env() if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, root: Path = QWEN_DIR, ttl: Optional[float] = None) -> "RegistryCache":
+        """Loads the cache for root, returning an empty one if it is missing or unreadable."""
+        cache_path = root / STATE_DIRNAME / CACHE_FILENAME
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                entries = json.load(f).get("packages", {})
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError, OSError):
+            entries = {}
+        return cls(cache_path, entries, ttl)
+
+    def lookup(self, package_name: str, ignore_ttl: bool = False) -> Optional[str]:
+        """
+        Returns the cached version of package_name.
+
+        Args:
+            package_name: npm package name without a version suffix
+            ignore_ttl: Return the entry even if it has expired (used offline)
+
+        Returns:
+            The cached version, or None if there is no usable entry
+        """
+        with self._lock:
+            entry = self.entries.get(package_name)
+        if not entry:
+            return None
+        if not ignore_ttl and time.time() - entry["checked_at"] > self.ttl:
+            return None
+        return entry["version"]
+
+    def store(self, package_name: str, version: str) -> None:
+        with self._lock:
+            self.entries[package_name] = {"version": version, "checked_at": time.time()}
+            self._dirty = True
+
+    def clear(self) -> None:
+        """Drops every entry so the next lookups go to the registry."""
+        with self._lock:
+            if self.entries:
+                self.entries = {}
+                self._dirty = True
+
+    def save(self) -> None:
+        """Writes the cache atomically if it changed since it was loaded."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"packages": self.entries}, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
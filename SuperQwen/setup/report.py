@@ -0,0 +1,116 @@
+"""
+Machine-readable command results
+
+With `--output json`, install, uninstall, update and help print one JSON
+document instead of log lines, progress bars and tables:
+
+    {"report_version": 1, "command": "install all", "ok": true,
+     "package_version": "1.0.1", "duration_ms": 812.4,
+     "components": {"commands": {"copied": 21, "skipped": 0, "removed": 0, "duration_ms": 40.2},
+                    "mcp": {"servers": [...], "skipped_servers": [...], "duration_ms": 701.9}},
+     "messages": [{"level": "WARNING", "message": "..."}]}
+
+While a report is open, log records are collected into "messages" as
+plain text instead of going to the Rich handler, so Rich is never
+imported. Fields are only ever added within a report_version.
+"""
+
+import json
+import logging
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from .. import __version__
+from .file_utils import SyncResult
+from .logging import logger
+
+REPORT_VERSION = 1
+
+# List markers the installers put in front of their log lines.
+_BULLET = re.compile(r'^[-✓]\s+')
+
+
+class _Collector(logging.Handler):
+    def __init__(self, messages: List[Dict[str, str]]):
+        super().__init__(level=logging.WARNING)
+        self._messages = messages
+
+    def emit(self, record):
+        self._messages.append({"level": record.levelname, "message": _BULLET.sub("", record.getMessage().strip())})
+
+
+class Report:
+    """The result document of one command."""
+
+    def __init__(self, command: str):
+        self.command = command
+        self.ok = True
+        self.components: Dict[str, Dict[str, Any]] = {}
+        self.fields: Dict[str, Any] = {}
+        self.messages: List[Dict[str, str]] = []
+        self._start = time.perf_counter()
+        self._duration: Optional[float] = None
+
+    def add_component(self, name: str, duration: float, result: Optional[SyncResult] = None, **fields) -> None:
+        """Records one component's outcome; duration is in seconds."""
+        entry: Dict[str, Any] = {}
+        if result is not None:
+            entry.update(copied=result.copied, skipped=result.skipped, removed=result.removed)
+        entry.update(fields)
+        entry["duration_ms"] = round(duration * 1000, 1)
+        self.components[name] = entry
+
+    def fail(self, message: str) -> None:
+        self.ok = False
+        self.messages.append({"level": "ERROR", "message": message})
+
+    def finish(self) -> None:
+        self._duration = time.perf_counter() - self._start
+        if any(m["level"] in ("ERROR", "CRITICAL") for m in self.messages):
+            self.ok = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self._duration if self._duration is not None else time.perf_counter() - self._start
+        data: Dict[str, Any] = {
+            "report_version": REPORT_VERSION,
+            "command": self.command,
+            "ok": self.ok,
+            "package_version": __version__,
+            "duration_ms": round(duration * 1000, 1),
+        }
+        if self.components:
+            data["components"] = self.components
+        data.update(self.fields)
+        data["messages"] = self.messages
+        return data
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+@contextmanager
+def json_report(command: str) -> Iterator[Report]:
+    """
+    Opens a report for command, collecting warnings and errors logged meanwhile.
+
+    An exception raised in the block ends it and is recorded as a failure,
+    so the caller can still print the document.
+    """
+    report = Report(command)
+    collector = _Collector(report.messages)
+    previous = (logger.level, logger.propagate)
+    # INFO lines would not be kept anyway; skip formatting them.
+    logger.setLevel(logging.WARNING)
+    logger.propagate = False
+    logger.addHandler(collector)
+    try:
+        yield report
+    except Exception as e:
+        report.fail(f"{type(e).__name__}: {e}")
+    finally:
+        logger.removeHandler(collector)
+        logger.setLevel(previous[0])
+        logger.propagate = previous[1]
+        report.finish()
@@ -0,0 +1,205 @@
+"""
+Agent routing: match a task description to the bundled agents
+
+Every agent's name, description, `## Triggers`, `## Focus Areas` and
+`## Key Actions` sections are compiled into one weighted term vector per
+agent, stored next to the search index in
+~/.qwen/.superqwen/route-index.json. Words and adjacent word pairs
+('threat model') are weighted by the section they come from and by how
+few agents share them, and every vector is normalized so that long agent
+files do not win by length alone. Routing a task only looks up its own
+terms, so it takes the same time however long the agent files are. Task
+words are stemmed like search queries. A few common task words the agents
+never use stand for agent vocabulary (TASK_HINTS: 'xss' for 'security
+vulnerability'); any other unknown word matches every indexed word it is a
+prefix of ('auth' finds 'authentication' and 'authorization'), as in
+search_index._query_terms.
+"""
+
+import math
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .. import __version__
+from .asset_index import index_key, read_cache, write_cache
+from .assets import load_prompt_assets
+from .file_utils import QWEN_DIR, STATE_DIRNAME
+from .prompt_compiler import extract_section
+from .search_index import _STOPWORDS, _WORD, MIN_PREFIX_LENGTH, tokenize
+
+ROUTE_INDEX_VERSION = 3
+ROUTE_INDEX_FILENAME = "route-index.json"
+DEFAULT_ROUTE_LIMIT = 3
+
+# Section (or header field) -> weight of the terms found in it.
+ROUTE_SECTIONS: Dict[str, float] = {
+    "name": 3.0,
+    "description": 2.0,
+    "Triggers": 3.0,
+    "Focus Areas": 2.0,
+    "Key Actions": 1.0,
+}
+# A matching word pair counts this much more than its words alone.
+_PAIR_BOOST = 1.5
+# Words tasks use that no agent file does, and the agent vocabulary they stand for.
+TASK_HINTS: Dict[str, str] = {
+    "xss": "security vulnerability",
+    "csrf": "security vulnerability",
+    "exploit": "security vulnerability",
+    "login": "authentication",
+    "password": "authentication security",
+    "slow": "performance bottleneck",
+    "latency": "performance speed",
+}
+
+
+@dataclass
+class Route:
+    """An agent suggested for a task."""
+    agent: str
+    score: float
+    description: str
+    matched: List[str] = field(default_factory=list)
+
+
+def _terms(text: str) -> List[str]:
+    """Words plus adjacent word pairs, e.g. 'threat', 'model', 'threat model'."""
+    words = tokenize(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _task_terms(task: str, vectors: Dict[str, dict], vocabulary: List[str]) -> Dict[str, float]:
+    """
+    Maps a task to indexed terms and how much each counts: its words and
+    word pairs, the vocabulary of TASK_HINTS words, and prefix matches for
+    other unknown words. A word matching several terms by prefix counts once
+    in total, split among them, so 'app' does not outweigh 'speed'.
+    """
+    terms = {term: 1.0 for term in _terms(task)}
+    for word in _WORD.findall(task.lower()):
+        if word in _STOPWORDS or tokenize(word)[0] in vectors:
+            continue
+        if word in TASK_HINTS:
+            terms.update((term, 1.0) for term in tokenize(TASK_HINTS[word]))
+            continue
+        if len(word) < MIN_PREFIX_LENGTH:
+            continue
+        i = j = bisect_left(vocabulary, word)
+        while j < len(vocabulary) and vocabulary[j].startswith(word):
+            j += 1
+        for term in vocabulary[i:j]:
+            terms[term] = max(terms.get(term, 0.0), 1.0 / (j - i))
+    return {term: share for term, share in terms.items() if term in vectors}
+
+
+def build_route_index() -> dict:
+    """Compiles the routing vectors of all bundled agents as a JSON-ready dict."""
+    agents = load_prompt_assets(["agent"])
+    counts: Dict[str, Dict[str, float]] = {}
+    descriptions = {}
+    for asset in agents:
+        descriptions[asset.name] = asset.metadata.get("description", '')
+        texts = {
+            "name": asset.name.replace("-", " "),
+            "description": descriptions[asset.name],
+        }
+        for section in ROUTE_SECTIONS:
+            if section not in texts:
+                texts[section] = extract_section(asset.text, section) or ''
+        weights: Dict[str, float] = {}
+        for section, text in texts.items():
+            for term in _terms(text):
+                boost = _PAIR_BOOST if " " in term else 1.0
+                weights[term] = weights.get(term, 0.0) + ROUTE_SECTIONS[section] * boost
+        counts[asset.name] = weights
+
+    agent_frequency: Dict[str, int] = {}
+    for weights in counts.values():
+        for term in weights:
+            agent_frequency[term] = agent_frequency.get(term, 0) + 1
+
+    vectors: Dict[str, Dict[str, float]] = {}
+    for name, weights in counts.items():
+        vector = {
+            term: (1 + math.log(weight)) * math.log(1 + len(counts) / agent_frequency[term])
+            for term, weight in weights.items()
+        }
+        norm = math.sqrt(sum(value * value for value in vector.values())) or 1.0
+        for term, value in vector.items():
+            vectors.setdefault(term, {})[name] = round(value / norm, 5)
+
+    return {
+        "route_index_version": ROUTE_INDEX_VERSION,
+        "package_version": __version__,
+        "key": index_key(),
+        "descriptions": descriptions,
+        "terms": vectors,
+    }
+
+
+@lru_cache(maxsize=None)
+def _built_index() -> dict:
+    return build_route_index()
+
+
+def _index_path(root: Path) -> Path:
+    return root / STATE_DIRNAME / ROUTE_INDEX_FILENAME
+
+
+def write_route_index(root: Path = QWEN_DIR, force: bool = False) -> bool:
+    """
+    Writes the routing index under root unless an index for the current package is already there.
+
+    Returns:
+        True if the index was (re)built
+    """
+    path = _index_path(root)
+    if not force and read_cache(path, "route_index_version", ROUTE_INDEX_VERSION, index_key()) is not None:
+        return False
+    write_cache(path, _built_index())
+    return True
+
+
+def load_route_index(root: Path = QWEN_DIR) -> dict:
+    """Returns the installed routing index, rebuilding (and writing back) a missing or stale one."""
+    data = read_cache(_index_path(root), "route_index_version", ROUTE_INDEX_VERSION, index_key())
+    if data is not None:
+        return data
+    try:
+        write_route_index(root, force=True)
+    except OSError:
+        pass
+    return _built_index()
+
+
+def route(task: str, limit: int = DEFAULT_ROUTE_LIMIT, min_score: float = 0.0,
+          root: Path = QWEN_DIR, index: Optional[dict] = None) -> List[Route]:
+    """
+    Returns the agents best suited to a task description, best first.
+
+    Args:
+        task: Free-text task description; words are matched by stem, unknown words by TASK_HINTS or prefix
+        limit: Maximum number of agents
+        min_score: Leave out agents scoring below this
+        root: Qwen directory holding the installed index
+        index: An already loaded index, e.g. from load_route_index()
+    """
+    data = index if index is not None else load_route_index(root)
+    vectors = data["terms"]
+    vocabulary = sorted(term for term in vectors if " " not in term)
+    scores: Dict[str, float] = {}
+    matched: Dict[str, List[str]] = {}
+    for term, share in _task_terms(task, vectors, vocabulary).items():
+        for agent, weight in vectors[term].items():
+            scores[agent] = scores.get(agent, 0.0) + weight * share
+            matched.setdefault(agent, []).append(term)
+
+    routes = [
+        Route(agent, round(score, 3), data["descriptions"].get(agent, ''), matched[agent])
+        for agent, score in scores.items() if score >= min_score and score > 0
+    ]
+    routes.sort(key=lambda r: (-r.score, r.agent))
+    return routes[:limit]
@@ -0,0 +1,243 @@
+"""
+Full-text search over the bundled prompt assets
+
+An inverted index is built from the asset index (see asset_index.py) when
+components are installed and stored in ~/.qwen/.superqwen/search-index.json.
+Every markdown section of every command, agent, mode, Core and MCP
+document is a searchable unit; an asset's name, title and description form
+an extra, boosted unit. Postings hold precomputed BM25 weights, so a query
+only sums a few lists and needs no access to the documents themselves.
+Each posting list is stored as one "unit weight unit weight ..." string and
+only decoded for the terms of a query, which keeps loading the index cheap.
+"""
+
+import math
+import re
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .. import __version__
+from .asset_index import index_key, load_index, read_cache, write_cache
+from .assets import ASSET_KINDS, load_prompt_assets, parse_frontmatter
+from .file_utils import QWEN_DIR, STATE_DIRNAME
+
+SEARCH_INDEX_VERSION = 4
+SEARCH_INDEX_FILENAME = "search-index.json"
+DEFAULT_LIMIT = 10
+
+# BM25 parameters.
+_K1 = 1.2
+_B = 0.75
+# Terms in an asset's name, title and description count this many times.
+_HEADER_BOOST = 3
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SECTION = re.compile(r'^#{1,6}\s+(.+?)\s*$', re.MULTILINE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or that the their this to "
+    "was were will with when which while your you can all any not no do does "
+    "i me my mine we us our".split()
+)
+# Shorter unknown words are not expanded by prefix; 'ap' would match half the index.
+MIN_PREFIX_LENGTH = 3
+_SUFFIXES = ("ing", "ed", "es", "s")
+
+
+@dataclass
+class SearchResult:
+    """One asset matching a query, with the section that matched best."""
+    key: str
+    section: str
+    score: float
+    description: str
+
+
+def _stem(word: str) -> str:
+    # 'queries' and 'query' must meet, so 'ies' becomes 'y' before 'es' and 's' are tried.
+    if len(word) > 5 and word.endswith("ies"):
+        return word[:-3] + "y"
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercases, splits into words, drops stop words and strips common suffixes."""
+    return [_stem(word) for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def _sections(text: str) -> List[Tuple[str, str]]:
+    """Splits a markdown document into (heading, text) pairs; text before the first heading has heading ''."""
+    _metadata, body = parse_frontmatter(text)
+    sections = []
+    heading, start = '', 0
+    for match in _SECTION.finditer(body):
+        sections.append((heading, body[start:match.start()]))
+        heading, start = match.group(1), match.end()
+    sections.append((heading, body[start:]))
+    return [(heading, text) for heading, text in sections if heading or text.strip()]
+
+
+def build_search_index() -> dict:
+    """Builds the inverted index of all bundled prompt assets as a JSON-ready dict."""
+    entries = {entry.key: entry for entry in load_index()}
+    units: List[Tuple[str, str, Dict[str, int]]] = []  # (asset key, section, term counts)
+
+    for asset in load_prompt_assets():
+        entry = entries.get(asset.key)
+        header = f"{asset.name.replace('-', ' ').replace('_', ' ')} {entry.title if entry else ''} " \
+                 f"{entry.description if entry else ''}"
+        counts: Dict[str, int] = {}
+        for term in tokenize(header):
+            counts[term] = counts.get(term, 0) + _HEADER_BOOST
+        units.append((asset.key, '', counts))
+        for heading, text in _sections(asset.text):
+            counts = {}
+            for term in tokenize(f"{heading}\n{text}"):
+                counts[term] = counts.get(term, 0) + 1
+            if counts:
+                units.append((asset.key, heading, counts))
+
+    lengths = [sum(counts.values()) for _key, _section, counts in units]
+    average_length = sum(lengths) / len(lengths) if lengths else 1.0
+    document_frequency: Dict[str, int] = {}
+    for _key, _section, counts in units:
+        for term in counts:
+            document_frequency[term] = document_frequency.get(term, 0) + 1
+
+    postings: Dict[str, List[str]] = {}
+    for unit_id, ((_key, _section, counts), length) in enumerate(zip(units, lengths)):
+        norm = _K1 * (1 - _B + _B * length / average_length)
+        for term, tf in counts.items():
+            df = document_frequency[term]
+            idf = math.log(1 + (len(units) - df + 0.5) / (df + 0.5))
+            postings.setdefault(term, []).append(f"{unit_id} {idf * tf * (_K1 + 1) / (tf + norm):.4g}")
+
+    return {
+        "search_index_version": SEARCH_INDEX_VERSION,
+        "package_version": __version__,
+        "key": index_key(),
+        "units": [[key, section] for key, section, _counts in units],
+        "descriptions": {key: entry.description for key, entry in entries.items()},
+        # Sorted, so the term list read back is ready for prefix lookups.
+        "postings": {term: " ".join(postings[term]) for term in sorted(postings)},
+    }
+
+
+def _index_path(root: Path) -> Path:
+    return root / STATE_DIRNAME / SEARCH_INDEX_FILENAME
+
+
+def write_search_index(root: Path = QWEN_DIR, force: bool = False) -> bool:
+    """
+    Writes the search index under root unless an index for the current package is already there.
+
+    Returns:
+        True if the index was (re)built
+    """
+    path = _index_path(root)
+    if not force and read_cache(path, "search_index_version", SEARCH_INDEX_VERSION, index_key()) is not None:
+        return False
+    write_cache(path, _built_index())
+    return True
+
+
+@lru_cache(maxsize=None)
+def _built_index() -> dict:
+    # Built once per process, however many Qwen directories it is written to.
+    return build_search_index()
+
+
+def load_search_index(root: Path = QWEN_DIR) -> dict:
+    """
+    Returns the installed search index, building it in memory if it is missing or stale.
+
+    A missing or stale index is written back when the Qwen directory is writable.
+    """
+    data = read_cache(_index_path(root), "search_index_version", SEARCH_INDEX_VERSION, index_key())
+    if data is not None:
+        return data
+    try:
+        write_search_index(root, force=True)
+    except OSError:
+        pass
+    return _built_index()
+
+
+def _decode_postings(encoded: str) -> List[Tuple[int, float]]:
+    values = encoded.split()
+    return [(int(values[i]), float(values[i + 1])) for i in range(0, len(values), 2)]
+
+
+def _query_terms(query: str, postings: Dict[str, list], vocabulary: List[str]) -> List[str]:
+    """Maps query words to indexed terms; unknown words of MIN_PREFIX_LENGTH or more match every term they are a prefix of."""
+    terms = []
+    for word in _WORD.findall(query.lower()):
+        if word in _STOPWORDS:
+            continue
+        term = _stem(word)
+        if term in postings:
+            terms.append(term)
+            continue
+        if len(word) < MIN_PREFIX_LENGTH:
+            continue
+        i = bisect_left(vocabulary, word)
+        while i < len(vocabulary) and vocabulary[i].startswith(word):
+            terms.append(vocabulary[i])
+            i += 1
+    return terms
+
+
+def search(query: str, root: Path = QWEN_DIR, kind: Optional[str] = None,
+           limit: int = DEFAULT_LIMIT, index: Optional[dict] = None) -> List[SearchResult]:
+    """
+    Ranks the assets matching query, best first.
+
+    Each asset scores by its best-matching section, with a bonus for other
+    matching sections so broadly relevant documents rise.
+
+    Args:
+        query: Free text; words are matched by stem, unknown words by prefix
+        root: Qwen directory holding the installed index
+        kind: Only return assets of this kind (command, agent, ...)
+        limit: Maximum number of results
+        index: An already loaded index, e.g. from load_search_index()
+
+    Raises:
+        ValueError: If an unknown kind is requested
+    """
+    if kind is not None and kind not in ASSET_KINDS:
+        raise ValueError(f"Unknown asset kind '{kind}', expected one of {', '.join(ASSET_KINDS)}.")
+    data = index if index is not None else load_search_index(root)
+    postings = data["postings"]
+    units = data["units"]
+    terms = _query_terms(query, postings, list(postings))
+
+    unit_scores: Dict[int, float] = {}
+    for term in terms:
+        for unit_id, weight in _decode_postings(postings.get(term, "")):
+            unit_scores[unit_id] = unit_scores.get(unit_id, 0.0) + weight
+
+    best: Dict[str, Tuple[float, str]] = {}
+    extra: Dict[str, float] = {}
+    for unit_id, score in unit_scores.items():
+        key, section = units[unit_id]
+        if kind and not key.startswith(f"{kind}/"):
+            continue
+        if key not in best or score > best[key][0]:
+            if key in best:
+                extra[key] = extra.get(key, 0.0) + best[key][0]
+            best[key] = (score, section)
+        else:
+            extra[key] = extra.get(key, 0.0) + score
+
+    results = [
+        SearchResult(key, section, round(score + 0.1 * extra.get(key, 0.0), 3), data["descriptions"].get(key, ''))
+        for key, (score, section) in best.items()
+    ]
+    results.sort(key=lambda r: (-r.score, r.key))
+    return results[:limit]
@@ -0,0 +1,140 @@
+"""
+Staged installs for component directories
+
+A staged install builds the complete new tree for a directory such as
+~/.qwen/modes in a scratch directory under SuperQwen's state directory,
+then swaps it in. On Linux the swap is a single renameat2(RENAME_EXCHANGE),
+so readers such as a running Qwen CLI see either the old tree or the new
+one, never a half-written mix. Elsewhere, or on filesystems without
+exchange support, it takes two renames and the directory is missing for
+the moment between them. The previous tree is kept as a rollback copy
+until the next staged install of the same directory.
+"""
+
+import errno
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+STAGING_DIRNAME = "staging"
+ROLLBACK_DIRNAME = "rollback"
+
+# From <linux/fcntl.h> and <linux/fs.h>.
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+
+
+def _link_or_copy(src: str, dst: str) -> None:
+    """Hardlinks src to dst, copying when the filesystem does not support links."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def rollback_path(dst_dir: Path, state_dir: Path) -> Path:
+    """Returns where the previous tree of dst_dir is kept after a staged install."""
+    try:
+        relative = dst_dir.relative_to(state_dir.parent)
+    except ValueError:
+        relative = Path(dst_dir.name)
+    return state_dir / ROLLBACK_DIRNAME / relative
+
+
+@lru_cache(maxsize=None)
+def _renameat2():
+    """Returns libc's renameat2, or None where it is not available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+
+    try:
+        func = ctypes.CDLL(None, use_errno=True).renameat2
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    func.restype = ctypes.c_int
+    return func
+
+
+def exchange(a: Path, b: Path) -> bool:
+    """
+    Atomically swaps the paths a and b, which must both exist.
+
+    Returns:
+        False if the platform or filesystem cannot exchange paths
+
+    Raises:
+        OSError: If the exchange fails for any other reason, e.g. EXDEV
+    """
+    func = _renameat2()
+    if func is None:
+        return False
+    import ctypes
+
+    if func(_AT_FDCWD, os.fsencode(a), _AT_FDCWD, os.fsencode(b), _RENAME_EXCHANGE) == 0:
+        return True
+    error = ctypes.get_errno()
+    if error in (errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+        return False
+    raise OSError(error, os.strerror(error), str(a), None, str(b))
+
+
+def swap_in(stage_dir: Path, dst_dir: Path, rollback_dir: Path) -> None:
+    """
+    Replaces dst_dir with stage_dir, moving the current dst_dir to rollback_dir.
+
+    An existing dst_dir is exchanged with stage_dir in one step where the
+    platform allows it. Otherwise dst_dir is renamed away first and is
+    briefly missing; if the second rename fails the previous tree is moved
+    back, so dst_dir is not left missing.
+    """
+    if rollback_dir.exists():
+        shutil.rmtree(rollback_dir)
+    rollback_dir.parent.mkdir(parents=True, exist_ok=True)
+    dst_dir.parent.mkdir(parents=True, exist_ok=True)
+
+    had_previous = dst_dir.exists()
+    if had_previous and exchange(stage_dir, dst_dir):
+        # stage_dir now holds the previous tree.
+        os.rename(stage_dir, rollback_dir)
+        return
+    if had_previous:
+        os.rename(dst_dir, rollback_dir)
+    try:
+        os.rename(stage_dir, dst_dir)
+    except OSError:
+        if had_previous:
+            os.rename(rollback_dir, dst_dir)
+        raise
+
+
+@contextmanager
+def staged_directory(dst_dir: Path, state_dir: Path):
+    """
+    Yields a staging copy of dst_dir and swaps it in when the block succeeds.
+
+    The staging copy starts out as hardlinks of the current files, so
+    anything written into it must replace files rather than modify them in
+    place. If the block raises, the staging copy is discarded and dst_dir is
+    left untouched.
+
+    Raises:
+        OSError: With errno EXDEV if dst_dir is on a different filesystem
+            than state_dir, before dst_dir has been modified
+    """
+    staging_parent = state_dir / STAGING_DIRNAME
+    staging_parent.mkdir(parents=True, exist_ok=True)
+    stage_dir = Path(tempfile.mkdtemp(prefix=f"{dst_dir.name}-", dir=staging_parent))
+    try:
+        if dst_dir.is_dir():
+            shutil.copytree(dst_dir, stage_dir, symlinks=True, copy_function=_link_or_copy, dirs_exist_ok=True)
+        yield stage_dir
+        swap_in(stage_dir, dst_dir, rollback_path(dst_dir, state_dir))
+    finally:
+        if stage_dir.exists():
+            shutil.rmtree(stage_dir, ignore_errors=True)
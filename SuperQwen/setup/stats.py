@@ -0,0 +1,242 @@
+"""
+Token-budget statistics for the bundled prompt assets
+
+Counts the tokens every command prompt, agent, mode, Core and MCP document
+costs when injected into a model context, and compares the counts with a
+stored baseline so prompt growth shows up as a regression. Also reports
+how much the shared fragments save and which blocks are still repeated.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .assets import ASSET_KINDS, load_prompt_assets, parse_command_toml
+from .file_utils import load_assets
+from .prompt_compiler import find_includes, render_include
+from .tokens import DEFAULT_TOKENIZER, get_tokenizer
+
+BASELINE_VERSION = 1
+# Baseline shipped with the package, generated with the default tokenizer.
+BASELINE_RESOURCE = ("config", "token_baseline.json")
+
+# Blocks shorter than this are too small to be worth a fragment.
+DUPLICATE_MIN_TOKENS = 30
+# Share of word 3-grams two blocks must have in common to count as duplicates.
+DUPLICATE_SIMILARITY = 0.8
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class AssetStats:
+    """Size of one prompt asset."""
+    key: str
+    kind: str
+    chars: int
+    lines: int
+    tokens: int
+
+
+@dataclass
+class Regression:
+    """An asset whose token count grew beyond the tolerance."""
+    key: str
+    baseline: int
+    current: int
+
+    @property
+    def increase_pct(self) -> float:
+        return (self.current - self.baseline) / self.baseline * 100 if self.baseline else float("inf")
+
+
+@dataclass
+class FragmentUsage:
+    """A shared include and the commands that use it."""
+    ref: str
+    tokens: int
+    used_by: List[str] = field(default_factory=list)
+
+    @property
+    def saved_tokens(self) -> int:
+        """Tokens the source would repeat if every user carried its own copy."""
+        return self.tokens * max(len(self.used_by) - 1, 0)
+
+
+@dataclass
+class DuplicateBlock:
+    """A block of text that appears, verbatim or nearly so, in several places."""
+    locations: List[str]
+    tokens: int
+    similarity: float
+    preview: str
+
+    @property
+    def redundant_tokens(self) -> int:
+        return self.tokens * (len(self.locations) - 1)
+
+
+def collect_stats(tokenizer_spec: str = DEFAULT_TOKENIZER, kinds: Optional[Iterable[str]] = None,
+                  profile: str = "full") -> List[AssetStats]:
+    """Counts tokens for every bundled prompt asset of the given kinds, as installed with profile."""
+    count_tokens = get_tokenizer(tokenizer_spec)
+    return [
+        AssetStats(asset.key, asset.kind, len(asset.text), asset.text.count("\n") + 1, count_tokens(asset.text))
+        for asset in load_prompt_assets(kinds, profile)
+    ]
+
+
+def totals_by_kind(stats: List[AssetStats]) -> Dict[str, int]:
+    totals: Dict[str, int] = {}
+    for item in stats:
+        totals[item.kind] = totals.get(item.kind, 0) + item.tokens
+    return totals
+
+
+def save_baseline(stats: List[AssetStats], path: Path, tokenizer_spec: str = DEFAULT_TOKENIZER) -> None:
+    """Writes the token counts to path for later comparison."""
+    data = {
+        "baseline_version": BASELINE_VERSION,
+        "tokenizer": tokenizer_spec,
+        "tokens": {item.key: item.tokens for item in sorted(stats, key=lambda s: s.key)},
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def load_baseline(path: Optional[Path] = None) -> Optional[dict]:
+    """
+    Loads a baseline file, or the one shipped with the package if path is None.
+
+    Returns:
+        The baseline data, or None if there is no readable baseline
+    """
+    try:
+        if path is None:
+            folder, filename = BASELINE_RESOURCE
+            shipped = next((a for a in load_assets(folder, ".json") if a.name == filename), None)
+            if shipped is None:
+                return None
+            text = shipped.data.decode("utf-8")
+        else:
+            text = path.read_text(encoding="utf-8")
+        data = json.loads(text)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if data.get("baseline_version") != BASELINE_VERSION:
+        return None
+    return data
+
+
+def compare_to_baseline(stats: List[AssetStats], baseline: dict, tolerance_pct: float = 0.0) -> List[Regression]:
+    """
+    Returns the assets that grew by more than tolerance_pct since the baseline.
+
+    Assets missing from the baseline count as regressions from zero.
+    """
+    baseline_tokens = baseline.get("tokens", {})
+    regressions = []
+    for item in stats:
+        before = baseline_tokens.get(item.key, 0)
+        if item.tokens > before * (1 + tolerance_pct / 100):
+            regressions.append(Regression(item.key, before, item.tokens))
+    return regressions
+
+
+def fragment_usage(tokenizer_spec: str = DEFAULT_TOKENIZER) -> List[FragmentUsage]:
+    """Lists every include used by the command sources, most shared first."""
+    count_tokens = get_tokenizer(tokenizer_spec)
+    usage: Dict[str, FragmentUsage] = {}
+    for asset in load_assets("commands", ".toml"):
+        name = asset.name.rsplit(".", 1)[0]
+        for ref in find_includes(asset.data.decode("utf-8")):
+            if ref not in usage:
+                usage[ref] = FragmentUsage(ref, count_tokens(render_include(ref)))
+            if name not in usage[ref].used_by:
+                usage[ref].used_by.append(name)
+    return sorted(usage.values(), key=lambda u: (-u.saved_tokens, u.ref))
+
+
+def _source_texts() -> Dict[str, str]:
+    """Asset key -> text as written in the package, i.e. command prompts with their includes unrendered."""
+    texts = {}
+    for asset in load_assets(*ASSET_KINDS["command"]):
+        texts[f"command/{asset.name.rsplit('.', 1)[0]}"] = parse_command_toml(asset.data.decode("utf-8")).get("prompt", "")
+    for asset in load_prompt_assets([kind for kind in ASSET_KINDS if kind != "command"]):
+        texts[asset.key] = asset.text
+    return texts
+
+
+def _shingles(text: str) -> frozenset:
+    words = _WORD.findall(text.lower())
+    return frozenset(zip(words, words[1:], words[2:]))
+
+
+def find_duplicates(tokenizer_spec: str = DEFAULT_TOKENIZER, min_tokens: int = DUPLICATE_MIN_TOKENS,
+                    similarity: float = DUPLICATE_SIMILARITY) -> List[DuplicateBlock]:
+    """
+    Finds paragraphs repeated across the package sources, most redundant tokens first.
+
+    Paragraphs are compared by their word 3-grams, so differences in
+    markdown, case and punctuation do not hide a copy. Includes are not
+    rendered, so text already moved into a fragment is not reported.
+    """
+    count_tokens = get_tokenizer(tokenizer_spec)
+    blocks = []
+    for key, text in _source_texts().items():
+        for paragraph in re.split(r"\n\s*\n", text):
+            paragraph = paragraph.strip()
+            shingles = _shingles(paragraph)
+            if shingles and count_tokens(paragraph) >= min_tokens:
+                blocks.append((key, paragraph, shingles))
+
+    # Only blocks sharing at least one 3-gram can be similar.
+    index: Dict[tuple, List[int]] = {}
+    for i, (_key, _paragraph, shingles) in enumerate(blocks):
+        for shingle in shingles:
+            index.setdefault(shingle, []).append(i)
+
+    parent = list(range(len(blocks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    lowest: Dict[int, float] = {}
+    compared = set()
+    for members in index.values():
+        for a_pos, a in enumerate(members):
+            for b in members[a_pos + 1:]:
+                if (a, b) in compared:
+                    continue
+                compared.add((a, b))
+                sa, sb = blocks[a][2], blocks[b][2]
+                score = len(sa & sb) / len(sa | sb)
+                if score >= similarity:
+                    root_a, root_b = find(a), find(b)
+                    parent[root_b] = root_a
+                    lowest[root_a] = min(score, lowest.get(root_a, 1.0), lowest.get(root_b, 1.0))
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(blocks)):
+        groups.setdefault(find(i), []).append(i)
+
+    duplicates = []
+    for root, members in groups.items():
+        if len(members) < 2:
+            continue
+        paragraph = blocks[members[0]][1]
+        preview = next((line for line in paragraph.splitlines() if _WORD.search(line.lower())), paragraph)
+        duplicates.append(DuplicateBlock(
+            [blocks[i][0] for i in members],
+            count_tokens(paragraph),
+            lowest.get(root, 1.0),
+            preview.strip(),
+        ))
+    return sorted(duplicates, key=lambda d: -d.redundant_tokens)
@@ -0,0 +1,119 @@
+"""
+Offline token counting for prompt assets
+
+Tokenizers are plain callables mapping text to a token count, looked up by
+spec string:
+
+    approx                  Fast BPE-like estimate (default, no dependencies)
+    chars                   Characters / 4, the usual rule of thumb
+    tiktoken[:ENCODING]     tiktoken, if installed and the encoding is cached locally
+    hf:PATH                 A Hugging Face tokenizer.json via the `tokenizers` package
+
+More can be added with register_tokenizer().
+"""
+
+import inspect
+import math
+import re
+from functools import lru_cache
+from typing import Callable, Dict
+
+Tokenizer = Callable[[str], int]
+
+DEFAULT_TOKENIZER = "approx"
+
+# Words, digit groups, runs of repeated punctuation (e.g. '##', '**', '---'),
+# line breaks and indentation, and any other single non-space character.
+_PIECES = re.compile(r"[A-Za-z]+|\d{1,3}|([^\w\s])\1*|\n+|[ \t]{2,}|[^\x00-\x7f]|\S")
+# Most BPE vocabularies keep common words whole and split longer ones every few characters.
+_CHARS_PER_WORD_TOKEN = 6
+
+
+def approx_tokens(text: str) -> int:
+    """Estimates the token count of text without a vocabulary."""
+    count = 0
+    for match in _PIECES.finditer(text):
+        piece = match.group(0)
+        if piece[0].isalpha() and piece.isascii():
+            count += math.ceil(len(piece) / _CHARS_PER_WORD_TOKEN)
+        elif piece.isascii():
+            count += 1
+        else:
+            # Emoji and arrow/symbol blocks usually cost more than one token each.
+            count += sum(2 if ord(ch) > 0xFFFF or 0x2190 <= ord(ch) <= 0x2BFF else 1 for ch in piece)
+    return count
+
+
+def char_tokens(text: str) -> int:
+    return math.ceil(len(text) / 4)
+
+
+def _tiktoken_factory(encoding: str = "cl100k_base") -> Tokenizer:
+    try:
+        import tiktoken
+    except ImportError as e:
+        raise ValueError("The 'tiktoken' tokenizer needs the tiktoken package: pip install tiktoken") from e
+    enc = tiktoken.get_encoding(encoding)
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+def _hf_factory(path: str) -> Tokenizer:
+    try:
+        from tokenizers import Tokenizer as HFTokenizer
+    except ImportError as e:
+        raise ValueError("The 'hf' tokenizer needs the tokenizers package: pip install tokenizers") from e
+    tokenizer = HFTokenizer.from_file(path)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+_FACTORIES: Dict[str, Callable[..., Tokenizer]] = {
+    "approx": lambda: approx_tokens,
+    "chars": lambda: char_tokens,
+    "tiktoken": _tiktoken_factory,
+    "hf": _hf_factory,
+}
+
+
+def register_tokenizer(name: str, factory: Callable[..., Tokenizer]) -> None:
+    """
+    Makes a tokenizer available as `name` or `name:ARG`.
+
+    The factory is called with ARG (if given) and must return a callable
+    that counts the tokens in a string.
+    """
+    _FACTORIES[name] = factory
+    get_tokenizer.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def get_tokenizer(spec: str = DEFAULT_TOKENIZER) -> Tokenizer:
+    """
+    Returns the tokenizer for a spec such as 'approx' or 'hf:/path/to/tokenizer.json'.
+
+    Raises:
+        ValueError: If the tokenizer is unknown, is given an argument it does not
+            take (or lacks one it needs) or cannot be loaded
+    """
+    name, sep, arg = spec.partition(":")
+    factory = _FACTORIES.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown tokenizer '{name}', expected one of {', '.join(_FACTORIES)}.")
+    args = (arg,) if sep else ()
+    if sep and not arg:
+        raise ValueError(f"Tokenizer spec '{spec}' has an empty argument after ':'.")
+    try:
+        inspect.signature(factory).bind(*args)
+    except TypeError:
+        usage = f"'{name}:ARG'" if not sep else f"'{name}' without ':ARG'"
+        raise ValueError(f"Tokenizer '{name}' must be given as {usage}.") from None
+    except ValueError:
+        pass  # No signature to check, e.g. a builtin; the call below reports misuse.
+    try:
+        tokenizer = factory(*args)
+    except ValueError:
+        raise
+    except Exception as e:
+        raise ValueError(f"Cannot load tokenizer '{spec}': {e}") from e
+    if not callable(tokenizer):
+        raise ValueError(f"Tokenizer factory '{name}' did not return a callable.")
+    return tokenizer
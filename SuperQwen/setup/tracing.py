@@ -0,0 +1,205 @@
+"""
+Span tracing for CLI operations
+
+Installers, uninstallers, file writes, MCP probes, index builds and
+subprocess calls run inside spans. Tracing is off unless
+`superqwen --trace PATH ...` or SUPERQWEN_TRACE=PATH turns it on; while it
+is off, opening a span costs one global lookup and records nothing.
+
+When the command finishes, the spans are written to PATH in Chrome trace
+format (open it in chrome://tracing or https://ui.perfetto.dev), or as
+one JSON object per line if PATH ends in .jsonl, and a summary per
+operation is printed. Spans recorded in forked child processes (see
+fleet.py) are sent back with export() and merge() and keep the child's pid.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+TRACE_ENV = "SUPERQWEN_TRACE"
+
+
+@dataclass
+class SpanRecord:
+    """One finished span; times are nanoseconds from the start of tracing."""
+    name: str
+    start_ns: int
+    duration_ns: int
+    thread_id: int
+    args: Dict[str, Any]
+    # Process the span was recorded in, if not this one.
+    pid: Optional[int] = None
+
+    @property
+    def category(self) -> str:
+        return self.name.split(".", 1)[0]
+
+
+@dataclass
+class SpanSummary:
+    """All spans of one name."""
+    name: str
+    calls: int
+    total_ms: float
+    max_ms: float
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class Tracer:
+    """Collects spans from any thread."""
+
+    def __init__(self):
+        self.origin_ns = time.perf_counter_ns()
+        self.spans: List[SpanRecord] = []
+        self._lock = threading.Lock()
+
+    def record(self, span: SpanRecord) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def export(self) -> List[dict]:
+        """Returns the spans as JSON-ready dicts, e.g. to send them from a child process to its parent."""
+        with self._lock:
+            return [asdict(span) for span in self.spans]
+
+    def merge(self, spans: List[dict], pid: int) -> None:
+        """Adds spans exported by the child process pid."""
+        with self._lock:
+            self.spans.extend(SpanRecord(**dict(span, pid=pid)) for span in spans)
+
+    def summary(self) -> List[SpanSummary]:
+        """Returns one summary per span name, the most time-consuming first."""
+        by_name: Dict[str, SpanSummary] = {}
+        for span in self.spans:
+            duration_ms = span.duration_ns / 1e6
+            entry = by_name.setdefault(span.name, SpanSummary(span.name, 0, 0.0, 0.0))
+            entry.calls += 1
+            entry.total_ms += duration_ms
+            entry.max_ms = max(entry.max_ms, duration_ms)
+        return sorted(by_name.values(), key=lambda s: (-s.total_ms, s.name))
+
+    def write(self, path: Path) -> None:
+        """Writes the spans to path: JSON lines for a .jsonl path, Chrome trace format otherwise."""
+        spans = sorted(self.spans, key=lambda s: s.start_ns)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.suffix == ".jsonl":
+                for span in spans:
+                    f.write(json.dumps({
+                        "name": span.name,
+                        "start_ms": round(span.start_ns / 1e6, 3),
+                        "duration_ms": round(span.duration_ns / 1e6, 3),
+                        "pid": span.pid or os.getpid(),
+                        "thread": span.thread_id,
+                        "args": span.args,
+                    }, default=str) + "\n")
+                return
+            pid = os.getpid()
+            events = [{
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": span.start_ns / 1e3,
+                "dur": span.duration_ns / 1e3,
+                "pid": span.pid or pid,
+                "tid": span.thread_id,
+                "args": span.args,
+            } for span in spans]
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+
+class _Span:
+    __slots__ = ("_tracer", "_name", "_args", "_start_ns")
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        if exc_type is not None:
+            self._args["error"] = exc_type.__name__
+        self._tracer.record(SpanRecord(self._name, self._start_ns - self._tracer.origin_ns,
+                                       end_ns - self._start_ns, threading.get_ident(), self._args))
+        return False
+
+    def set(self, **args) -> None:
+        """Attaches more arguments, e.g. results known only at the end of the span."""
+        self._args.update(args)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **args) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, **args):
+    """
+    Returns a context manager timing the enclosed block as one span.
+
+    Args:
+        name: Dotted operation name; the part before the first dot is its
+            category, e.g. 'install' for 'install.commands'
+        **args: JSON-serializable details shown with the span
+    """
+    if _tracer is None:
+        return _NULL_SPAN
+    return _Span(_tracer, name, args)
+
+
+def traced(name: str) -> Callable:
+    """Decorator running every call of a function in a span called name."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with _Span(_tracer, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def active_tracer() -> Optional[Tracer]:
+    """Returns the tracer recording spans, or None while tracing is off."""
+    return _tracer
+
+
+def start_tracing() -> Tracer:
+    """Starts recording spans and returns the tracer collecting them."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stops recording spans; returns the tracer that collected them, or None if tracing was off."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
@@ -6,9 +6,7 @@ Cross-platform console UI with colors and progress indication
 import sys
 import time
 import shutil
-import getpass
 from typing import List, Optional, Any, Dict, Union
-from enum import Enum
 
 # Try to import colorama for cross-platform color support
 try:
@@ -396,6 +394,8 @@ def prompt_api_key(service_name: str, env_var_name: str) -> Optional[str]:
     print(f"{Colors.WHITE}Visit the service documentation to obtain your API key{Colors.RESET}")
     print(f"{Colors.YELLOW}Press Enter to skip (you can set this manually later){Colors.RESET}")
 
+    import getpass
+
     try:
         # Use getpass for hidden input
         api_key = getpass.getpass(f"Enter {env_var_name}: ").strip()
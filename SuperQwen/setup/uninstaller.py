@@ -1,61 +1,157 @@
 import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional
 
 from .logging import logger
-from .file_utils import QWEN_DIR, get_package_files
+from .context import CONTEXT_FILENAME, remove_context
+from .file_utils import QWEN_DIR, STATE_DIRNAME, load_assets
+from .manifest import Manifest
+from .mcp_catalog import catalog_server_names, remove_mcp_servers, with_legacy_names
+from .tracing import traced
 
-def uninstall_commands():
+if TYPE_CHECKING:
+    from .ui import ProgressBar
+
+def _save_or_remove_state(manifest: Manifest) -> None:
+    """
+    Saves the manifest, or removes SuperQwen's state directory (manifest,
+    indexes, caches, rollback copies) once no component is installed.
+    """
+    from .verifier import installed_components
+
+    if manifest.entries or installed_components(manifest.root, manifest):
+        manifest.save()
+        return
+    state_dir = manifest.root / STATE_DIRNAME
+    if state_dir.is_dir() and not state_dir.is_symlink():
+        shutil.rmtree(state_dir)
+        logger.info(f"Removed {state_dir}, nothing SuperQwen installed is left.")
+
+def _remove_files(paths: List[Path], progress_bar: Optional["ProgressBar"] = None) -> int:
+    """Deletes the given files, advancing the progress bar per file; returns how many existed."""
+    if progress_bar:
+        progress_bar.total = len(paths)
+    count = 0
+    for i, path in enumerate(paths):
+        if path.is_file():
+            path.unlink()
+            count += 1
+        if progress_bar:
+            progress_bar.update(i + 1)
+    return count
+
+def _remove_component_files(component: str, target_dir: Path, suffix: str,
+                            progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> int:
+    """
+    Removes the files installed for component.
+
+    The manifest lists exactly what was installed; installs that predate the
+    manifest fall back to the file names the package currently ships. Only
+    files directly in target_dir are removed.
+    """
+    manifest = Manifest.load(qwen_dir)
+    recorded = manifest.files_for(component)
+    paths = [path for path in recorded if path.parent == target_dir]
+    if not recorded:
+        paths = [target_dir / asset.name for asset in load_assets(component, suffix)]
+    count = _remove_files(paths, progress_bar)
+    for path in recorded:
+        manifest.forget(path)
+    _save_or_remove_state(manifest)
+    return count
+
+@traced("uninstall.commands")
+def uninstall_commands(progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> int:
+    """Removes the installed commands; returns how many files were removed."""
     logger.info("Uninstalling Commands...")
-    commands_dir = QWEN_DIR / "commands" / "sq"
-    if commands_dir.exists():
-        shutil.rmtree(commands_dir)
-        logger.info("Removed commands directory.")
-    else:
+    commands_dir = qwen_dir / "commands" / "sq"
+    if not commands_dir.exists():
         logger.warning("Commands directory not found, skipping.")
+        return 0
+    count = _remove_component_files("commands", commands_dir, ".toml", progress_bar, qwen_dir)
+    shutil.rmtree(commands_dir)
+    logger.info(f"Removed {count} command files and the commands directory.")
+    return count
 
-def uninstall_modes():
+@traced("uninstall.modes")
+def uninstall_modes(progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> int:
+    """Removes the installed modes; returns how many files were removed."""
     logger.info("Uninstalling Modes...")
-    modes_dir = QWEN_DIR / "modes"
-    if modes_dir.exists():
-        files = get_package_files("modes")
-        count = 0
-        for file in files:
-            if file.name.endswith('.md'):
-                target_file = modes_dir / file.name
-                if target_file.exists():
-                    target_file.unlink()
-                    count += 1
-        logger.info(f"Removed {count} mode files.")
-    else:
+    modes_dir = qwen_dir / "modes"
+    if not modes_dir.exists():
         logger.warning("Modes directory not found, skipping.")
+        return 0
+    count = _remove_component_files("modes", modes_dir, ".md", progress_bar, qwen_dir)
+    logger.info(f"Removed {count} mode files.")
+    return count
 
-def uninstall_agents():
+@traced("uninstall.agents")
+def uninstall_agents(progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> int:
+    """Removes the installed agents; returns how many files were removed."""
     logger.info("Uninstalling Agents...")
-    agents_dir = QWEN_DIR / "agents"
-    if agents_dir.exists():
-        files = get_package_files("agents")
-        count = 0
-        for file in files:
-            if file.name.endswith('.md'):
-                target_file = agents_dir / file.name
-                if target_file.exists():
-                    target_file.unlink()
-                    count += 1
-        logger.info(f"Removed {count} agent files.")
-    else:
+    agents_dir = qwen_dir / "agents"
+    if not agents_dir.exists():
         logger.warning("Agents directory not found, skipping.")
+        return 0
+    count = _remove_component_files("agents", agents_dir, ".md", progress_bar, qwen_dir)
+    logger.info(f"Removed {count} agent files.")
+    return count
 
-def uninstall_mcp():
+@traced("uninstall.mcp")
+def uninstall_mcp(progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> int:
+    """Removes the MCP servers SuperQwen added to settings.json; returns how many were removed."""
     logger.info("Uninstalling MCP Config...")
-    settings_file = QWEN_DIR / "settings.json"
-    if settings_file.exists():
-        settings_file.unlink()
-        logger.info("Removed MCP settings file.")
-    else:
+    settings_file = qwen_dir / "settings.json"
+    if not settings_file.exists():
         logger.warning("MCP settings file not found, skipping.")
+        return 0
+
+    manifest = Manifest.load(qwen_dir)
+    entry = manifest.get(settings_file)
+    # Only remove the servers SuperQwen added; other settings and servers stay.
+    names = with_legacy_names(entry.get("servers", [])) if entry else catalog_server_names()
+    try:
+        removed = remove_mcp_servers(settings_file, names)
+    except ValueError as e:
+        logger.error(f"Not updating MCP config: {e}")
+        return 0
+    if progress_bar:
+        progress_bar.total = 1
+        progress_bar.update(1)
+    manifest.forget(settings_file)
+    _save_or_remove_state(manifest)
+    if removed:
+        logger.info(f"Removed MCP servers: {', '.join(removed)}.")
+    else:
+        logger.warning("No SuperQwen MCP servers found in settings, skipping.")
+    return len(removed)
+
+@traced("uninstall.context")
+def uninstall_context(progress_bar: Optional["ProgressBar"] = None, qwen_dir: Path = QWEN_DIR) -> int:
+    """Removes the SuperQwen block from QWEN.md, keeping the user's own text; returns 1 if there was one."""
+    logger.info("Uninstalling Context...")
+    context_file = qwen_dir / CONTEXT_FILENAME
+    try:
+        removed = remove_context(context_file)
+    except ValueError as e:
+        logger.error(f"Not touching the context file: {e}")
+        return 0
+    if progress_bar:
+        progress_bar.total = 1
+        progress_bar.update(1)
+    manifest = Manifest.load(qwen_dir)
+    manifest.forget(context_file)
+    _save_or_remove_state(manifest)
+    if removed:
+        logger.info(f"Removed the SuperQwen context from {context_file}.")
+    else:
+        logger.warning("No SuperQwen context found, skipping.")
+    return int(removed)
 
 UNINSTALL_MAP = {
     "commands": uninstall_commands,
     "modes": uninstall_modes,
     "agents": uninstall_agents,
     "mcp": uninstall_mcp,
+    "context": uninstall_context,
 }
@@ -0,0 +1,256 @@
+"""
+Self-update for SuperQwen
+
+`superqwen update` first finds the latest release and only runs pip when
+it is newer than the running version. The latest release is read from
+the package index's simple API (PyPI by default, or any --index-url such
+as a local mirror) or from a --find-links directory of wheels and sdists.
+Index answers are cached in ~/.qwen/.superqwen/update-check.json for an
+hour (SUPERQWEN_UPDATE_CHECK_TTL, in seconds), so repeated runs and
+--offline runs need no network.
+
+After an upgrade, the installed components are synced again by the new
+version, which only rewrites the files that changed.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+import urllib.request
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from .. import __version__
+from .file_utils import QWEN_DIR, STATE_DIRNAME
+from .manifest import Manifest
+
+PACKAGE_NAME = "SuperQwen"
+DEFAULT_INDEX_URL = "https://pypi.org/simple"
+CHECK_FILENAME = "update-check.json"
+# Seconds a cached index answer stays valid; override with SUPERQWEN_UPDATE_CHECK_TTL.
+DEFAULT_CHECK_TTL = 60 * 60
+INDEX_TIMEOUT = 10
+
+# Components re-synced after an upgrade, in install order. MCP servers are left
+# alone: their configuration lives in settings.json and does not change with the package.
+RESYNC_COMPONENTS = ("commands", "modes", "agents", "context")
+
+# 'SuperQwen-1.0.2-py3-none-any.whl', 'superqwen-1.0.2.tar.gz'
+_DIST_FILE = re.compile(r'^(?P<name>[A-Za-z0-9_.]+?)-(?P<version>[0-9][^-]*?)(?:-.*\.whl|\.tar\.gz|\.zip)$')
+_ANCHOR = re.compile(r'<a\s([^>]*)>([^<]+)</a>', re.IGNORECASE)
+_FINAL_RELEASE = re.compile(r'^\d+(\.\d+)*$')
+
+
+@dataclass
+class UpdateCheck:
+    """The running version against the latest release found."""
+    installed: str
+    latest: Optional[str]
+    source: str
+    cached: bool = False
+
+    @property
+    def current(self) -> bool:
+        """True unless a newer release than the running version was found."""
+        if self.latest is None:
+            return True
+        return version_key(self.latest) <= version_key(self.installed)
+
+
+def version_key(version: str) -> Tuple[int, ...]:
+    """Sort key of a final release such as '1.10.0'; other versions sort first."""
+    if not _FINAL_RELEASE.match(version):
+        return ()
+    parts = [int(part) for part in version.split(".")]
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def _normalize(name: str) -> str:
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def versions_in(filenames: Iterable[str]) -> List[str]:
+    """Returns the final-release versions of this package among distribution file names."""
+    versions = set()
+    for filename in filenames:
+        match = _DIST_FILE.match(filename.strip())
+        if match and _normalize(match.group("name")) == _normalize(PACKAGE_NAME):
+            if _FINAL_RELEASE.match(match.group("version")):
+                versions.add(match.group("version"))
+    return sorted(versions, key=version_key)
+
+
+def latest_version(versions: Iterable[str]) -> Optional[str]:
+    versions = list(versions)
+    return max(versions, key=version_key) if versions else None
+
+
+def index_versions(index_url: str, timeout: float = INDEX_TIMEOUT) -> List[str]:
+    """
+    Lists the released versions on a PEP 503/691 simple index, skipping yanked files.
+
+    Raises:
+        OSError: If the index cannot be reached (urllib errors are OSErrors)
+        ValueError: If the answer cannot be parsed
+    """
+    url = f"{index_url.rstrip('/')}/{_normalize(PACKAGE_NAME)}/"
+    request = urllib.request.Request(url, headers={
+        "Accept": "application/vnd.pypi.simple.v1+json, text/html;q=0.1",
+    })
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        content_type = response.headers.get("Content-Type", "")
+        body = response.read().decode("utf-8")
+    if "json" in content_type:
+        files = json.loads(body).get("files", [])
+        return versions_in(f["filename"] for f in files if not f.get("yanked"))
+    return versions_in(text for attrs, text in _ANCHOR.findall(body) if "data-yanked" not in attrs)
+
+
+def find_links_versions(directory: Path) -> List[str]:
+    """
+    Lists the versions of the wheels and sdists in a local directory.
+
+    Raises:
+        ValueError: If directory does not exist
+    """
+    if not directory.is_dir():
+        raise ValueError(f"--find-links directory {directory} does not exist.")
+    return versions_in(path.name for path in directory.iterdir())
+
+
+def _ttl_from_env() -> float:
+    try:
+        return float(os.environ.get("SUPERQWEN_UPDATE_CHECK_TTL", DEFAULT_CHECK_TTL))
+    except ValueError:
+        return DEFAULT_CHECK_TTL
+
+
+def _check_path(qwen_dir: Path) -> Path:
+    return qwen_dir / STATE_DIRNAME / CHECK_FILENAME
+
+
+def _read_check(qwen_dir: Path, index_url: str) -> Optional[dict]:
+    try:
+        with open(_check_path(qwen_dir), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError, OSError):
+        return None
+    if not isinstance(data, dict) or data.get("index_url") != index_url:
+        return None
+    return data
+
+
+def _write_check(qwen_dir: Path, index_url: str, latest: Optional[str]) -> None:
+    path = _check_path(qwen_dir)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"index_url": index_url, "latest": latest, "checked_at": time.time()}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def check_for_update(index_url: str = DEFAULT_INDEX_URL, find_links: Optional[Path] = None,
+                     offline: bool = False, refresh_cache: bool = False,
+                     qwen_dir: Path = QWEN_DIR) -> UpdateCheck:
+    """
+    Finds the latest release and compares it with the running version.
+
+    Args:
+        index_url: Simple index to ask; its answer is cached
+        find_links: Local directory of distributions, used instead of the index
+        offline: Use the cached index answer even if it expired, never the network
+        refresh_cache: Ignore the cached index answer
+
+    Raises:
+        ValueError: If find_links does not exist, or offline without a cached answer
+        OSError: If the index cannot be reached
+    """
+    if find_links is not None:
+        return UpdateCheck(__version__, latest_version(find_links_versions(find_links)), str(find_links))
+
+    cached = None if refresh_cache else _read_check(qwen_dir, index_url)
+    if cached is not None and (offline or time.time() - cached.get("checked_at", 0) <= _ttl_from_env()):
+        return UpdateCheck(__version__, cached.get("latest"), index_url, cached=True)
+    if offline:
+        raise ValueError(f"No cached answer from {index_url}; run update once without --offline, "
+                         f"or pass --find-links.")
+    latest = latest_version(index_versions(index_url))
+    _write_check(qwen_dir, index_url, latest)
+    return UpdateCheck(__version__, latest, index_url)
+
+
+def pip_command(index_url: str = DEFAULT_INDEX_URL, find_links: Optional[Path] = None,
+                offline: bool = False) -> List[str]:
+    """Returns the pip invocation upgrading the package from the same source that was checked."""
+    command = [sys.executable, "-m", "pip", "install", "--upgrade", PACKAGE_NAME]
+    if find_links is not None:
+        command += ["--find-links", str(find_links)]
+        if offline:
+            command.append("--no-index")
+    if index_url != DEFAULT_INDEX_URL and not (offline and find_links is not None):
+        command += ["--index-url", index_url]
+    return command
+
+
+def resync_commands(qwen_dir: Path = QWEN_DIR, output_json: bool = False) -> List[Tuple[str, List[str]]]:
+    """
+    Returns the (component, command) pairs that re-install what is installed under qwen_dir.
+
+    They run `python -m SuperQwen install <component>` in a new process, so
+    that the upgraded package is the one that syncs. Commands and agents are
+    installed with the profile, and the context is composed with the options,
+    they were last installed with.
+    """
+    manifest = Manifest.load(qwen_dir)
+    installed = {entry["component"] for entry in manifest.entries.values()}
+    commands = []
+    for component in RESYNC_COMPONENTS:
+        if component not in installed:
+            continue
+        command = [sys.executable, "-m", PACKAGE_NAME, "install", component]
+        if component == "context":
+            command += _context_args(manifest, qwen_dir)
+        elif component in ("commands", "agents"):
+            command += _profile_args(manifest, component)
+        if output_json:
+            command += ["--output", "json"]
+        commands.append((component, command))
+    return commands
+
+
+def _profile_args(manifest: Manifest, component: str) -> List[str]:
+    options = next((entry["options"] for entry in manifest.entries.values()
+                    if entry["component"] == component and isinstance(entry.get("options"), dict)), {})
+    if options.get("profile", "full") == "full":
+        return []
+    args = ["--profile", options["profile"]]
+    for section in options.get("prune_sections", []):
+        args += ["--prune-section", section]
+    return args
+
+
+def _context_args(manifest: Manifest, qwen_dir: Path) -> List[str]:
+    from .context import CONTEXT_FILENAME
+
+    entry = manifest.get(qwen_dir / CONTEXT_FILENAME) or {}
+    options = entry.get("options", {})
+    args = []
+    for mode in options.get("modes", []):
+        args += ["--mode", mode]
+    if options.get("budget") is not None:
+        args += ["--context-budget", str(options["budget"])]
+    for priority in options.get("priorities", []):
+        args += ["--priority", priority]
+    if options.get("sections"):
+        args.append("--context-sections")
+    if options.get("layout", "append") != "append":
+        args += ["--context-layout", options["layout"]]
+    return args
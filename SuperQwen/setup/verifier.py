@@ -0,0 +1,299 @@
+"""
+Integrity check of installed Qwen directories
+
+`superqwen verify` compares what is installed under ~/.qwen with what this
+package version would install, without reinstalling anything:
+
+    commands/sq, modes, agents  SHA-256 of every file against the package's
+                                files, made with the profile and pruned
+                                sections recorded in the manifest
+    settings.json               the MCP servers SuperQwen configured, against
+                                the catalog (env values are the user's own)
+    QWEN.md                     the SuperQwen block, against the block its
+                                recorded options compose to
+
+Every directory's manifest is read and the expected files and context
+blocks are built first, in the calling thread. The files are then hashed by
+a thread pool. Hashing releases the GIL, so one pool serves any number of
+home directories. Large files are memory-mapped and small ones are read in
+one call.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .compact import COMPACT_COMPONENTS, compact_assets
+from .context import CONTEXT_FILENAME, configured_mcp_docs, installed_block
+from .file_utils import load_assets
+from .installer import expected_context
+from .manifest import Manifest
+from .mcp_catalog import load_catalog, read_settings
+from .prompt_compiler import compile_commands
+from .tracing import span, traced
+
+VERIFY_COMPONENTS = ("commands", "modes", "agents", "mcp", "context")
+DEFAULT_VERIFY_WORKERS = 16
+# Files at least this large are memory-mapped instead of read.
+MMAP_THRESHOLD = 1024 * 1024
+
+# component -> (directory under the Qwen directory, suffix, whether SuperQwen owns the whole directory)
+_FILE_COMPONENTS = {
+    "commands": ("commands/sq", ".toml", True),
+    "modes": ("modes", ".md", False),
+    "agents": ("agents", ".md", False),
+}
+
+
+@dataclass
+class VerifyResult:
+    """What differs between one Qwen directory and the package; paths are relative to qwen_dir."""
+    qwen_dir: Path
+    components: List[str] = field(default_factory=list)
+    checked: int = 0
+    missing: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    def ok(self, strict: bool = False) -> bool:
+        """True if nothing is missing or modified (and, if strict, nothing is extra)."""
+        if self.error or not self.components or self.missing or self.modified:
+            return False
+        return not (strict and self.extra)
+
+
+def file_sha256(path: Path) -> str:
+    """Returns the SHA-256 hex digest of a file, memory-mapping large files."""
+    with open(path, "rb", buffering=0) as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return hashlib.sha256(mapped).hexdigest()
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+# (profile, pruned sections) a file component was installed with; None if the manifest did not record it.
+Variant = Optional[Tuple[str, Tuple[str, ...]]]
+
+
+def recorded_variants(component: str, manifest: Manifest) -> Tuple[Variant, ...]:
+    """Returns the distinct (profile, pruned sections) the manifest recorded for component's files."""
+    variants = []
+    for entry in manifest.entries.values():
+        if entry["component"] != component:
+            continue
+        options = entry.get("options")
+        variants.append(None if not isinstance(options, dict) else
+                        (options.get("profile", "full"), tuple(options.get("prune_sections", ()))))
+    return tuple(sorted(set(variants), key=lambda variant: variant or ('', ())))
+
+
+@lru_cache(maxsize=None)
+def _shipped_digests(component: str, profile: str = "full", prune: Tuple[str, ...] = ()) -> Dict[str, str]:
+    """Returns relative path -> SHA-256 of the files installing component with a profile writes."""
+    if component in COMPACT_COMPONENTS and profile != "full":
+        assets = compact_assets(component, prune)
+    elif component == "commands":
+        assets = compile_commands()
+    else:
+        assets = load_assets(component, ".md")
+    directory = _FILE_COMPONENTS[component][0]
+    return {f"{directory}/{asset.name}": asset.digest for asset in assets}
+
+
+@lru_cache(maxsize=None)
+def expected_files(component: str, variants: Tuple[Variant, ...] = ()) -> Dict[str, Set[str]]:
+    """
+    Returns the digests each installed file of component may have, by relative path.
+
+    Args:
+        component: One of commands, modes and agents
+        variants: The (profile, pruned sections) the files were installed
+            with, see recorded_variants(). Files recorded without them, by
+            versions that did not keep them, may match the full or the
+            default compact variant; so may files with no manifest at all.
+    """
+    known = [variant for variant in variants if variant is not None]
+    if not known or None in variants:
+        known += [("full", ())] + ([("compact", ())] if component in COMPACT_COMPONENTS else [])
+    expected: Dict[str, Set[str]] = {}
+    for profile, prune in dict.fromkeys(known):
+        for relpath, digest in _shipped_digests(component, profile, prune).items():
+            expected.setdefault(relpath, set()).add(digest)
+    return expected
+
+
+def installed_components(qwen_dir: Path, manifest: Manifest) -> List[str]:
+    """Returns the components installed under qwen_dir, by the manifest or, without one, by their files."""
+    recorded = {entry["component"] for entry in manifest.entries.values()}
+    installed = []
+    for component in VERIFY_COMPONENTS:
+        if component in recorded:
+            installed.append(component)
+        elif component in _FILE_COMPONENTS:
+            directory, suffix, _owned = _FILE_COMPONENTS[component]
+            if any((qwen_dir / directory).glob(f"*{suffix}")):
+                installed.append(component)
+        elif component == "context" and ((qwen_dir / CONTEXT_FILENAME).is_symlink()
+                                         or installed_block(qwen_dir / CONTEXT_FILENAME) is not None):
+            installed.append(component)
+    return installed
+
+
+def _check_mcp(qwen_dir: Path, manifest: Manifest) -> List[Tuple[str, Optional[str]]]:
+    """Returns (key, status) for every MCP server SuperQwen configured in settings.json."""
+    settings_file = qwen_dir / "settings.json"
+    entry = manifest.get(settings_file) or {}
+    try:
+        configured = read_settings(settings_file).get("mcpServers", {})
+    except ValueError as e:
+        return [(f"settings.json ({e})", "modified")]
+    catalog = dict(load_catalog().values())
+    statuses = []
+    for name in entry.get("servers", []):
+        key = f"settings.json#mcpServers.{name}"
+        if name not in configured:
+            statuses.append((key, "missing"))
+        elif name in catalog and _without_env(configured[name]) != _without_env(catalog[name]):
+            statuses.append((key, "modified"))
+        else:
+            statuses.append((key, None))
+    return statuses
+
+
+def _without_env(config: dict) -> dict:
+    return {key: value for key, value in config.items() if key != "env"}
+
+
+def _expected_block(qwen_dir: Path, manifest: Manifest, blocks: Dict[tuple, str]) -> Tuple[Optional[str], str]:
+    """
+    Returns the block QWEN.md should hold, or None and the reason it cannot be composed.
+
+    blocks caches the expected block by options and configured MCP docs, which
+    most homes of a fleet share.
+    """
+    options = (manifest.get(qwen_dir / CONTEXT_FILENAME) or {}).get("options", {})
+    try:
+        mcp_docs = configured_mcp_docs(qwen_dir / "settings.json")
+        key = (json.dumps(options, sort_keys=True), tuple(doc.name for doc in mcp_docs))
+        if key not in blocks:
+            blocks[key] = expected_context(qwen_dir, **options)[1]
+    except ValueError as e:
+        return None, str(e)
+    return blocks[key], ''
+
+
+def _check_context(qwen_dir: Path, expected: Optional[str], reason: str) -> List[Tuple[str, Optional[str]]]:
+    """Returns the status of the SuperQwen block in QWEN.md against the expected block."""
+    try:
+        block = installed_block(qwen_dir / CONTEXT_FILENAME)
+    except ValueError as e:
+        return [(f"{CONTEXT_FILENAME} ({e})", "modified")]
+    if block is None:
+        return [(CONTEXT_FILENAME, "missing")]
+    if expected is None:
+        return [(f"{CONTEXT_FILENAME} ({reason})", "modified")]
+    block = block.replace("\r\n", "\n")
+    return [(CONTEXT_FILENAME, None if block.rstrip("\n") == expected.rstrip("\n") else "modified")]
+
+
+def _hash_check(qwen_dir: Path, relpath: str, digests: Set[str]) -> List[Tuple[str, Optional[str]]]:
+    """Returns the status of one installed file: 'missing', 'modified' or None."""
+    try:
+        digest = file_sha256(qwen_dir / relpath)
+    except FileNotFoundError:
+        return [(relpath, "missing")]
+    return [(relpath, None if digest in digests else "modified")]
+
+
+def _plan(qwen_dir: Path, components: Optional[Sequence[str]],
+          blocks: Dict[tuple, str]) -> Tuple[VerifyResult, List[tuple]]:
+    """
+    Works out what to check in qwen_dir.
+
+    Returns:
+        The result so far and the checks to run, as (function, args) pairs
+    """
+    manifest = Manifest.load(qwen_dir)
+    result = VerifyResult(qwen_dir)
+    installed = installed_components(qwen_dir, manifest)
+    result.components = [c for c in installed if not components or c in components]
+    checks = []
+    for component in result.components:
+        if component == "mcp":
+            checks.append((_check_mcp, (qwen_dir, manifest)))
+        elif component == "context":
+            checks.append((_check_context, (qwen_dir, *_expected_block(qwen_dir, manifest, blocks))))
+        else:
+            directory, suffix, owned = _FILE_COMPONENTS[component]
+            shipped = expected_files(component, recorded_variants(component, manifest))
+            checks.extend((_hash_check, (qwen_dir, relpath, digests)) for relpath, digests in shipped.items())
+            if owned:
+                present = {f"{directory}/{path.name}" for path in (qwen_dir / directory).glob(f"*{suffix}")}
+            else:
+                # Other tools may keep files in modes and agents; only files SuperQwen recorded are extra there.
+                present = {key for key, entry in manifest.entries.items()
+                           if entry["component"] == component and key not in shipped and (qwen_dir / key).exists()}
+            result.extra.extend(sorted(present - set(shipped)))
+    return result, checks
+
+
+@traced("verify")
+def verify_installs(qwen_dirs: Sequence[Path], components: Optional[Sequence[str]] = None,
+                    workers: int = DEFAULT_VERIFY_WORKERS) -> List[VerifyResult]:
+    """
+    Verifies every Qwen directory in qwen_dirs against this package.
+
+    Args:
+        qwen_dirs: Qwen directories, e.g. ~/.qwen
+        components: Only check these components; all installed ones by default
+        workers: Threads hashing files, shared by all directories
+
+    Returns:
+        One VerifyResult per directory, in the order of qwen_dirs
+
+    Raises:
+        ValueError: If an unknown component is requested
+    """
+    unknown = [c for c in components or [] if c not in VERIFY_COMPONENTS]
+    if unknown:
+        raise ValueError(f"Unknown component(s) {', '.join(unknown)}, expected any of {', '.join(VERIFY_COMPONENTS)}.")
+    # Everything shared between directories is built here, before any thread can ask for it.
+    results = []
+    plans = []
+    blocks: Dict[tuple, str] = {}
+    with span("verify.expected"):
+        for qwen_dir in qwen_dirs:
+            try:
+                plans.append(_plan(qwen_dir, components, blocks))
+            except (OSError, ValueError) as e:
+                plans.append((VerifyResult(qwen_dir, error=str(e)), []))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = []
+        for result, checks in plans:
+            results.append(result)
+            pending.append((result, [executor.submit(check, *args) for check, args in checks]))
+
+        for result, futures in pending:
+            for future in futures:
+                try:
+                    statuses = future.result()
+                except OSError as e:
+                    result.error = str(e)
+                    continue
+                for relpath, status in statuses:
+                    result.checked += 1
+                    if status == "missing":
+                        result.missing.append(relpath)
+                    elif status == "modified":
+                        result.modified.append(relpath)
+            result.missing.sort()
+            result.modified.sort()
+    return results
@@ -0,0 +1,346 @@
+"""
+Install/uninstall benchmarks with a regression gate
+
+Times what provisioning cares about, each against throwaway Qwen
+directories under a temporary HOME (the real ~/.qwen is never touched):
+
+- every INSTALL_MAP and UNINSTALL_MAP entry, into an empty directory
+  (cold) and again into an up-to-date one (warm), with the package's
+  commands, modes and agents replicated 1x, 10x and 100x
+- `superqwen install all` in a fresh process, cold and warm
+- CLI startup for `--version` and `help`, plus the SuperQwen import time
+  of `--version` against cli.STARTUP_IMPORT_BUDGET_MS
+- MCP verification with a stubbed `npm` that answers after NPM_DELAY,
+  with an empty and with a filled registry cache
+
+Medians are compared with benchmarks/baseline.json; a benchmark more than
+--tolerance slower than its baseline (and by at least --min-delta ms)
+fails the run with exit code 1. Record a new baseline on the machine that
+runs the gate:
+
+    python benchmarks/run.py --save-baseline
+
+The npm stub is a shell script, so the suite needs a POSIX shell.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BASELINE_FILE = Path(__file__).with_name("baseline.json")
+BASELINE_VERSION = 1
+
+SCALES = (1, 10, 100)
+DEFAULT_REPEAT = 5
+# A benchmark regresses when its median is this much slower than the baseline...
+DEFAULT_TOLERANCE = 0.25
+# ...and slower by at least this many milliseconds, so sub-millisecond jitter never fails the gate.
+DEFAULT_MIN_DELTA_MS = 2.0
+# Seconds the npm stub takes to answer `npm view`, standing in for a registry round-trip.
+NPM_DELAY = 0.05
+# Commands the MCP catalog runs; stubbed so verification finds them.
+_STUB_COMMANDS = ("npx", "uvx")
+_FILE_COMPONENTS = ("commands", "modes", "agents")
+
+
+@dataclass
+class Benchmark:
+    """
+    A timed operation; setup() runs untimed before every repetition and its
+    result is passed to run() and then to teardown().
+    """
+    name: str
+    run: Callable
+    setup: Optional[Callable] = None
+    teardown: Optional[Callable] = None
+    warmup: bool = True
+
+
+@dataclass
+class Measurement:
+    name: str
+    median_ms: float
+    min_ms: float
+    runs: int
+
+
+class Workspace:
+    """Temporary HOME with the stubbed commands on PATH; every root() is a fresh Qwen directory."""
+
+    def __init__(self):
+        self.path = Path(tempfile.mkdtemp(prefix="superqwen-bench-"))
+        self.home = self.path / "home"
+        self.home.mkdir()
+        self.bin = self.path / "bin"
+        self.bin.mkdir()
+        _write_script(self.bin / "npm", f"sleep {NPM_DELAY}\necho 1.0.0\n")
+        for command in _STUB_COMMANDS:
+            _write_script(self.bin / command, "exit 0\n")
+        self._roots = 0
+
+    def root(self) -> Path:
+        self._roots += 1
+        return self.path / "roots" / str(self._roots) / ".qwen"
+
+    def remove(self, path: Path) -> None:
+        # Thousands of leftover files would slow down the runs that follow.
+        shutil.rmtree(path, ignore_errors=True)
+
+    def new_home(self) -> Path:
+        self._roots += 1
+        home = self.path / "homes" / str(self._roots)
+        home.mkdir(parents=True)
+        return home
+
+    def env(self, home: Path) -> Dict[str, str]:
+        env = dict(os.environ, HOME=str(home), USERPROFILE=str(home))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+        return env
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def _write_script(path: Path, body: str) -> None:
+    path.write_text(f"#!/bin/sh\n{body}", encoding="utf-8")
+    path.chmod(0o755)
+
+
+def _scaled(assets: Sequence, scale: int) -> tuple:
+    """Replicates assets scale times under new names, e.g. analyze.toml, analyze-x1.toml, ..."""
+    copies = list(assets)
+    for i in range(1, scale):
+        for asset in assets:
+            stem, _, suffix = asset.name.rpartition(".")
+            copies.append(replace(asset, name=f"{stem}-x{i}.{suffix}"))
+    return tuple(copies)
+
+
+@contextmanager
+def scaled_package(scale: int):
+    """Makes the installers see every command, mode and agent scale times."""
+    from SuperQwen.setup import installer
+
+    load_assets, compile_commands = installer.load_assets, installer.compile_commands
+    if scale > 1:
+        installer.load_assets = lambda subfolder, suffix: _scaled(load_assets(subfolder, suffix), scale)
+        installer.compile_commands = lambda: _scaled(compile_commands(), scale)
+    try:
+        yield
+    finally:
+        installer.load_assets, installer.compile_commands = load_assets, compile_commands
+
+
+def _cli(workspace: Workspace, home: Path, *args: str) -> None:
+    subprocess.run([sys.executable, "-m", "SuperQwen", *args], env=workspace.env(home), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _startup_import_ms(workspace: Workspace) -> float:
+    """SuperQwen's own import time for `superqwen --version`, summed from `python -X importtime`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "SuperQwen", "--version"],
+                            env=workspace.env(workspace.home), check=True, capture_output=True, text=True)
+    total_us = 0
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip().startswith("SuperQwen"):
+            total_us += int(fields[0].split(":")[1])
+    return total_us / 1000
+
+
+def file_benchmarks(workspace: Workspace, scale: int) -> List[Benchmark]:
+    from SuperQwen.setup.installer import INSTALL_MAP
+    from SuperQwen.setup.uninstaller import UNINSTALL_MAP
+
+    def installed(component):
+        def setup():
+            root = workspace.root()
+            INSTALL_MAP[component](qwen_dir=root)
+            return root
+        return setup
+
+    benchmarks = []
+    for component in _FILE_COMPONENTS:
+        install, uninstall = INSTALL_MAP[component], UNINSTALL_MAP[component]
+        benchmarks += [
+            Benchmark(f"install.{component}.cold@{scale}x", lambda root, f=install: f(qwen_dir=root),
+                      setup=workspace.root, teardown=workspace.remove),
+            Benchmark(f"install.{component}.warm@{scale}x", lambda root, f=install: f(qwen_dir=root),
+                      setup=installed(component), teardown=workspace.remove),
+            Benchmark(f"uninstall.{component}@{scale}x", lambda root, f=uninstall: f(qwen_dir=root),
+                      setup=installed(component), teardown=workspace.remove),
+        ]
+    return benchmarks
+
+
+def mcp_benchmarks(workspace: Workspace) -> List[Benchmark]:
+    from SuperQwen.setup.installer import INSTALL_MAP, verify_mcp_servers
+    from SuperQwen.setup.uninstaller import UNINSTALL_MAP
+
+    def verified():
+        root = workspace.root()
+        verify_mcp_servers(qwen_dir=root)
+        return root
+
+    def installed():
+        root = workspace.root()
+        INSTALL_MAP["mcp"](qwen_dir=root)
+        return root
+
+    return [
+        Benchmark("verify.mcp.cold", lambda root: verify_mcp_servers(qwen_dir=root), setup=workspace.root),
+        Benchmark("verify.mcp.cached", lambda root: verify_mcp_servers(qwen_dir=root), setup=verified),
+        Benchmark("install.mcp", lambda root: INSTALL_MAP["mcp"](qwen_dir=root), setup=workspace.root),
+        Benchmark("uninstall.mcp", lambda root: UNINSTALL_MAP["mcp"](qwen_dir=root), setup=installed),
+    ]
+
+
+def cli_benchmarks(workspace: Workspace) -> List[Benchmark]:
+    homes: List[Path] = []
+
+    def warm_home() -> Path:
+        # Filled by the first `install all`, so later runs measure the warm path.
+        if not homes:
+            homes.append(workspace.new_home())
+            _cli(workspace, homes[0], "install", "all")
+        return homes[0]
+
+    return [
+        Benchmark("install_all.cold", lambda home: _cli(workspace, home, "install", "all"),
+                  setup=workspace.new_home, teardown=workspace.remove, warmup=False),
+        Benchmark("install_all.warm", lambda home: _cli(workspace, home, "install", "all"), setup=warm_home),
+        Benchmark("cli.version", lambda home: _cli(workspace, home, "--version"), setup=warm_home),
+        Benchmark("cli.help", lambda home: _cli(workspace, home, "help"), setup=warm_home),
+    ]
+
+
+def measure(benchmark: Benchmark, repeat: int) -> Measurement:
+    """Runs benchmark repeat times (after one untimed warm-up run) and returns its timings."""
+    timings = []
+    for i in range(repeat + (1 if benchmark.warmup else 0)):
+        context = benchmark.setup() if benchmark.setup else None
+        start = time.perf_counter()
+        benchmark.run(context)
+        elapsed = time.perf_counter() - start
+        if benchmark.teardown:
+            benchmark.teardown(context)
+        if i or not benchmark.warmup:
+            timings.append(elapsed * 1000)
+    return Measurement(benchmark.name, statistics.median(timings), min(timings), len(timings))
+
+
+def load_baseline(path: Path) -> Dict[str, float]:
+    """Returns the baseline medians by benchmark name; empty if there is no baseline yet."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    if data.get("baseline_version") != BASELINE_VERSION:
+        raise ValueError(f"{path} has baseline version {data.get('baseline_version')}, "
+                         f"expected {BASELINE_VERSION}; record a new one with --save-baseline.")
+    return {name: entry["median_ms"] for name, entry in data.get("results", {}).items()}
+
+
+def save_baseline(path: Path, measurements: Sequence[Measurement], repeat: int) -> None:
+    from SuperQwen import __version__
+
+    results = {m.name: {"median_ms": round(m.median_ms, 3), "min_ms": round(m.min_ms, 3)} for m in measurements}
+    data = {
+        "baseline_version": BASELINE_VERSION,
+        "package_version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": dict(sorted(results.items())),
+    }
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def is_regression(median_ms: float, baseline_ms: float, tolerance: float, min_delta_ms: float) -> bool:
+    delta = median_ms - baseline_ms
+    return delta > baseline_ms * tolerance and delta >= min_delta_ms
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python benchmarks/run.py",
+                                     description="Benchmark SuperQwen install, uninstall and CLI startup.")
+    parser.add_argument("--scale", type=int, nargs="+", default=list(SCALES),
+                        help="Replicate the package assets this many times (default: 1 10 100).")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="Timed runs per benchmark.")
+    parser.add_argument("-k", "--filter", default='', help="Only run benchmarks whose name contains this.")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE, help="Baseline file to compare with.")
+    parser.add_argument("--save-baseline", action="store_true", help="Record the results as the new baseline.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown versus the baseline, as a fraction (default: 0.25).")
+    parser.add_argument("--min-delta", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="Slowdowns smaller than this many milliseconds never fail (default: 2).")
+    args = parser.parse_args(argv)
+
+    workspace = Workspace()
+    # Everything that falls back to ~/.qwen lands in the workspace, and the stubs shadow the real npm.
+    os.environ.update(HOME=str(workspace.home), USERPROFILE=str(workspace.home))
+    os.environ["PATH"] = os.pathsep.join([str(workspace.bin), os.environ.get("PATH", '')])
+    sys.path.insert(0, str(REPO_ROOT))
+    from SuperQwen.setup import ui
+    from SuperQwen.setup.cli import STARTUP_IMPORT_BUDGET_MS
+
+    logging.getLogger("rich").setLevel(logging.ERROR)
+    try:
+        baseline = {} if args.save_baseline else load_baseline(args.baseline)
+        measurements = []
+        benchmarks = mcp_benchmarks(workspace) + cli_benchmarks(workspace)
+        for scale in args.scale:
+            with scaled_package(scale):
+                scaled = [b for b in file_benchmarks(workspace, scale) if args.filter in b.name]
+                measurements += [measure(benchmark, args.repeat) for benchmark in scaled]
+        measurements += [measure(b, args.repeat) for b in benchmarks if args.filter in b.name]
+        import_ms = statistics.median(_startup_import_ms(workspace) for _ in range(args.repeat))
+    finally:
+        workspace.cleanup()
+
+    failures = []
+    rows = []
+    for m in measurements:
+        base = baseline.get(m.name)
+        if base is None:
+            rows.append([m.name, f"{m.median_ms:.2f}", f"{m.min_ms:.2f}", "-", "new"])
+            continue
+        status = "ok"
+        if is_regression(m.median_ms, base, args.tolerance, args.min_delta):
+            status = "REGRESSION"
+            failures.append(m.name)
+        change = (m.median_ms - base) / base * 100 if base else 0.0
+        rows.append([m.name, f"{m.median_ms:.2f}", f"{m.min_ms:.2f}", f"{base:.2f} ({change:+.0f}%)", status])
+    ui.display_table(["Benchmark", "Median ms", "Min ms", "Baseline ms", "Status"], rows,
+                     title=f"SuperQwen Benchmarks ({args.repeat} runs each)")
+
+    ui.display_info(f"`--version` imports SuperQwen modules in {import_ms:.1f} ms "
+                    f"(budget {STARTUP_IMPORT_BUDGET_MS} ms).")
+    if import_ms > STARTUP_IMPORT_BUDGET_MS:
+        failures.append("cli.version imports")
+
+    if args.save_baseline:
+        save_baseline(args.baseline, measurements, args.repeat)
+        ui.display_success(f"Saved {len(measurements)} results to {args.baseline}.")
+    if failures:
+        ui.display_error(f"{len(failures)} regression(s): {', '.join(failures)}.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,21 @@
+import os
+import sys
+from pathlib import Path
+
 import setuptools
+from setuptools.command.build_py import build_py
+
+
+class build_py_with_bundle(build_py):
+    """Packs the package's data folders into SuperQwen/assets.bundle (see SuperQwen/setup/bundle.py)."""
+
+    def run(self):
+        super().run()
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        from SuperQwen.setup.bundle import BUNDLE_FILENAME, write_bundle
+
+        package_dir = Path(self.build_lib) / "SuperQwen"
+        write_bundle(package_dir, package_dir / BUNDLE_FILENAME)
+
 
-setuptools.setup()
+setuptools.setup(cmdclass={"build_py": build_py_with_bundle})
@@ -0,0 +1,37 @@
+"""
+`--profile compact` commands stay valid TOML, and `--prune-section` drops only the named section.
+"""
+
+import re
+
+import pytest
+
+from SuperQwen.setup.compact import compact_assets
+
+tomllib = pytest.importorskip("tomllib")
+
+_HEADINGS = re.compile(r'^#+ (.*)$', re.MULTILINE)
+
+
+def prompts(prune=()):
+    return {asset.name: tomllib.loads(asset.data.decode("utf-8"))["prompt"]
+            for asset in compact_assets("commands", tuple(prune))}
+
+
+def test_compact_commands_parse():
+    compact = prompts()
+    assert compact
+    assert all(prompt.strip() for prompt in compact.values())
+
+
+def test_prune_section_removes_only_that_section():
+    full, pruned = prompts()["analyze.toml"], prompts(["Analysis Approach"])["analyze.toml"]
+    headings = _HEADINGS.findall(full)
+    assert "Analysis Approach" in headings and "1. Discovery Phase" in headings
+    # The section goes with its subsections; the sections around it stay.
+    assert _HEADINGS.findall(pruned) == [
+        "Expert Mindset Integration", "Output Framework", "Comprehensive Analysis Report",
+        "Prioritized Action Plan", "Implementation Guidance",
+    ]
+    assert full.startswith(pruned.split("## Output Framework")[0])
+    assert pruned.split("## Output Framework")[1] == full.split("## Output Framework")[1]
@@ -0,0 +1,33 @@
+"""
+The SuperQwen block in QWEN.md is replaced in place, whatever the file's line endings and permissions.
+"""
+
+import stat
+
+from SuperQwen.setup.context import installed_digest, remove_context, write_context
+
+
+def block(digest):
+    return f"<!-- SuperQwen:begin digest={digest} -->\n# Core\n<!-- SuperQwen:end -->\n"
+
+
+def test_crlf_block_is_replaced_not_appended(tmp_path):
+    path = tmp_path / "QWEN.md"
+    path.write_bytes(("My notes\n\n" + block("aa") + "More notes\n").replace("\n", "\r\n").encode())
+    assert installed_digest(path) == "aa"
+    assert write_context(path, "aa", block("aa")) is False
+
+    assert write_context(path, "bb", block("bb")) is True
+    assert path.read_bytes() == ("My notes\n\n" + block("bb") + "More notes\n").replace("\n", "\r\n").encode()
+    assert remove_context(path) is True
+    assert path.read_bytes() == b"My notes\r\n\r\nMore notes\r\n"
+
+
+def test_rewrite_keeps_file_mode(tmp_path):
+    path = tmp_path / "QWEN.md"
+    path.write_text("My notes\n", encoding="utf-8")
+    path.chmod(0o600)
+    write_context(path, "aa", block("aa"))
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    remove_context(path)
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
@@ -0,0 +1,29 @@
+"""
+`install context --context-budget N` composes a block of at most N tokens, whatever the priorities.
+"""
+
+import pytest
+
+from SuperQwen.setup.installer import expected_context
+from SuperQwen.setup.tokens import approx_tokens
+
+
+@pytest.mark.parametrize("budget", [1500, 5000])
+@pytest.mark.parametrize("priorities", [
+    [],
+    ["agent=5"],
+    ["mode=0", "core=3"],
+    ["agent/security-engineer=10"],
+])
+@pytest.mark.parametrize("sections", [False, True])
+def test_block_stays_within_budget(tmp_path, budget, priorities, sections):
+    _digest, block = expected_context(tmp_path, budget=budget, priorities=priorities, sections=sections)
+    assert 0 < approx_tokens(block) <= budget
+
+
+def test_priority_changes_the_selection(tmp_path):
+    _digest, plain = expected_context(tmp_path, budget=1500)
+    _digest, prioritized = expected_context(tmp_path, budget=1500, priorities=["agent/security-engineer=10"])
+    assert "# Security Engineer" not in plain
+    assert "# Security Engineer" in prioritized
+    assert approx_tokens(prioritized) <= 1500
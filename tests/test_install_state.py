@@ -0,0 +1,27 @@
+"""
+SuperQwen's state directory is written by install commands and removed with the last component.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def superqwen(home, *args):
+    environ = dict(os.environ, HOME=str(home), PYTHONPATH=str(ROOT))
+    subprocess.run([sys.executable, "-m", "SuperQwen", *args], env=environ, cwd=ROOT, check=True,
+                   capture_output=True)
+
+
+def test_uninstall_all_removes_state(tmp_path):
+    state_dir = tmp_path / ".qwen" / ".superqwen"
+    superqwen(tmp_path, "install", "modes")
+    assert (state_dir / "search-index.json").is_file()
+    superqwen(tmp_path, "install", "agents")
+    superqwen(tmp_path, "uninstall", "modes")
+    assert (state_dir / "manifest.json").is_file()
+    superqwen(tmp_path, "uninstall", "all")
+    assert not state_dir.exists()
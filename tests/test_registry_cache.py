@@ -0,0 +1,82 @@
+"""
+`install mcp` against a stub npm on PATH: the registry cache decides how often npm runs.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVERS = ["context7", "playwright"]
+
+
+@pytest.fixture
+def env(tmp_path):
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    calls = tmp_path / "npm-calls.log"
+    npm = bin_dir / "npm"
+    npm.write_text(f'#!/bin/sh\necho "$@" >> "{calls}"\necho 1.2.3\n')
+    npx = bin_dir / "npx"
+    npx.write_text("#!/bin/sh\nexit 0\n")
+    for stub in (npm, npx):
+        stub.chmod(0o755)
+    home = tmp_path / "home"
+    home.mkdir()
+    environ = dict(os.environ, HOME=str(home), PATH=str(bin_dir), PYTHONPATH=str(ROOT))
+    environ.pop("SUPERQWEN_NPM_CACHE_TTL", None)
+    return environ, calls, home
+
+
+def install_mcp(environ, calls, *flags, ttl=None):
+    """Runs `install mcp` and returns how many times it ran npm."""
+    before = len(calls.read_text().splitlines()) if calls.exists() else 0
+    if ttl is not None:
+        environ = dict(environ, SUPERQWEN_NPM_CACHE_TTL=str(ttl))
+    args = [sys.executable, "-m", "SuperQwen", "install", "mcp", *flags]
+    for server in SERVERS:
+        args += ["--server", server]
+    subprocess.run(args, env=environ, cwd=ROOT, check=True, capture_output=True)
+    after = len(calls.read_text().splitlines()) if calls.exists() else 0
+    return after - before
+
+
+def configured_servers(home):
+    with open(home / ".qwen" / "settings.json", encoding="utf-8") as f:
+        return set(json.load(f)["mcpServers"])
+
+
+def test_fresh_cache_skips_npm(env):
+    environ, calls, home = env
+    assert install_mcp(environ, calls) == len(SERVERS)
+    assert install_mcp(environ, calls) == 0
+    assert configured_servers(home) == {"context7", "playwright"}
+
+
+def test_expired_entries_call_npm_again(env):
+    environ, calls, _home = env
+    assert install_mcp(environ, calls) == len(SERVERS)
+    assert install_mcp(environ, calls, ttl=0) == len(SERVERS)
+
+
+def test_refresh_cache_ignores_fresh_entries(env):
+    environ, calls, _home = env
+    assert install_mcp(environ, calls) == len(SERVERS)
+    assert install_mcp(environ, calls, "--refresh-cache") == len(SERVERS)
+
+
+def test_offline_trusts_expired_entries(env):
+    environ, calls, home = env
+    assert install_mcp(environ, calls) == len(SERVERS)
+    assert install_mcp(environ, calls, "--offline", ttl=0) == 0
+    assert configured_servers(home) == {"context7", "playwright"}
+
+
+def test_offline_without_cache_never_calls_npm(env):
+    environ, calls, home = env
+    assert install_mcp(environ, calls, "--offline") == 0
+    assert not (home / ".qwen" / "settings.json").exists()
@@ -0,0 +1,41 @@
+"""
+`superqwen route` suggests the agent a task description calls for.
+"""
+
+import pytest
+
+from SuperQwen.setup.router import build_route_index, route
+from SuperQwen.setup.search_index import tokenize
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_route_index()
+
+
+@pytest.mark.parametrize("task, agent", [
+    # The example from `superqwen --help`.
+    ("audit auth for XSS", "security-engineer"),
+    ("audit the login flow for XSS", "security-engineer"),
+    ("threat model the payment api", "security-engineer"),
+    ("refactor legacy python code", "python-expert"),
+    ("I want to speed up my app", "performance-engineer"),
+    ("my login page is slow", "performance-engineer"),
+])
+def test_best_agent(index, task, agent):
+    assert route(task, index=index)[0].agent == agent
+
+
+def test_plural_matches_singular(index):
+    assert tokenize("queries") == tokenize("query")
+    assert "performance-engineer" in [r.agent for r in route("slow database queries", index=index)]
+
+
+def test_unknown_word_matches_by_prefix(index):
+    matched = route("auth", index=index)[0].matched
+    assert "authentication" in matched and "authorization" in matched
+
+
+def test_pronouns_and_short_words_do_not_match(index):
+    assert route("I want to speed up my app", index=index) == route("speed up app", index=index)
+    assert route("my me", index=index) == []
@@ -0,0 +1,21 @@
+"""
+`superqwen search` ranks assets by their text, not by pronouns or short prefixes.
+"""
+
+import pytest
+
+from SuperQwen.setup.search_index import build_search_index, search
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_search_index()
+
+
+def test_first_person_query(index):
+    assert search("I want to speed up", index=index)[0].key == search("speed up", index=index)[0].key
+
+
+def test_short_words_are_not_prefixes(index):
+    assert search("zq", index=index) == []
+    assert search("ap", index=index) == []
@@ -0,0 +1,88 @@
+"""
+Staged syncs build the new tree beside the live one and swap it in, or fall back to writing in place.
+"""
+
+import errno
+import hashlib
+import os
+
+import pytest
+
+from SuperQwen.setup import staging
+from SuperQwen.setup.file_utils import STATE_DIRNAME, Asset, sync_files
+from SuperQwen.setup.manifest import Manifest
+
+PACKAGE_MTIME_NS = 1_600_000_000_000_000_000
+
+
+def asset(name, text):
+    data = text.encode()
+    return Asset(name, data, hashlib.sha256(data).hexdigest(), PACKAGE_MTIME_NS)
+
+
+def tree(path):
+    """Returns {name: (content, mtime_ns, inode)} for the files in path."""
+    return {p.name: (p.read_text(), p.stat().st_mtime_ns, p.stat().st_ino) for p in sorted(path.iterdir())}
+
+
+@pytest.fixture
+def qwen_dir(tmp_path):
+    return tmp_path / ".qwen"
+
+
+def test_staged_sync_swaps_in_the_new_tree(qwen_dir, monkeypatch):
+    dst_dir, state_dir = qwen_dir / "modes", qwen_dir / STATE_DIRNAME
+    manifest = Manifest(qwen_dir)
+    sync_files([asset("a.md", "a"), asset("b.md", "b")], dst_dir, "modes", manifest, staging_dir=state_dir)
+    exchanges = []
+    real_exchange = staging.exchange
+    monkeypatch.setattr(staging, "exchange", lambda a, b: exchanges.append(real_exchange(a, b)) or exchanges[-1])
+
+    result = sync_files([asset("a.md", "a"), asset("b.md", "b2")], dst_dir, "modes", manifest, staging_dir=state_dir)
+
+    if exchanges != [True]:
+        pytest.skip("renameat2(RENAME_EXCHANGE) is not available here")
+    assert (result.copied, result.skipped) == (1, 1)
+    assert {name: content for name, (content, _, _) in tree(dst_dir).items()} == {"a.md": "a", "b.md": "b2"}
+    assert (staging.rollback_path(dst_dir, state_dir) / "b.md").read_text() == "b"
+    assert not list((state_dir / staging.STAGING_DIRNAME).iterdir())
+
+
+def test_cross_device_fallback_restores_the_manifest(qwen_dir, monkeypatch):
+    dst_dir, state_dir = qwen_dir / "modes", qwen_dir / STATE_DIRNAME
+    manifest = Manifest(qwen_dir)
+    sync_files([asset("a.md", "a"), asset("b.md", "b"), asset("c.md", "c")], dst_dir, "modes", manifest)
+
+    def swap_in(stage_dir, dst_dir, rollback_dir):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(staging, "swap_in", swap_in)
+    result = sync_files([asset("a.md", "a"), asset("b.md", "b2")], dst_dir, "modes", manifest, staging_dir=state_dir)
+
+    # c.md is only removed if the entries the staged attempt forgot were restored first.
+    assert (result.copied, result.skipped, result.removed) == (1, 1, 1)
+    assert sorted(p.name for p in dst_dir.iterdir()) == ["a.md", "b.md"]
+    assert sorted(p.name for p in manifest.files_for("modes")) == ["a.md", "b.md"]
+    assert manifest.known_digest(dst_dir / "b.md", (dst_dir / "b.md").stat()) == asset("b.md", "b2").digest
+
+
+def test_live_files_are_untouched_while_staging(qwen_dir, monkeypatch):
+    dst_dir, state_dir = qwen_dir / "modes", qwen_dir / STATE_DIRNAME
+    dst_dir.mkdir(parents=True)
+    # Same content as the package file but another mtime: an in-place sync would refresh the mtime.
+    (dst_dir / "a.md").write_text("a")
+    (dst_dir / "b.md").write_text("b")
+    before = tree(dst_dir)
+    seen = []
+    real_swap_in = staging.swap_in
+
+    def swap_in(stage_dir, dst_dir, rollback_dir):
+        seen.append(tree(dst_dir))
+        real_swap_in(stage_dir, dst_dir, rollback_dir)
+
+    monkeypatch.setattr(staging, "swap_in", swap_in)
+    sync_files([asset("a.md", "a"), asset("b.md", "b2")], dst_dir, "modes", prune_suffix=".md", staging_dir=state_dir)
+
+    assert seen == [before]
+    assert tree(dst_dir)["a.md"] == before["a.md"]
+    assert tree(dst_dir)["b.md"][0] == "b2"
@@ -0,0 +1,48 @@
+"""
+`superqwen --version` stays within its import-time budget.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from SuperQwen.setup.cli import STARTUP_IMPORT_BUDGET_MS
+
+ROOT = Path(__file__).resolve().parent.parent
+# Modules `--version` must not import.
+HEAVY_MODULES = ("typer", "rich", "SuperQwen.setup.app", "SuperQwen.setup.installer")
+# Modules only table and text output needs.
+DISPLAY_MODULES = ("colorama", "rich", "SuperQwen.setup.ui")
+
+
+def import_times(*args, env=None):
+    """Returns (module, self time in microseconds) for every import of `python -X importtime -m SuperQwen ARGS`."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-m", "SuperQwen", *(args or ("--version",))],
+                            cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    times = []
+    for line in result.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[0].startswith("import time:") and fields[0].split(":")[1].strip().isdigit():
+            times.append((fields[2].strip(), int(fields[0].split(":")[1])))
+    return times
+
+
+def test_version_skips_heavy_modules():
+    imported = {module for module, _us in import_times()}
+    assert not [module for module in HEAVY_MODULES if module in imported]
+
+
+def test_version_import_budget():
+    # Best of three runs, so a busy machine does not fail the budget.
+    totals = [
+        sum(us for module, us in import_times() if module.startswith("SuperQwen")) / 1000
+        for _ in range(3)
+    ]
+    assert min(totals) <= STARTUP_IMPORT_BUDGET_MS, f"SuperQwen imports took {min(totals):.1f} ms"
+
+
+def test_json_output_skips_display_modules(tmp_path):
+    environ = dict(os.environ, HOME=str(tmp_path), PYTHONPATH=str(ROOT))
+    imported = {module for module, _us in import_times("install", "modes", "--output", "json", env=environ)}
+    assert not [module for module in DISPLAY_MODULES if module in imported]
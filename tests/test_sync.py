@@ -0,0 +1,42 @@
+"""
+Incremental syncs remove files the package no longer ships, and nothing else.
+"""
+
+import hashlib
+
+from SuperQwen.setup.file_utils import Asset, sync_files
+from SuperQwen.setup.manifest import Manifest
+
+
+def asset(name, text):
+    data = text.encode()
+    return Asset(name, data, hashlib.sha256(data).hexdigest())
+
+
+def test_file_dropped_from_package_is_removed(tmp_path):
+    dst_dir = tmp_path / ".qwen" / "agents"
+    manifest = Manifest(tmp_path / ".qwen")
+    sync_files([asset("a.md", "a"), asset("old.md", "old")], dst_dir, "agents", manifest)
+    (dst_dir / "mine.md").write_text("user file")
+
+    result = sync_files([asset("a.md", "a")], dst_dir, "agents", manifest)
+
+    assert (result.copied, result.skipped, result.removed) == (0, 1, 1)
+    assert sorted(p.name for p in dst_dir.iterdir()) == ["a.md", "mine.md"]
+    assert [p.name for p in manifest.files_for("agents")] == ["a.md"]
+
+
+def test_manifest_entry_outside_dst_dir_is_only_forgotten(tmp_path):
+    qwen_dir = tmp_path / ".qwen"
+    dst_dir = qwen_dir / "agents"
+    manifest = Manifest(qwen_dir)
+    outside = qwen_dir / "notes" / "a.md"
+    outside.parent.mkdir(parents=True)
+    outside.write_text("user file")
+    manifest.record("agents", outside, asset("a.md", "user file").digest, stat=outside.stat())
+
+    result = sync_files([asset("b.md", "b")], dst_dir, "agents", manifest)
+
+    assert result.removed == 0
+    assert outside.read_text() == "user file"
+    assert [p.name for p in manifest.files_for("agents")] == ["b.md"]
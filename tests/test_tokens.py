@@ -0,0 +1,27 @@
+"""
+Tokenizer specs that cannot be used fail with ValueError, which `superqwen stats` reports.
+"""
+
+import pytest
+
+from SuperQwen.setup import tokens
+
+
+@pytest.mark.parametrize("spec", ["hf", "hf:", "approx:x", "chars:4", "bogus"])
+def test_bad_spec(spec):
+    with pytest.raises(ValueError):
+        tokens.get_tokenizer(spec)
+
+
+def test_factory_errors_become_value_errors(monkeypatch):
+    def broken(path):
+        raise FileNotFoundError(path)
+
+    monkeypatch.setitem(tokens._FACTORIES, "broken", broken)
+    tokens.get_tokenizer.cache_clear()
+    with pytest.raises(ValueError, match="Cannot load tokenizer 'broken:/missing.json'"):
+        tokens.get_tokenizer("broken:/missing.json")
+
+
+def test_default_spec():
+    assert tokens.get_tokenizer("approx")("two words") == 2
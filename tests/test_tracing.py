@@ -0,0 +1,24 @@
+"""
+Spans exported by a child process keep its pid in the written trace.
+"""
+
+import json
+
+from SuperQwen.setup import tracing
+
+
+def test_merged_child_spans_keep_pid(tmp_path):
+    tracer = tracing.start_tracing()
+    try:
+        with tracing.span("install.parent"):
+            pass
+        child = tracing.Tracer()
+        child.record(tracing.SpanRecord("install.child", 5, 10, 1, {}))
+        tracer.merge(json.loads(json.dumps(child.export())), pid=4242)
+    finally:
+        tracing.stop_tracing()
+    tracer.write(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    pids = {event["name"]: event["pid"] for event in events}
+    assert pids["install.child"] == 4242
+    assert pids["install.parent"] != 4242
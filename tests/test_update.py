@@ -0,0 +1,27 @@
+"""
+`superqwen update` fails with pip's exit status when pip cannot upgrade the package.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize("output", ["table", "json"])
+def test_failed_pip_run_exits_with_its_status(tmp_path, output):
+    links = tmp_path / "links"
+    links.mkdir()
+    # A newer release pip cannot unpack.
+    (links / "SuperQwen-99.0.0.tar.gz").write_text("not a tarball")
+    environ = dict(os.environ, HOME=str(tmp_path), PYTHONPATH=str(ROOT))
+    result = subprocess.run([sys.executable, "-m", "SuperQwen", "update", "--offline", "--find-links", str(links),
+                             "--output", output], env=environ, cwd=ROOT, capture_output=True)
+    assert result.returncode != 0
+    pip = subprocess.run([sys.executable, "-m", "pip", "install", "--upgrade", "SuperQwen", "--find-links", str(links),
+                          "--no-index"], capture_output=True)
+    assert result.returncode == pip.returncode
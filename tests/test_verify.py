@@ -0,0 +1,42 @@
+"""
+`superqwen verify` checks files against the profile and pruned sections they were installed with.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def superqwen(tmp_path):
+    environ = dict(os.environ, HOME=str(tmp_path), PYTHONPATH=str(ROOT))
+
+    def run(*args):
+        """Runs the CLI and returns its exit status."""
+        return subprocess.run([sys.executable, "-m", "SuperQwen", *args], env=environ, cwd=ROOT,
+                              capture_output=True).returncode
+
+    return run
+
+
+def test_pruned_compact_install_verifies(superqwen):
+    assert superqwen("install", "commands", "--profile", "compact", "--prune-section", "Examples") == 0
+    assert superqwen("install", "agents", "--profile", "compact", "--prune-section", "Examples") == 0
+    assert superqwen("verify") == 0
+
+
+def test_other_variant_is_modified(superqwen, tmp_path):
+    assert superqwen("install", "commands", "--profile", "compact", "--prune-section", "Examples") == 0
+    pruned = sorted((tmp_path / ".qwen" / "commands" / "sq").glob("*.toml"))
+    assert superqwen("install", "commands", "--profile", "compact") == 0
+    unpruned = {path.name: path.read_bytes() for path in pruned}
+    assert superqwen("install", "commands", "--profile", "compact", "--prune-section", "Examples") == 0
+    changed = [path for path in pruned if path.read_bytes() != unpruned[path.name]]
+    assert changed
+    changed[0].write_bytes(unpruned[changed[0].name])
+    assert superqwen("verify") == 1